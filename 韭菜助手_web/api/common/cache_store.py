@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为仅进程内加锁
+    fcntl = None
+
+# 缓存文件格式版本；读到更高版本的文件时视为无法识别
+SCHEMA_VERSION = 1
+HEADER_PREFIX = b'#cache '
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+class CacheCorruptError(Exception):
+    """缓存文件校验失败（写入中断、被截断或版本不兼容）"""
+
+
+class FileLock:
+    """跨进程的建议锁（fcntl.flock），同一进程内可重入
+
+    flock 以打开的文件描述符为单位，同一进程重复 open 再加锁会自己锁住自己，
+    因此同一路径在进程内共用一个实例，并用 RLock 计数。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        if not self._rlock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError:
+                self._rlock.release()
+                raise
+            deadline = None if timeout is None else time.time() + timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    if deadline is not None and time.time() >= deadline:
+                        os.close(fd)
+                        self._rlock.release()
+                        return False
+                    time.sleep(0.05)
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._rlock.release()
+
+
+_locks: Dict[str, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def get_lock(path: str) -> FileLock:
+    """按缓存文件取对应的锁（锁文件为 <path>.lock）"""
+    lock_path = os.path.abspath(path) + '.lock'
+    with _locks_guard:
+        lock = _locks.get(lock_path)
+        # fork 出的子进程不能沿用父进程的锁状态
+        if lock is None or lock.pid != os.getpid():
+            lock = _locks[lock_path] = FileLock(lock_path)
+        return lock
+
+
+@contextmanager
+def locked(path: str, timeout: Optional[float] = None) -> Iterator[bool]:
+    """持有 path 对应的跨进程锁；超时未拿到时产出 False，由调用方决定是否继续"""
+    lock = get_lock(path)
+    acquired = lock.acquire(timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+
+def file_signature(path: str) -> Signature:
+    """(mtime_ns, size, inode)，用于判断文件是否被其他进程替换过；不存在返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def signatures(paths: List[str]) -> Tuple[Signature, ...]:
+    return tuple(file_signature(p) for p in paths)
+
+
+def touch_file(path: str):
+    """创建空文件或更新其修改时间，用于记录「同步过但没有新数据」
+
+    这类标记文件不能放在 cache_paths() 中：签名变化会被当作数据变化，使版本号、响应缓存和 ETag 全部失效。
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a'):
+        pass
+    os.utime(path, None)
+
+
+def mtime_or_zero(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def atomic_write_bytes(path: str, body: bytes):
+    """先写同目录下的临时文件并 fsync，再原子替换，崩溃时旧文件保持完整"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if hasattr(os, 'O_DIRECTORY'):
+        # 目录项也要落盘，否则掉电后 rename 可能丢失
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def write_json(path: str, data: Any, indent: Optional[int] = 2, checksum: bool = True):
+    """带版本与校验和头部的 JSON 缓存写入（调用方负责加锁）
+
+    格式：第一行为 `#cache {"schema": 1, "sha256": "...", "length": N}`，之后是 JSON 正文。
+    checksum=False 时不加头部、写成纯 JSON（仍原子替换）：用于纳入版本管理的种子数据，
+    加了头部的文件不再是合法 JSON，刷新后也会在工作区中显示为改动。
+    """
+    body = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+    if not checksum:
+        atomic_write_bytes(path, body)
+        return
+    header = {'schema': SCHEMA_VERSION, 'sha256': hashlib.sha256(body).hexdigest(), 'length': len(body)}
+    atomic_write_bytes(path, HEADER_PREFIX + json.dumps(header).encode('utf-8') + b'\n' + body)
+
+
+def read_json(path: str) -> Any:
+    """读取缓存文件；没有头部的旧格式直接按 JSON 解析
+
+    文件不存在抛 FileNotFoundError，校验失败抛 CacheCorruptError。
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if not raw.startswith(HEADER_PREFIX):
+        try:
+            return json.loads(raw.decode('utf-8'))
+        except ValueError as e:
+            raise CacheCorruptError(f'{path}: {e}')
+    newline = raw.find(b'\n')
+    try:
+        header = json.loads(raw[len(HEADER_PREFIX):newline].decode('utf-8'))
+    except ValueError as e:
+        raise CacheCorruptError(f'{path}: bad header: {e}')
+    if int(header.get('schema', 0)) > SCHEMA_VERSION:
+        raise CacheCorruptError(f"{path}: unsupported schema {header.get('schema')}")
+    body = raw[newline + 1:]
+    if len(body) != header.get('length') or hashlib.sha256(body).hexdigest() != header.get('sha256'):
+        raise CacheCorruptError(f'{path}: checksum mismatch')
+    return json.loads(body.decode('utf-8'))
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """read_json 的宽松版本：缺失或损坏时返回 default；损坏的文件会被改名保留以便排查"""
+    try:
+        return read_json(path)
+    except FileNotFoundError:
+        return default
+    except CacheCorruptError as e:
+        print(f"[Cache] {e}")
+        try:
+            os.replace(path, f'{path}.corrupt')
+        except OSError:
+            pass
+        return default
+    except Exception as e:
+        print(f"[Cache] failed to read {path}: {e}")
+        return default
@@ -0,0 +1,139 @@
+import os
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from typing import Dict, Optional, Any
+
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 这些状态码视为上游暂时不可用，允许重试
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def jisilu_headers(referer: str = 'https://www.jisilu.cn/data/qdii/', form: bool = False) -> Dict[str, str]:
+    """集思录接口通用请求头，配置了 JISILU_COOKIE 时自动带上 Cookie"""
+    headers = {
+        'Accept': 'application/json, text/javascript, */*; q=0.01',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'User-Agent': BROWSER_USER_AGENT,
+        'Referer': referer,
+        'X-Requested-With': 'XMLHttpRequest',
+        'Origin': 'https://www.jisilu.cn',
+        'Connection': 'keep-alive'
+    }
+    if form:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    cookie = os.environ.get('JISILU_COOKIE', '').strip()
+    if cookie:
+        headers['Cookie'] = cookie
+    return headers
+
+
+class HttpClient:
+    """所有上游抓取共用的 HTTP 客户端
+
+    - 每个 host 一个 Session，连接池复用 TCP/TLS 连接（keep-alive）
+    - 默认的连接/读取超时，调用方不传 timeout 也不会无限等待
+    - 连接错误和 5xx/429 按指数退避 + 随机抖动重试
+    - 可为单个 host 设置并发上限
+    - 按 host 统计请求数、错误数、字节数和耗时
+    """
+
+    def __init__(self, connect_timeout: float = 5, read_timeout: float = 15, max_retries: int = 2,
+                 backoff: float = 0.5, pool_size: int = 16):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._sessions: Dict[str, requests.Session] = {}
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+        return session
+
+    def set_host_limit(self, host: str, limit: int):
+        """限制同一 host 的并发请求数（礼貌访问）"""
+        with self._lock:
+            self._host_limits[host] = threading.BoundedSemaphore(max(1, int(limit)))
+
+    def _record(self, host: str, elapsed: float, nbytes: int = 0, error: bool = False, retried: bool = False):
+        with self._lock:
+            st = self._stats.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0,
+                                               'total_ms': 0.0, 'max_ms': 0.0})
+            st['requests'] += 1
+            st['bytes'] += nbytes
+            st['total_ms'] += elapsed * 1000
+            st['max_ms'] = max(st['max_ms'], elapsed * 1000)
+            if error:
+                st['errors'] += 1
+            if retried:
+                st['retries'] += 1
+
+    def _sleep_before_retry(self, attempt: int):
+        delay = self.backoff * (2 ** attempt)
+        time.sleep(delay * (0.5 + random.random()))
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs: Any) -> requests.Response:
+        """发送请求；重试用尽后返回最后一次响应，或抛出最后一次异常"""
+        host = urlsplit(url).hostname or ''
+        session = self._session(host)
+        kwargs.setdefault('timeout', self.timeout)
+        retries = self.max_retries if retries is None else retries
+        limit = self._host_limits.get(host)
+        for attempt in range(retries + 1):
+            t0 = time.time()
+            try:
+                if limit is not None:
+                    with limit:
+                        resp = session.request(method, url, **kwargs)
+                else:
+                    resp = session.request(method, url, **kwargs)
+            except requests.RequestException:
+                self._record(host, time.time() - t0, error=True, retried=attempt > 0)
+                if attempt >= retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            failed = resp.status_code in RETRY_STATUS_CODES
+            self._record(host, time.time() - t0, len(resp.content), error=failed, retried=attempt > 0)
+            if failed and attempt < retries:
+                self._sleep_before_retry(attempt)
+                continue
+            return resp
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for host, st in self._stats.items():
+                item = dict(st)
+                item['avg_ms'] = round(st['total_ms'] / st['requests'], 2) if st['requests'] else 0.0
+                item['total_ms'] = round(st['total_ms'], 2)
+                item['max_ms'] = round(st['max_ms'], 2)
+                out[host] = item
+            return out
+
+
+# 全局共享实例
+http_client = HttpClient()
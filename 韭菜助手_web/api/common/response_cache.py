@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
+# 小于该字节数的响应不压缩，压缩收益抵不过开销
+MIN_COMPRESS_SIZE = 1024
+
+
+class CachedBody:
+    """同一份数据序列化后的字节及其各编码版本，创建后不再修改"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=9)
+
+    def negotiate(self, accept_encoding: str):
+        """按客户端 Accept-Encoding 选择编码，返回 (编码名或 None, 字节, ETag)
+
+        ETag 按编码区分（强校验要求不同字节的表示使用不同的 ETag）。
+        """
+        accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return encoding, self.variants[encoding], f'{self.etag}-{encoding}'
+        return None, self.body, self.etag
+
+
+class ResponseCache:
+    """按 (key, version) 缓存序列化后的响应体；version 变化时重新序列化
+
+    key 为请求路径加上接口实际使用的、规范化后的参数（不直接用原始查询串，避免无关参数撑爆缓存），
+    version 为数据来源的版本号元组。
+    只保留最近使用的 max_entries 个 key。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    def get(self, key: Hashable, version: Hashable, serialize: Callable[[], bytes]) -> CachedBody:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+        # 序列化和压缩放在锁外，避免大数据集阻塞其他 key
+        cached = CachedBody(serialize())
+        with self._lock:
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def record_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), brotli=brotli is not None)
+
+
+# 全局共享实例
+response_cache = ResponseCache()
+
+
+def cache_control(max_age: Optional[float]) -> str:
+    """max_age 为距下次计划刷新的秒数；未知或已到期时只允许短暂缓存"""
+    seconds = int(max_age) if max_age and max_age > 0 else 60
+    return f'public, max-age={seconds}, s-maxage={seconds}'
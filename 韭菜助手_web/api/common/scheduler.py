@@ -0,0 +1,134 @@
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+
+Interval = Union[float, Callable[[], float]]
+
+
+class _Job:
+    def __init__(self, name: str, fn: Callable[[], None], interval: Interval, next_run: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.next_run = next_run
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def next_interval(self) -> float:
+        value = self.interval() if callable(self.interval) else self.interval
+        return max(1.0, float(value))
+
+
+class RefreshScheduler:
+    """后台刷新调度器：每个任务按自己的间隔在工作线程中执行
+
+    间隔可以是固定秒数，也可以是每次执行后调用的函数（用于按缓存过期时间或交易时段动态调整）。
+    同一任务不会并发执行；上一次还没结束时，到期的下一次会顺延。
+    """
+
+    def __init__(self, max_workers: int = 4, tick: float = 1.0):
+        self.max_workers = max_workers
+        self.tick = tick
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopped = False
+
+    def register(self, name: str, fn: Callable[[], None], interval: Interval, initial_delay: float = 0):
+        with self._lock:
+            self._jobs[name] = _Job(name, fn, interval, time.time() + initial_delay)
+        self._wakeup.set()
+
+    def run_now(self, name: str):
+        """让任务在下一次轮询时立即执行"""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job:
+                job.next_run = 0
+        self._wakeup.set()
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self._stopped = False
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='refresh-worker')
+            self._thread = threading.Thread(target=self._loop, name='refresh-scheduler', daemon=True)
+            self._thread.start()
+        print(f"[Scheduler] started with {len(self._jobs)} job(s)")
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_job(self, job: _Job):
+        t0 = time.time()
+        try:
+            job.fn()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            traceback.print_exc()
+        finally:
+            job.runs += 1
+            job.last_run = t0
+            job.last_duration_ms = round((time.time() - t0) * 1000, 2)
+            try:
+                interval = job.next_interval()
+            except Exception:
+                interval = 60.0
+            with self._lock:
+                job.running = False
+                if job.next_run != 0:
+                    job.next_run = time.time() + interval
+            self._wakeup.set()
+
+    def _loop(self):
+        while not self._stopped:
+            now = time.time()
+            wait_for = self.tick * 60
+            with self._lock:
+                for job in self._jobs.values():
+                    if job.running:
+                        continue
+                    if job.next_run <= now:
+                        job.running = True
+                        job.next_run = now  # 标记为已出队，_run_job 结束后重新计算
+                        self._executor.submit(self._run_job, job)
+                    else:
+                        wait_for = min(wait_for, job.next_run - now)
+            self._wakeup.wait(timeout=max(self.tick, wait_for))
+            self._wakeup.clear()
+
+    def status(self) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            return [{
+                'name': job.name,
+                'running': job.running,
+                'runs': job.runs,
+                'failures': job.failures,
+                'last_run': job.last_run,
+                'last_duration_ms': job.last_duration_ms,
+                'last_error': job.last_error,
+                'next_run_in': None if job.running else round(max(0.0, job.next_run - now), 1),
+            } for job in self._jobs.values()]
+
+
+# 全局共享实例
+refresh_scheduler = RefreshScheduler()
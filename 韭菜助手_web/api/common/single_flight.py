@@ -0,0 +1,74 @@
+import threading
+import functools
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    def __init__(self, owner: int):
+        self.owner = owner
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """同一个 key 同时只执行一次：并发的调用方等待正在进行的那一次，并共享其结果或异常"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        me = threading.get_ident()
+        with self._lock:
+            st = self._stats.setdefault(key, {'calls': 0, 'executions': 0, 'coalesced': 0})
+            st['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None and call.owner == me:
+                # 同一线程内的重入调用（如子类 super() 调用）直接执行，避免自己等自己
+                st['executions'] += 1
+                call = None
+                leader = None
+            elif call is not None:
+                st['coalesced'] += 1
+                leader = False
+            else:
+                st['executions'] += 1
+                call = _Call(me)
+                self._calls[key] = call
+                leader = True
+        if leader is None:
+            return fn(*args, **kwargs)
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+
+# 全局共享实例
+single_flight = SingleFlight()
+
+
+def coalesce(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """方法装饰器：同一个类的同名方法同时只执行一次，并发调用共享结果"""
+    @functools.wraps(fn)
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        return single_flight.do(f'{type(self).__name__}.{fn.__name__}', fn, self, *args, **kwargs)
+    wrapper.__coalesced__ = True
+    return wrapper
@@ -0,0 +1,57 @@
+import time
+from datetime import datetime, timedelta, timezone, time as dtime
+from typing import List, Optional, Tuple
+
+# A 股交易时段（北京时间）：含开盘集合竞价 9:15 起
+BEIJING_TZ = timezone(timedelta(hours=8))
+SESSIONS: List[Tuple[dtime, dtime]] = [(dtime(9, 15), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))]
+
+# 向前/向后查找交易日的最大天数（覆盖周末；不含节假日日历，节假日按普通工作日处理）
+_MAX_LOOKAROUND_DAYS = 7
+
+
+def _beijing(ts: Optional[float]) -> datetime:
+    return datetime.fromtimestamp(time.time() if ts is None else ts, BEIJING_TZ)
+
+
+def _is_trading_day(d: datetime) -> bool:
+    return d.weekday() < 5
+
+
+def in_trading_session(ts: Optional[float] = None) -> bool:
+    """ts（默认当前时间）是否处于交易时段内"""
+    now = _beijing(ts)
+    if not _is_trading_day(now):
+        return False
+    t = now.time()
+    return any(start <= t < end for start, end in SESSIONS)
+
+
+def next_session_start(ts: Optional[float] = None) -> float:
+    """下一个交易时段开始的时间戳；正处于交易时段内时返回 ts 本身"""
+    now = _beijing(ts)
+    if in_trading_session(now.timestamp()):
+        return now.timestamp()
+    for offset in range(_MAX_LOOKAROUND_DAYS + 1):
+        day = now + timedelta(days=offset)
+        if not _is_trading_day(day):
+            continue
+        for start, _ in SESSIONS:
+            begin = datetime.combine(day.date(), start, BEIJING_TZ)
+            if begin > now:
+                return begin.timestamp()
+    return now.timestamp()
+
+
+def last_session_end(ts: Optional[float] = None) -> float:
+    """最近一个已结束的交易时段的结束时间戳（在此之后行情不再变化，直到下一时段开始）"""
+    now = _beijing(ts)
+    for offset in range(_MAX_LOOKAROUND_DAYS + 1):
+        day = now - timedelta(days=offset)
+        if not _is_trading_day(day):
+            continue
+        for _, end in reversed(SESSIONS):
+            finish = datetime.combine(day.date(), end, BEIJING_TZ)
+            if finish <= now:
+                return finish.timestamp()
+    return now.timestamp()
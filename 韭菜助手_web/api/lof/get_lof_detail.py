@@ -1,11 +1,26 @@
-import requests
+import os
 import json
 import time
-import os
 from typing import List, Dict, Any
+from api.common.http_client import http_client, jisilu_headers
+
+# 每页的历史记录条数
+LOF_DETAIL_PAGE_SIZE = int(os.environ.get('LOF_DETAIL_PAGE_SIZE', 50))
+# 对集思录的并发请求上限（批量详情、历史回填和列表刷新共用）
+JISILU_HOST = 'www.jisilu.cn'
+JISILU_MAX_CONCURRENCY = int(os.environ.get('JISILU_MAX_CONCURRENCY', 6))
+http_client.set_host_limit(JISILU_HOST, JISILU_MAX_CONCURRENCY)
+
+# 走 hist_list 接口的基金（见下方 161226 的特殊处理），该接口不分页
+UNPAGED_FUND_IDS = {'161226'}
+
 
-def fetch_lof_detail_data(fund_id: str) -> Dict[str, Any]:
-    """获取LOF基金历史数据 - 移植自小程序 get_lof_detail.js"""
+def supports_paging(fund_id: str) -> bool:
+    return fund_id not in UNPAGED_FUND_IDS
+
+
+def fetch_lof_detail_data(fund_id: str, page: int = 1, rp: int = LOF_DETAIL_PAGE_SIZE) -> Dict[str, Any]:
+    """获取LOF基金历史数据（第 page 页，每页 rp 条，按日期从新到旧）- 移植自小程序 get_lof_detail.js"""
     timestamp = int(time.time() * 1000)
     
     # 特殊处理国投白银LOF(161226)
@@ -20,33 +35,18 @@ def fetch_lof_detail_data(fund_id: str) -> Dict[str, Any]:
         request_data = {
             'is_search': 1,
             'fund_id': fund_id,
-            'rp': 50,
-            'page': 1
+            'rp': rp,
+            'page': page
         }
         referer = 'https://www.jisilu.cn/data/qdii/'
     
-    headers = {
-        'Accept': 'application/json, text/javascript, */*; q=0.01',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Referer': referer,
-        'X-Requested-With': 'XMLHttpRequest',
-        'Origin': 'https://www.jisilu.cn',
-        'Connection': 'keep-alive'
-    }
-    
-    if method == "POST":
-        headers['Content-Type'] = 'application/x-www-form-urlencoded'
-    
-    cookie = os.environ.get('JISILU_COOKIE', '').strip()
-    if cookie:
-        headers['Cookie'] = cookie
+    headers = jisilu_headers(referer, form=(method == "POST"))
 
     try:
         if method == "POST":
-            response = requests.post(url, data=request_data, headers=headers, timeout=15)
+            response = http_client.post(url, data=request_data, headers=headers)
         else:
-            response = requests.get(url, headers=headers, timeout=15)
+            response = http_client.get(url, headers=headers)
             
         if response.status_code == 200:
             return response.json()
@@ -55,7 +55,7 @@ def fetch_lof_detail_data(fund_id: str) -> Dict[str, Any]:
             proxy_url = f"https://r.jina.ai/{url}"
             # 对于 GET 请求，代理通常更容易成功
             if method == "GET":
-                proxy_resp = requests.get(proxy_url, headers=headers, timeout=15)
+                proxy_resp = http_client.get(proxy_url, headers=headers)
                 if proxy_resp.status_code == 200:
                     try:
                         return json.loads(proxy_resp.text)
@@ -1,10 +1,106 @@
 import os
-import requests
 import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 import time
 from api.stock_py.data.base_manager import BaseDataManager
+from api.common.http_client import http_client, jisilu_headers
+from api.common.single_flight import coalesce
+from api.common.trading_session import in_trading_session, next_session_start, last_session_end
+
+# LOF 列表轮询间隔（秒）：交易时段内 / 休市时
+LOF_POLL_INTERVAL = float(os.environ.get('LOF_POLL_INTERVAL', 60))
+LOF_IDLE_INTERVAL = float(os.environ.get('LOF_IDLE_INTERVAL', 1800))
+# 交易时段内允许的最大数据年龄（秒），超过后请求会同步刷新一次；休市时在最近一次收盘后取过即视为最新
+LOF_MAX_STALENESS = float(os.environ.get('LOF_MAX_STALENESS', 180))
+# 直连集思录超过该秒数仍未成功时，同时发起 r.jina.ai 代理请求，取先成功的一个
+LOF_HEDGE_DELAY = float(os.environ.get('LOF_HEDGE_DELAY', 2))
+# 单个来源（直连 + 代理）的总时限（秒）
+LOF_SOURCE_TIMEOUT = float(os.environ.get('LOF_SOURCE_TIMEOUT', 20))
+
+# 列表来源；fund_ids 不为空时只取其中的基金（index_lof_list 只需要国投白银LOF 161226）
+LOF_SOURCES = [
+    {
+        'url': 'https://www.jisilu.cn/data/qdii/qdii_list/E?___jsl=LST___t={ts}&only_lof=y&rp=22',
+        'proxy_url': 'https://r.jina.ai/http://www.jisilu.cn/data/qdii/qdii_list/E?only_lof=y&rp=22',
+        'referer': 'https://www.jisilu.cn/data/qdii/',
+        'fund_ids': None,
+    },
+    {
+        'url': 'https://www.jisilu.cn/data/qdii/qdii_list/C?___jsl=LST___t={ts}',
+        'proxy_url': 'https://r.jina.ai/http://www.jisilu.cn/data/qdii/qdii_list/C',
+        'referer': 'https://www.jisilu.cn/data/qdii/',
+        'fund_ids': None,
+    },
+    {
+        'url': 'https://www.jisilu.cn/data/lof/index_lof_list/?___jsl=LST___t={ts}&only_owned=&rp=25',
+        'proxy_url': 'https://r.jina.ai/https://www.jisilu.cn/data/lof/index_lof_list/?only_owned=&rp=25',
+        'referer': 'https://www.jisilu.cn/data/lof/',
+        'fund_ids': {'161226'},
+    },
+]
+
+# 每个来源一个编排线程；请求线程单独一个池，被放弃的慢请求在后台自然结束，不阻塞本次刷新
+_source_pool = ThreadPoolExecutor(max_workers=len(LOF_SOURCES), thread_name_prefix='lof-source')
+_request_pool = ThreadPoolExecutor(max_workers=len(LOF_SOURCES) * 2, thread_name_prefix='lof-request')
+
+
+def _request_rows(url: str, source: Dict, headers: Dict[str, str]) -> List[Dict]:
+    """请求一次并取出 rows；状态码异常、非 JSON、无 rows 或找不到指定基金时抛异常"""
+    resp = http_client.get(url, headers=headers, retries=0)
+    print(f"请求URL: {url}, 状态码: {resp.status_code}")
+    if resp.status_code != 200:
+        raise ValueError(f"状态码 {resp.status_code}")
+    data = json.loads(resp.text)
+    if not isinstance(data, dict) or 'rows' not in data:
+        raise ValueError("响应无rows或格式异常")
+    rows = data['rows']
+    if source['fund_ids']:
+        rows = [row for row in rows if row.get('id') in source['fund_ids']]
+        if not rows:
+            raise ValueError(f"未找到 {','.join(sorted(source['fund_ids']))}")
+    return rows
+
+
+def _hedged(primary: Callable[[], Any], backup: Callable[[], Any], delay: float, timeout: float) -> Any:
+    """先执行 primary；delay 秒内未成功（未返回或已失败）时再执行 backup，返回先成功的结果
+
+    全部失败时抛出最后一个异常，超过 timeout 仍无结果时抛 TimeoutError。
+    """
+    deadline = time.time() + timeout
+    futures = [_request_pool.submit(primary)]
+    done, _ = wait(futures, timeout=delay)
+    if not done or futures[0].exception() is not None:
+        futures.append(_request_pool.submit(backup))
+    pending = set(futures)
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError(f"{timeout}s 内没有可用结果")
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _fetch_source(source: Dict, ts: int) -> List[Dict]:
+    """取一个来源的行，直连与代理对冲；失败时返回空列表"""
+    url = source['url'].format(ts=ts)
+    headers = jisilu_headers(source['referer'])
+    # 代理沿用原先的请求头（Referer 为 qdii 页面）
+    proxy_headers = jisilu_headers('https://www.jisilu.cn/data/qdii/')
+    try:
+        rows = _hedged(lambda: _request_rows(url, source, headers),
+                       lambda: _request_rows(source['proxy_url'], source, proxy_headers),
+                       LOF_HEDGE_DELAY, LOF_SOURCE_TIMEOUT)
+        print(f"从URL {url} 获取到 {len(rows)} 条数据")
+        return rows
+    except Exception as e:
+        print(f"获取失败（直连与代理）: {url}: {e}")
+        return []
 
 
 class LOFDataManager(BaseDataManager):
@@ -17,90 +113,22 @@ class LOFDataManager(BaseDataManager):
         self.current_api = 1
         self.sort_field = 'discount_rt'  # 默认排序字段
         self.sort_order = 'desc'  # 默认排序方式
+        self.last_attempt_time = 0  # 最近一次请求上游结束的时间（无论成功与否）
     
     def init_data(self):
         """初始化数据：不使用缓存"""
         self.lof_data = []
     
+    @coalesce
     def fetch_from_api(self) -> List[Dict]:
         """从API获取LOF数据（仅使用真实接口，不返回示例数据）"""
         try:
             ts = int(time.time() * 1000)
-            urls = [
-                f'https://www.jisilu.cn/data/qdii/qdii_list/E?___jsl=LST___t={ts}&only_lof=y&rp=22',
-                f'https://www.jisilu.cn/data/qdii/qdii_list/C?___jsl=LST___t={ts}',
-                f'https://www.jisilu.cn/data/lof/index_lof_list/?___jsl=LST___t={ts}&only_owned=&rp=25'
-            ]
-            session = requests.Session()
-            cookie = os.environ.get('JISILU_COOKIE', '').strip()
-            base_headers = {
-                'Accept': 'application/json, text/javascript, */*; q=0.01',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Referer': 'https://www.jisilu.cn/data/qdii/',
-                'X-Requested-With': 'XMLHttpRequest',
-                'Origin': 'https://www.jisilu.cn',
-                'Connection': 'keep-alive'
-            }
-            if cookie:
-                base_headers['Cookie'] = cookie
-
+            # 三个来源并发请求，结果按 LOF_SOURCES 的顺序拼接
+            futures = [_source_pool.submit(_fetch_source, source, ts) for source in LOF_SOURCES]
             all_rows = []
-            for url in urls:
-                try:
-                    # 对于 index_lof_list 接口，设置特定的 Referer
-                    headers = base_headers.copy()
-                    if 'index_lof_list' in url:
-                        headers['Referer'] = 'https://www.jisilu.cn/data/lof/'
-                    
-                    response = session.get(url, headers=headers, timeout=15)
-                    print(f"请求URL: {url}, 状态码: {response.status_code}")
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            if isinstance(data, dict) and 'rows' in data:
-                                if 'index_lof_list' in url:
-                                    # 针对国投白银LOF(161226)进行过滤
-                                    silver_rows = [row for row in data['rows'] if row.get('id') == '161226']
-                                    all_rows.extend(silver_rows)
-                                    print(f"从URL {url} 提取到 {len(silver_rows)} 条(161226)数据")
-                                else:
-                                    all_rows.extend(data['rows'])
-                                    print(f"从URL {url} 获取到 {len(data['rows'])} 条数据")
-                            else:
-                                print(f"响应无rows或格式异常，尝试代理获取")
-                        except ValueError:
-                            print("直接JSON解析失败，尝试代理获取")
-                    else:
-                        print(f"请求失败，状态码: {response.status_code}，尝试代理获取")
-                except Exception as e:
-                    print(f"直接获取异常: {e}，尝试代理获取")
-
-                # 代理回退：r.jina.ai
-                if not all_rows or ('index_lof_list' in url and not any(r.get('id') == '161226' for r in all_rows)):
-                    try:
-                        if 'index_lof_list' in url:
-                            proxy_url = f'https://r.jina.ai/https://www.jisilu.cn/data/lof/index_lof_list/?only_owned=&rp=25'
-                        else:
-                            proxy_url = f'https://r.jina.ai/http://www.jisilu.cn/data/qdii/qdii_list/{ "E?only_lof=y&rp=22" if "qdii_list/E" in url else "C"}'
-                        
-                        proxy_resp = session.get(proxy_url, headers=base_headers, timeout=15)
-                        if proxy_resp.status_code == 200:
-                            txt = proxy_resp.text
-                            try:
-                                data2 = json.loads(txt)
-                                if isinstance(data2, dict) and 'rows' in data2:
-                                    if 'index_lof_list' in url:
-                                        silver_rows = [row for row in data2['rows'] if row.get('id') == '161226']
-                                        all_rows.extend(silver_rows)
-                                        print(f"代理从 index_lof_list 提取到 {len(silver_rows)} 条(161226)数据")
-                                    else:
-                                        all_rows.extend(data2['rows'])
-                                        print(f"代理获取到 {len(data2['rows'])} 条数据")
-                            except Exception as je:
-                                print(f"代理内容非JSON：{je}")
-                    except Exception as pe:
-                        print(f"代理获取失败：{pe}")
+            for future in futures:
+                all_rows.extend(future.result())
 
             processed_data = []
             for item in all_rows:
@@ -159,8 +187,38 @@ class LOFDataManager(BaseDataManager):
                     reverse=True
                 )
                 self.lof_data = sorted_data
+                self.last_update_time = time.time()
+                self._mark_updated()
         except Exception as e:
             print(f"更新LOF数据失败: {e}")
+        finally:
+            self.last_attempt_time = time.time()
+
+
+    def poll_interval(self) -> float:
+        """距下一次轮询的秒数：交易时段内为 LOF_POLL_INTERVAL；休市时为 LOF_IDLE_INTERVAL，但不晚于下一时段开盘"""
+        now = time.time()
+        if in_trading_session(now):
+            return LOF_POLL_INTERVAL
+        return max(1.0, min(LOF_IDLE_INTERVAL, next_session_start(now) - now))
+
+    def is_stale(self) -> bool:
+        """交易时段内超过 LOF_MAX_STALENESS；休市时只看是否在最近一次收盘之后取过"""
+        if self.last_update_time == 0:
+            return True
+        now = time.time()
+        if in_trading_session(now):
+            return now - self.last_update_time > LOF_MAX_STALENESS
+        return self.last_update_time < last_session_end(now)
+
+    def should_update(self) -> bool:
+        return self.is_stale()
+
+    def next_refresh_in(self) -> float:
+        if self.last_update_time == 0:
+            return 0.0
+        return max(0.0, self.last_update_time + self.poll_interval() - time.time())
+
     
     def get_data(self) -> List[Dict]:
         """获取LOF数据"""
@@ -213,18 +271,24 @@ def initialize_lof_manager():
     lof_manager.init_data()
 
 
+def schedule_lof_refresh(scheduler):
+    """后台轮询 LOF 列表：交易时段内频繁、休市时稀疏（见 poll_interval）"""
+    scheduler.register('lof.list', lof_manager.update_data, lof_manager.poll_interval)
+
+
+def ensure_lof_fresh():
+    """数据从未取到或已超过允许的陈旧时间时在请求内同步刷新一次（并发请求合并为一次）
+
+    上游失败时不会每个请求都重试：距上次尝试结束不足 LOF_POLL_INTERVAL 时直接返回现有数据。
+    """
+    if lof_manager.is_stale() and time.time() - lof_manager.last_attempt_time >= LOF_POLL_INTERVAL:
+        lof_manager.update_data()
+
+
 def get_lof_data() -> List[Dict]:
-    """获取LOF数据的便捷函数"""
-    live_data = lof_manager.fetch_from_api()
-    if not live_data:
-        return []
-    sorted_data = lof_manager.sort_data('discount_rt', 'desc') if lof_manager.lof_data else sorted(
-        live_data,
-        key=lambda x: float('-inf') if x['discount_rt'] == '-' else x['discount_rt'],
-        reverse=True
-    )
-    lof_manager.lof_data = sorted_data
-    return sorted_data
+    """获取LOF数据的便捷函数：返回内存中按溢价率降序的列表，平时由后台轮询刷新"""
+    ensure_lof_fresh()
+    return lof_manager.get_data()
 
 
 def get_sorted_lof_data(field: str = None, order: str = None) -> List[Dict]:
@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from api.common.single_flight import single_flight
+from api.common.trading_session import in_trading_session
+from api.lof.get_lof_detail import process_lof_detail_data, LOF_DETAIL_PAGE_SIZE
+from api.lof.lof_data_manager import lof_manager
+from api.lof.lof_history_store import lof_history_store
+
+# 距上次同步多久（秒）后重新向上游取最新一页：交易时段内价格/估值在变 / 休市时主要等晚间公布的净值
+LOF_DETAIL_TTL = float(os.environ.get('LOF_DETAIL_TTL', 300))
+LOF_DETAIL_IDLE_TTL = float(os.environ.get('LOF_DETAIL_IDLE_TTL', 3600))
+# 最多记录同步时间的基金数，超过后淘汰最久未访问的（被淘汰的基金下次访问时重新同步）
+LOF_DETAIL_CACHE_SIZE = int(os.environ.get('LOF_DETAIL_CACHE_SIZE', 256))
+# 每次列表刷新后预取溢价率最高的前 N 只基金的详情；0 表示不预取
+LOF_DETAIL_PREFETCH = int(os.environ.get('LOF_DETAIL_PREFETCH', 10))
+# 批量接口：单次最多基金数 / 整批等待上游的时限（秒）/ 并发同步的线程数（实际并发还受集思录的 host 并发上限约束）
+LOF_BATCH_MAX_FUNDS = int(os.environ.get('LOF_BATCH_MAX_FUNDS', 50))
+LOF_BATCH_DEADLINE = float(os.environ.get('LOF_BATCH_DEADLINE', 8))
+LOF_BATCH_WORKERS = int(os.environ.get('LOF_BATCH_WORKERS', 8))
+
+
+class LOFDetailCache:
+    """按基金代码记录最近一次成功同步的时间：TTL 过期 + LRU 容量上限
+
+    历史明细本身在 lof_history_store（SQLite）中，未过期时直接按日期区间查库；
+    过期或未命中时先同步（同一基金并发只同步一次），上游失败时不记录，返回库中已有的数据。
+    """
+
+    def __init__(self, max_entries: int = LOF_DETAIL_CACHE_SIZE, prefetch_workers: int = 2,
+                 batch_workers: int = LOF_BATCH_WORKERS):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'errors': 0,
+                       'prefetched': 0, 'prefetch_skipped': 0, 'batch_timeouts': 0}
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='lof-detail-prefetch')
+        # 批量同步放在独立线程池中：超过时限的同步在后台继续完成并入库，下次请求即可命中
+        self._batch_pool = ThreadPoolExecutor(max_workers=batch_workers, thread_name_prefix='lof-detail-batch')
+
+    @staticmethod
+    def ttl(now: Optional[float] = None) -> float:
+        return LOF_DETAIL_TTL if in_trading_session(now) else LOF_DETAIL_IDLE_TTL
+
+    def _fresh(self, fund_id: str, now: float) -> bool:
+        """同步过且未过期时移到 LRU 末尾并返回 True；调用方持有锁"""
+        synced_at = self._entries.get(fund_id)
+        if synced_at is None or now - synced_at > self.ttl(now):
+            return False
+        self._entries.move_to_end(fund_id)
+        return True
+
+    def get(self, fund_id: str, start: Optional[str] = None, end: Optional[str] = None,
+            limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """[start, end] 内的明细，从新到旧；不带任何参数时返回最近 LOF_DETAIL_PAGE_SIZE 条"""
+        if not self._lookup(fund_id):
+            single_flight.do(f'lof_detail:{fund_id}', self._sync, fund_id)
+        return self._read(fund_id, start, end, limit)
+
+    def get_many(self, fund_ids: List[str], start: Optional[str] = None, end: Optional[str] = None,
+                 limit: Optional[int] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """批量取明细：未过期的直接查库，其余并发同步，整批最多等 deadline（默认 LOF_BATCH_DEADLINE）秒
+
+        返回 {'data': {基金代码: 明细}, 'errors': {基金代码: 原因}, 'complete': bool}。
+        同步失败或超时的基金若库中已有数据，仍在 data 中返回（可能不是最新）。
+        """
+        pending = {}
+        for fund_id in fund_ids:
+            if not self._lookup(fund_id):
+                pending[fund_id] = self._batch_pool.submit(single_flight.do, f'lof_detail:{fund_id}', self._sync, fund_id)
+        if pending:
+            wait(list(pending.values()), timeout=LOF_BATCH_DEADLINE if deadline is None else deadline)
+
+        data: Dict[str, List[Dict[str, Any]]] = {}
+        errors: Dict[str, str] = {}
+        for fund_id in fund_ids:
+            future = pending.get(fund_id)
+            if future is not None:
+                if not future.done():
+                    errors[fund_id] = 'timeout'
+                    with self._lock:
+                        self._stats['batch_timeouts'] += 1
+                elif future.exception() is not None or not future.result():
+                    errors[fund_id] = 'upstream error'
+            rows = self._read(fund_id, start, end, limit)
+            if rows or fund_id not in errors:
+                data[fund_id] = rows
+        return {'data': data, 'errors': errors, 'complete': not errors}
+
+    def _lookup(self, fund_id: str) -> bool:
+        """是否同步过且未过期，并计入命中统计"""
+        now = time.time()
+        with self._lock:
+            fresh = self._fresh(fund_id, now)
+            if fresh:
+                self._stats['hits'] += 1
+            else:
+                self._stats['expired' if fund_id in self._entries else 'misses'] += 1
+        return fresh
+
+    @staticmethod
+    def _read(fund_id: str, start: Optional[str], end: Optional[str], limit: Optional[int]) -> List[Dict[str, Any]]:
+        if not (start or end or limit):
+            limit = LOF_DETAIL_PAGE_SIZE
+        return process_lof_detail_data({'rows': lof_history_store.query(fund_id, start, end, limit)})
+
+    def _sync(self, fund_id: str) -> bool:
+        error = lof_history_store.sync(fund_id)
+        with self._lock:
+            if error:
+                self._stats['errors'] += 1
+                return False
+            self._entries[fund_id] = time.time()
+            self._entries.move_to_end(fund_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return True
+
+    def _prefetch_one(self, fund_id: str):
+        with self._lock:
+            if self._fresh(fund_id, time.time()):
+                self._stats['prefetch_skipped'] += 1
+                return
+        try:
+            if single_flight.do(f'lof_detail:{fund_id}', self._sync, fund_id):
+                with self._lock:
+                    self._stats['prefetched'] += 1
+        except Exception as e:
+            print(f"[LOF] 预取详情失败 {fund_id}: {e}")
+
+    def prefetch(self, fund_ids: List[str]):
+        """后台同步（未过期的跳过），立即返回；首次访问的基金会在此完成历史回填"""
+        for fund_id in fund_ids:
+            self._prefetch_pool.submit(self._prefetch_one, fund_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses'] + self._stats['expired']
+            stats = dict(self._stats, entries=len(self._entries), max_entries=self.max_entries,
+                         hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else None)
+        stats['history'] = lof_history_store.get_stats()
+        return stats
+
+
+# 全局共享实例
+lof_detail_cache = LOFDetailCache()
+
+
+def parse_fund_ids(value: Optional[str]) -> List[str]:
+    """?fund_ids=161125,501018,...：去重并保持顺序；为空或超过 LOF_BATCH_MAX_FUNDS 时抛 ValueError"""
+    fund_ids = list(dict.fromkeys(f.strip() for f in (value or '').split(',') if f.strip()))
+    if not fund_ids:
+        raise ValueError('缺少基金代码')
+    if len(fund_ids) > LOF_BATCH_MAX_FUNDS:
+        raise ValueError(f'too many fund_ids: {len(fund_ids)} > {LOF_BATCH_MAX_FUNDS}')
+    return fund_ids
+
+
+def top_discount_fund_ids(rows: List[Dict], n: int) -> List[str]:
+    """溢价率最高的前 n 只（列表已按 discount_rt 降序，'-' 排在最后）"""
+    return [r['fund_id'] for r in rows if r.get('fund_id') and r.get('discount_rt') != '-'][:n]
+
+
+def enable_lof_detail_prefetch():
+    """每次 LOF 列表刷新后，在后台预取溢价率最高的基金详情"""
+    if LOF_DETAIL_PREFETCH <= 0:
+        return
+    lof_manager.add_listener(lambda m: lof_detail_cache.prefetch(top_discount_fund_ids(m.get_data(), LOF_DETAIL_PREFETCH)))
@@ -0,0 +1,237 @@
+import os
+import json
+import math
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from api.stock_py.data.base_manager import CACHE_DIR
+from api.lof.get_lof_detail import fetch_lof_detail_data, supports_paging, LOF_DETAIL_PAGE_SIZE
+
+# 历史回填时并发拉取的页数
+LOF_HISTORY_WORKERS = int(os.environ.get('LOF_HISTORY_WORKERS', 4))
+# 单只基金最多回填的页数（防止 total 异常时无限翻页）
+LOF_HISTORY_MAX_PAGES = int(os.environ.get('LOF_HISTORY_MAX_PAGES', 200))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lof_history (
+    fund_id  TEXT NOT NULL,
+    price_dt TEXT NOT NULL,
+    row      TEXT NOT NULL,
+    PRIMARY KEY (fund_id, price_dt)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lof_history_meta (
+    fund_id       TEXT PRIMARY KEY,
+    total         INTEGER,
+    backfilled_at REAL
+);
+"""
+
+
+class LOFHistoryStore:
+    """按基金持久化集思录的历史明细（SQLite，每只基金每个交易日一行，保存原始 row）
+
+    首次同步时并发拉取全部历史页回填；回填完成后每次同步只取最新一页，
+    若最新一页与已有数据之间有缺口再继续向后翻页，直到接上为止。
+    """
+
+    def __init__(self, path: str, workers: int = LOF_HISTORY_WORKERS):
+        self.path = path
+        self._local = threading.local()
+        self._page_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lof-history')
+        self._stats_lock = threading.Lock()
+        self._stats = {'backfills': 0, 'top_ups': 0, 'pages_fetched': 0, 'page_errors': 0}
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接；WAL 模式下读写互不阻塞"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    # ---------- 读 ----------
+
+    def latest_date(self, fund_id: str) -> Optional[str]:
+        row = self._conn().execute('SELECT MAX(price_dt) FROM lof_history WHERE fund_id = ?', (fund_id,)).fetchone()
+        return row[0] if row else None
+
+    def is_backfilled(self, fund_id: str) -> bool:
+        row = self._conn().execute('SELECT backfilled_at FROM lof_history_meta WHERE fund_id = ?', (fund_id,)).fetchone()
+        return bool(row and row[0])
+
+    def query(self, fund_id: str, start: Optional[str] = None, end: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """[start, end] 闭区间内的原始 row，按日期从新到旧（与接口返回顺序一致）"""
+        sql = 'SELECT row FROM lof_history WHERE fund_id = ?'
+        params: List[Any] = [fund_id]
+        if start:
+            sql += ' AND price_dt >= ?'
+            params.append(start)
+        if end:
+            sql += ' AND price_dt <= ?'
+            params.append(end)
+        sql += ' ORDER BY price_dt DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [json.loads(r[0]) for r in self._conn().execute(sql, params)]
+
+    # ---------- 写 ----------
+
+    def upsert(self, fund_id: str, rows: List[Dict[str, Any]]) -> int:
+        """按 (fund_id, price_dt) 写入，同一天以新数据为准（盘中的估值行收盘后会被覆盖）"""
+        values = []
+        for row in rows or []:
+            cell = row.get('cell') if isinstance(row, dict) else None
+            price_dt = cell.get('price_dt') if isinstance(cell, dict) else None
+            if isinstance(price_dt, str) and price_dt:
+                values.append((fund_id, price_dt[:10], json.dumps(row, ensure_ascii=False, separators=(',', ':'))))
+        if values:
+            conn = self._conn()
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO lof_history (fund_id, price_dt, row) VALUES (?, ?, ?)', values)
+        return len(values)
+
+    def _mark_backfilled(self, fund_id: str, total: int):
+        conn = self._conn()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO lof_history_meta (fund_id, total, backfilled_at) VALUES (?, ?, ?)',
+                         (fund_id, total, datetime.now().timestamp()))
+
+    def _clear_backfilled(self, fund_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM lof_history_meta WHERE fund_id = ?', (fund_id,))
+
+    # ---------- 同步 ----------
+
+    def _fetch_page(self, fund_id: str, page: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """返回 (rows, total)；上游失败时抛 RuntimeError"""
+        raw = fetch_lof_detail_data(fund_id, page, LOF_DETAIL_PAGE_SIZE)
+        if not isinstance(raw, dict) or raw.get('error') or not isinstance(raw.get('rows'), list):
+            self._count('page_errors')
+            raise RuntimeError(raw.get('error') if isinstance(raw, dict) and raw.get('error') else 'invalid response')
+        self._count('pages_fetched')
+        try:
+            total = int(raw.get('total'))
+        except (TypeError, ValueError):
+            total = None
+        return raw['rows'], total
+
+    def sync(self, fund_id: str) -> Optional[str]:
+        """把上游的最新数据同步进库；成功返回 None，失败返回错误信息（已写入的数据保留）"""
+        try:
+            if not supports_paging(fund_id):
+                rows, _ = self._fetch_page(fund_id, 1)
+                self.upsert(fund_id, rows)
+                return None
+            if self.is_backfilled(fund_id):
+                return self._top_up(fund_id)
+            return self._backfill(fund_id)
+        except Exception as e:
+            print(f"[LOF] 同步历史数据失败 {fund_id}: {e}")
+            return str(e)
+
+    def _backfill(self, fund_id: str) -> Optional[str]:
+        """第 1 页拿到总条数后，其余各页并发拉取；全部成功才标记回填完成，否则下次同步重试"""
+        self._count('backfills')
+        rows, total = self._fetch_page(fund_id, 1)
+        self.upsert(fund_id, rows)
+        if total is None:
+            # 响应里没有 total 时只能逐页向后翻，直到不满一页
+            page = 1
+            while len(rows) >= LOF_DETAIL_PAGE_SIZE and page < LOF_HISTORY_MAX_PAGES:
+                page += 1
+                rows, _ = self._fetch_page(fund_id, page)
+                self.upsert(fund_id, rows)
+            self._mark_backfilled(fund_id, page * LOF_DETAIL_PAGE_SIZE)
+            return None
+
+        pages = min(math.ceil(total / LOF_DETAIL_PAGE_SIZE), LOF_HISTORY_MAX_PAGES)
+        futures = [self._page_pool.submit(self._fetch_page, fund_id, page) for page in range(2, pages + 1)]
+        errors = []
+        for future in as_completed(futures):
+            try:
+                self.upsert(fund_id, future.result()[0])
+            except Exception as e:
+                errors.append(str(e))
+        if errors:
+            return f"{len(errors)}/{pages} 页拉取失败: {errors[0]}"
+        self._mark_backfilled(fund_id, total)
+        print(f"[LOF] {fund_id} 历史回填完成，共 {total} 条 / {pages} 页")
+        return None
+
+    def _top_up(self, fund_id: str) -> Optional[str]:
+        """只取最新一页；最新一页最早的日期仍晚于库中最新日期时说明中间有缺口，继续向后翻页
+
+        各页先缓存，接上库中数据后才一起写入：中途失败时若已写入较新的页，库中最新日期前移，
+        下次补数据只取第 1 页就停，中间的缺口再也补不上。
+        """
+        self._count('top_ups')
+        latest = self.latest_date(fund_id) or ''
+        pending: List[Dict[str, Any]] = []
+        for page in range(1, LOF_HISTORY_MAX_PAGES + 1):
+            rows, _ = self._fetch_page(fund_id, page)
+            pending.extend(rows)
+            dates = [r['cell']['price_dt'][:10] for r in rows
+                     if isinstance(r.get('cell'), dict) and isinstance(r['cell'].get('price_dt'), str)]
+            if len(rows) < LOF_DETAIL_PAGE_SIZE or not dates or min(dates) <= latest:
+                self.upsert(fund_id, pending)
+                return None
+        # 翻到上限仍未接上：写入已取到的数据，并清除回填标记，下次同步重新全量回填
+        self.upsert(fund_id, pending)
+        self._clear_backfilled(fund_id)
+        return f"{LOF_HISTORY_MAX_PAGES} 页内未接上已有数据，等待重新回填"
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        try:
+            funds, rows = self._conn().execute('SELECT COUNT(DISTINCT fund_id), COUNT(*) FROM lof_history').fetchone()
+            stats.update(funds=funds, rows=rows)
+        except Exception as e:
+            stats['error'] = str(e)
+        return stats
+
+
+# 全局共享实例
+lof_history_store = LOFHistoryStore(os.path.join(CACHE_DIR, 'lof_history.sqlite3'))
+
+
+def parse_history_query(args: Mapping[str, str]) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """?start=&end=（YYYY-MM-DD，闭区间）&limit=；参数不合法时抛 ValueError"""
+    def date_arg(name: str) -> Optional[str]:
+        value = (args.get(name) or '').strip()
+        if not value:
+            return None
+        try:
+            datetime.strptime(value[:10], '%Y-%m-%d')
+        except ValueError:
+            raise ValueError(f"invalid {name}: {value}")
+        return value[:10]
+
+    limit = (args.get('limit') or '').strip()
+    if limit:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError(f"invalid limit: {limit}")
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+    return date_arg('start'), date_arg('end'), limit or None
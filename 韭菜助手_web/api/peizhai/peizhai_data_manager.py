@@ -1,30 +1,19 @@
-import os
 import time
 import json
-import requests
 from typing import List, Dict
+from api.common.http_client import http_client, jisilu_headers
+from api.common.single_flight import coalesce
 
 class PeizhaiDataManager:
     def __init__(self):
         self.data = []
 
+    @coalesce
     def fetch_from_api(self) -> List[Dict]:
         ts = int(time.time() * 1000)
         url = f'https://www.jisilu.cn/data/cbnew/pre_list/?___jsl=LST___t={ts}'
-        session = requests.Session()
-        headers = {
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Referer': 'https://www.jisilu.cn/data/cbnew/',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Origin': 'https://www.jisilu.cn',
-            'Connection': 'keep-alive'
-        }
-        cookie = os.environ.get('JISILU_COOKIE', '').strip()
-        if cookie:
-            headers['Cookie'] = cookie
-        resp = session.get(url, headers=headers, timeout=15)
+        headers = jisilu_headers('https://www.jisilu.cn/data/cbnew/')
+        resp = http_client.get(url, headers=headers)
         rows = []
         if resp.status_code == 200:
             try:
@@ -35,7 +24,7 @@ class PeizhaiDataManager:
         if not rows:
             try:
                 proxy_url = 'https://r.jina.ai/http://www.jisilu.cn/data/cbnew/pre_list/'
-                proxy_resp = session.get(proxy_url, headers=headers, timeout=15)
+                proxy_resp = http_client.get(proxy_url, headers=headers)
                 if proxy_resp.status_code == 200:
                     txt = proxy_resp.text
                     data2 = json.loads(txt)
@@ -1,3 +1,8 @@
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional
 from .data.data_hushen300 import hushen300_manager
 from .data.data_bond_yield import bond_yield_manager
 from .data.data_gdp import china_gdp_manager
@@ -7,29 +12,116 @@ from .data.data_ppi import china_ppi_manager
 from .data.data_money_supply import china_money_supply_manager
 from .data.data_margin import margin_manager
 from .data.data_listing_committee import listing_committee_manager
-def initialize_data_managers():
-    for m in [
-        hushen300_manager,
-        bond_yield_manager,
-        china_gdp_manager,
-        china_stock_market_manager,
-        china_cpi_manager,
-        china_ppi_manager,
-        china_money_supply_manager,
-        margin_manager,
-        listing_committee_manager,
-    ]:
-        m.init_data()
-def update_all_data():
-    for m in [
-        hushen300_manager,
-        bond_yield_manager,
-        china_gdp_manager,
-        china_stock_market_manager,
-        china_cpi_manager,
-        china_ppi_manager,
-        china_money_supply_manager,
-        margin_manager,
-        listing_committee_manager,
-    ]:
-        m.update_data()
+
+# 名称与 /api/data/<name> 路由保持一致
+DATA_MANAGERS = {
+    'hushen300': hushen300_manager,
+    'bond_yield': bond_yield_manager,
+    'gdp': china_gdp_manager,
+    'stock_market': china_stock_market_manager,
+    'cpi': china_cpi_manager,
+    'ppi': china_ppi_manager,
+    'money_supply': china_money_supply_manager,
+    'margin_account': margin_manager,
+    'listing_committee': listing_committee_manager,
+}
+
+# 后台刷新失败（或上游暂无新数据）后的重试间隔（秒）
+REFRESH_RETRY_INTERVAL = float(os.environ.get('DATA_REFRESH_RETRY_INTERVAL', '1800'))
+
+# 并发刷新的线程数，上游来源互不相同，默认 4 个足够
+REFRESH_MAX_WORKERS = int(os.environ.get('DATA_REFRESH_WORKERS', '4'))
+
+
+def _row_count(manager) -> int:
+    try:
+        return len(manager.get_data() or [])
+    except Exception:
+        return 0
+
+
+def refresh_managers(action: str = 'update', names: Optional[List[str]] = None,
+                     max_workers: Optional[int] = None) -> List[Dict]:
+    """在有界线程池上并发执行各管理器的 update_data()/init_data()
+
+    每个管理器按自身的 refresh_timeout 计时（从真正开始执行算起），
+    超时的任务不再等待，结果中标记为 timeout；返回每个管理器的执行报告。
+    """
+    method = 'init_data' if action == 'init' else 'update_data'
+    targets = [(n, DATA_MANAGERS[n]) for n in (names or DATA_MANAGERS) if n in DATA_MANAGERS]
+    if not targets:
+        return []
+    workers = max(1, min(max_workers or REFRESH_MAX_WORKERS, len(targets)))
+    reports: Dict[str, Dict] = {
+        n: {'name': n, 'action': method, 'status': 'skipped', 'duration_ms': 0.0, 'rows_added': 0, 'error': None}
+        for n, _ in targets
+    }
+    started: Dict[str, float] = {}
+
+    def run(name: str, manager) -> int:
+        started[name] = time.time()
+        before = _row_count(manager)
+        getattr(manager, method)()
+        return _row_count(manager) - before
+
+    # 整体兜底时限：即使所有线程都卡死，也不会无限等待排队中的任务
+    max_timeout = max(m.refresh_timeout for _, m in targets)
+    overall_deadline = time.time() + max_timeout * ((len(targets) + workers - 1) // workers)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='data-refresh')
+    futures = {executor.submit(run, n, m): (n, m) for n, m in targets}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            now = time.time()
+            for fut in done:
+                name, _ = futures[fut]
+                rep = reports[name]
+                rep['duration_ms'] = round((now - started.get(name, now)) * 1000, 2)
+                try:
+                    rep['rows_added'] = fut.result()
+                    rep['status'] = 'ok'
+                except Exception as e:
+                    rep['status'] = 'error'
+                    rep['error'] = str(e)
+                    traceback.print_exc()
+            for fut in list(pending):
+                name, manager = futures[fut]
+                t0 = started.get(name)
+                timed_out = t0 is not None and now - t0 > manager.refresh_timeout
+                if timed_out or now > overall_deadline:
+                    pending.discard(fut)
+                    rep = reports[name]
+                    if t0 is not None:
+                        rep['status'] = 'timeout'
+                        rep['duration_ms'] = round((now - t0) * 1000, 2)
+                        rep['error'] = f'timeout after {manager.refresh_timeout}s'
+                    else:
+                        rep['error'] = 'not started before deadline'
+    finally:
+        # 超时的任务仍在后台线程中运行，这里不阻塞等待它们
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    result = [reports[n] for n, _ in targets]
+    for rep in result:
+        print(f"[Refresh] {rep['name']}.{method}: {rep['status']} {rep['duration_ms']:.2f}ms rows_added={rep['rows_added']}"
+              + (f" error={rep['error']}" if rep['error'] else ''))
+    return result
+
+
+def initialize_data_managers() -> List[Dict]:
+    return refresh_managers('init')
+
+
+def update_all_data() -> List[Dict]:
+    return refresh_managers('update')
+
+
+def schedule_data_refresh(scheduler):
+    """把所有管理器注册到后台调度器：在缓存到期时刷新，未刷新成功则稍后重试"""
+    for name, manager in DATA_MANAGERS.items():
+        def interval(m=manager) -> float:
+            remaining = m.next_refresh_in()
+            return remaining if remaining > 0 else REFRESH_RETRY_INTERVAL
+        scheduler.register(f'data.{name}', manager.update_data, interval, initial_delay=manager.next_refresh_in())
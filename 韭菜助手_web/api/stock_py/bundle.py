@@ -0,0 +1,319 @@
+import re
+import json
+import hashlib
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from .data.base_manager import BaseDataManager
+from .data.data_hushen300 import hushen300_manager
+from .data.data_bond_yield import bond_yield_manager
+from .data.data_gdp import china_gdp_manager
+from .data.data_stock_market import china_stock_market_manager
+from .data.data_cpi import china_cpi_manager
+from .data.data_ppi import china_ppi_manager
+from .data.data_money_supply import china_money_supply_manager
+from .data.data_margin import margin_manager
+from .deal.derived import derived_data
+from .deal.deal_fed import FED_PREMIUM_COLUMNS
+from .data.timeseries import TimeSeries, days_to_strings, rows_to_columns, to_day
+from .series_query import SeriesQuery
+
+# 股票页各板块：名称 -> (数据来源管理器, 取数函数)，名称与 /api/data/<name> 保持一致
+STOCK_SECTIONS: Dict[str, Tuple[List[BaseDataManager], Callable[[], Any]]] = {
+    'hushen300': ([hushen300_manager], hushen300_manager.get_data),
+    'bond_yield': ([bond_yield_manager], bond_yield_manager.get_data),
+    'gdp': ([china_gdp_manager], china_gdp_manager.get_data),
+    'stock_market': ([china_stock_market_manager], china_stock_market_manager.get_data),
+    'buffet': ([china_gdp_manager, china_stock_market_manager], lambda: derived_data.get('buffet')),
+    'fed_premium': ([hushen300_manager, bond_yield_manager], lambda: derived_data.get('fed_premium')),
+    'money_supply': ([china_money_supply_manager], lambda: derived_data.get('money_supply')),
+    'cpi': ([china_cpi_manager], lambda: derived_data.get('cpi')),
+    'ppi': ([china_ppi_manager], lambda: derived_data.get('ppi')),
+    'margin_account': ([margin_manager, hushen300_manager], lambda: derived_data.get('margin_account')),
+}
+
+
+FED_PREMIUM_FIELDS = FED_PREMIUM_COLUMNS
+
+# 响应格式：rows 为 [{'date': ..., <字段>: ...}]，columnar 为 {'date': [...], <字段>: [...]}
+FORMATS = ('rows', 'columnar')
+
+
+def _select_fed_premium(payload: Dict, q: SeriesQuery) -> Dict:
+    out = {}
+    for key, value_field in (('ratio', 'fedPremium'), ('diff', 'riskPremium')):
+        part = payload.get(key) if isinstance(payload, dict) else None
+        if not isinstance(part, dict):
+            out[key] = part
+            continue
+        # 均值/标准差仍按全部历史计算，区间和降采样只影响 data
+        fields = ['close', 'bondYield', 'peg', value_field]
+        out[key] = dict(part, data=q.restrict(fields).apply_rows(part.get('data') or [], value_field))
+    return out
+
+
+def _query_fed_premium(q: SeriesQuery) -> Dict:
+    return _select_fed_premium(derived_data.get('fed_premium'), q)
+
+
+def _query_margin_account(q: SeriesQuery) -> Dict:
+    payload = derived_data.get('margin_account')
+    return q.apply_columns(payload, 'leftSeries') if isinstance(payload, dict) else payload
+
+
+# 支持 start/end/fields/max_points 的时间序列板块：名称 -> 可投影的字段
+SERIES_FIELDS: Dict[str, List[str]] = {
+    'hushen300': ['close', 'peg'],
+    'bond_yield': ['yield'],
+    'fed_premium': FED_PREMIUM_FIELDS,
+    'margin_account': ['leftSeries', 'rightSeries'],
+}
+
+# 名称 -> 按查询取数的函数
+SERIES_QUERIES: Dict[str, Callable[[SeriesQuery], Any]] = {
+    'hushen300': lambda q: q.apply_series(hushen300_manager.get_series(), 'close'),
+    'bond_yield': lambda q: q.apply_series(bond_yield_manager.get_series(), 'yield'),
+    'fed_premium': _query_fed_premium,
+    'margin_account': _query_margin_account,
+}
+
+
+def _fed_premium_columns(q: SeriesQuery) -> Dict:
+    """close/bondYield/peg 只下发一次，ratio/diff 只保留统计值"""
+    result = derived_data.get('fed_premium_series')
+    if not result:
+        return dict(TimeSeries.empty(FED_PREMIUM_COLUMNS).to_columns(), ratio=None, diff=None)
+    columns = q.select(result['series'], 'fedPremium', extra_fields=['riskPremium']).to_columns()
+    return dict(columns, ratio=result['ratio'], diff=result['diff'])
+
+
+def _margin_account_columns(q: SeriesQuery) -> Dict:
+    payload = derived_data.get('margin_account')
+    columns = {'date': payload.get('categories') or []}
+    columns.update((k, v) for k, v in payload.items() if k != 'categories')
+    return q.apply_columns(columns, 'leftSeries', date_key='date')
+
+
+# 列式格式：时间序列板块直接由数组编码，其他板块由记录列表转换
+COLUMNAR_QUERIES: Dict[str, Callable[[SeriesQuery], Any]] = {
+    'hushen300': lambda q: q.select(hushen300_manager.get_series(), 'close').to_columns(),
+    'bond_yield': lambda q: q.select(bond_yield_manager.get_series(), 'yield').to_columns(),
+    'fed_premium': _fed_premium_columns,
+    'margin_account': _margin_account_columns,
+}
+
+
+def parse_format(value: Optional[str]) -> str:
+    value = (value or '').strip() or 'rows'
+    if value not in FORMATS:
+        raise ValueError(f"invalid format: {value}")
+    return value
+
+
+def get_section(name: str, q: Optional[SeriesQuery] = None, fmt: str = 'rows') -> Any:
+    """取单个板块数据；带查询参数时只对时间序列板块生效，其他板块传入查询参数抛 ValueError"""
+    active = q is not None and q.active
+    if active and name not in SERIES_QUERIES:
+        raise ValueError(f"section {name} does not support start/end/fields/max_points")
+    if fmt == 'columnar':
+        if name in COLUMNAR_QUERIES:
+            return COLUMNAR_QUERIES[name](q or SeriesQuery())
+        return rows_to_columns(STOCK_SECTIONS[name][1]())
+    if not active:
+        return STOCK_SECTIONS[name][1]()
+    return SERIES_QUERIES[name](q)
+
+
+# 支持按行增量（?since=）的板块：名称 -> 数据来源的列式缓存，版本号为各缓存版本号以 '_' 连接
+SERIES_STORES = {
+    'hushen300': [hushen300_manager.store],
+    'bond_yield': [bond_yield_manager.store],
+    'fed_premium': [hushen300_manager.store, bond_yield_manager.store],
+    'margin_account': [margin_manager.store, hushen300_manager.store],
+}
+
+# since 取值：0（全量并返回版本号）、日期、行版本号 '<epoch>.<revision>[_...]'、内容版本号 'h<hash>'
+SINCE_PATTERN = re.compile(r'^(0|\d{4}-\d{2}-\d{2}|\d+\.\d+(_\d+\.\d+)*|h[0-9a-f]+)$')
+
+
+def parse_since(value: Optional[str]) -> Optional[str]:
+    value = (value or '').strip()
+    if not value:
+        return None
+    if not SINCE_PATTERN.match(value):
+        raise ValueError(f"invalid since: {value}")
+    return value
+
+
+def _first_changed(stores: List, since: str) -> Tuple[bool, Optional[str]]:
+    """(能否增量, 需要重新下发的第一个日期)；日期为 None 表示没有变化"""
+    if re.match(r'^\d{4}-\d{2}-\d{2}$', since):
+        return True, days_to_strings([to_day(since) + 1])[0]
+    tokens = since.split('_')
+    if since == '0' or len(tokens) != len(stores):
+        return False, None
+    firsts = []
+    for store, token in zip(stores, tokens):
+        ok, first = store.changed_since(token)
+        if not ok:
+            return False, None
+        if first:
+            firsts.append(first)
+    # 派生板块：任一输入在某日变化，该日及之后的结果都可能变化
+    return True, (min(firsts) if firsts else None)
+
+
+def _select(name: str, payload: Any, q: SeriesQuery) -> Any:
+    if isinstance(payload, dict) and 'date' in payload:
+        return q.apply_columns(payload, 'date', date_key='date')
+    if name == 'fed_premium':
+        return _select_fed_premium(payload, q)
+    if isinstance(payload, dict):
+        return q.apply_columns(payload, 'leftSeries')
+    return q.apply_rows(payload, 'date')
+
+
+def _row_count(payload: Any) -> int:
+    if isinstance(payload, list):
+        return len(payload)
+    for key in ('date', 'categories'):
+        if isinstance(payload, dict) and key in payload:
+            return len(payload[key] or [])
+    part = payload.get('ratio') if isinstance(payload, dict) else None
+    return len(part.get('data') or []) if isinstance(part, dict) else 0
+
+
+def content_version(payload: Any) -> str:
+    return 'h' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def get_section_delta(name: str, q: Optional[SeriesQuery], since: str, fmt: str = 'rows') -> Dict[str, Any]:
+    """?since= 的增量响应：{'version', 'delta', 'data', ...}
+
+    未降采样的时间序列板块按行增量：data 只含 from 及之后的行（与原接口结构相同），
+    客户端丢弃本地 from 之后的行再拼上即可，count 为合并后应有的行数；没有变化时 data 为 null。
+    其他板块（以及降采样的结果）按内容版本号：未变化时 data 为 null，否则全量下发（delta 为 false）。
+    """
+    q = q or SeriesQuery()
+    if name in SERIES_STORES and not q.max_points:
+        stores = SERIES_STORES[name]
+        # 先取版本号再取数据：期间数据若有更新，客户端下次会多收到几行，而不会漏掉
+        version = '_'.join(store.version for store in stores)
+        ok, first = _first_changed(stores, since)
+        payload = get_section(name, q, fmt)
+        out = {'version': version, 'delta': ok, 'count': _row_count(payload)}
+        if not ok:
+            out['data'] = payload
+        elif first is None:
+            out['data'] = None
+        else:
+            out['from'] = first
+            out['data'] = _select(name, payload, SeriesQuery(start=first))
+        return out
+    payload = get_section(name, q, fmt)
+    version = content_version(payload)
+    if since == version:
+        return {'version': version, 'delta': True, 'data': None}
+    return {'version': version, 'delta': False, 'data': payload}
+
+
+def parse_series_query(name: str, args: Mapping[str, str], prefix: str = '') -> SeriesQuery:
+    """解析并校验某个板块的查询参数，不合法时抛 ValueError"""
+    q = SeriesQuery.from_args(args, prefix)
+    if q.active:
+        if name not in SERIES_QUERIES:
+            raise ValueError(f"section {name} does not support start/end/fields/max_points")
+        q.check_fields(SERIES_FIELDS[name])
+    return q
+
+
+def parse_section_queries(names: List[str], args: Mapping[str, str]) -> Tuple[Dict[str, SeriesQuery], Dict[str, str]]:
+    """打包接口的分板块查询参数：?fed_premium.start=2016-01-01&fed_premium.max_points=800&hushen300.since=...
+
+    返回 (查询参数, since)
+    """
+    queries, since = {}, {}
+    for name in names:
+        q = parse_series_query(name, args, prefix=name + '.')
+        if q.active:
+            queries[name] = q
+        value = parse_since(args.get(name + '.since'))
+        if value is not None:
+            since[name] = value
+    return queries, since
+
+
+def parse_sections(value: str) -> List[str]:
+    """?sections=a,b,c；为空时返回全部板块，含未知板块时抛 ValueError"""
+    names = [s.strip() for s in (value or '').split(',') if s.strip()]
+    if not names:
+        return list(STOCK_SECTIONS)
+    unknown = [n for n in names if n not in STOCK_SECTIONS]
+    if unknown:
+        raise ValueError(f"unknown sections: {','.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def section_managers(names: List[str]) -> List[BaseDataManager]:
+    managers: List[BaseDataManager] = []
+    for n in names:
+        for m in STOCK_SECTIONS[n][0]:
+            if m not in managers:
+                managers.append(m)
+    return managers
+
+
+def _strip_fed_premium(payload: Dict) -> Dict:
+    if 'date' in payload:
+        return {k: v for k, v in payload.items() if k not in ('close', 'peg')}
+    out = {}
+    for key in ('ratio', 'diff'):
+        part = payload.get(key) if isinstance(payload, dict) else None
+        if not isinstance(part, dict):
+            out[key] = part
+            continue
+        rows = [{k: v for k, v in it.items() if k not in ('close', 'peg')} for it in part.get('data') or []]
+        out[key] = dict(part, data=rows)
+    return out
+
+
+def build_stock_bundle(names: List[str], queries: Optional[Dict[str, SeriesQuery]] = None,
+                       since: Optional[Dict[str, str]] = None, fmt: str = 'rows') -> Dict[str, Any]:
+    """一次返回多个板块的数据，queries 为各时间序列板块的区间/字段/降采样参数，fmt 对所有板块生效
+
+    since 中的板块返回 get_section_delta 的增量结构，省略字段的处理作用在其中的 data 上。
+    同时请求了完整的 hushen300 时，其他板块中与它重复的字段不再重复下发，
+    由 refs 标明需要按日期从 hushen300 还原的字段：
+      fed_premium.ratio/diff.data[].close、peg（列式格式下为 fed_premium.close、peg）
+      margin_account.rightSeries（对应日期的收盘价，没有则为 null）
+    """
+    queries = queries or {}
+    since = since or {}
+    bundle: Dict[str, Any] = {}
+    for name in names:
+        if name in since:
+            bundle[name] = get_section_delta(name, queries.get(name), since[name], fmt)
+        else:
+            bundle[name] = get_section(name, queries.get(name), fmt)
+
+    def payload(name: str) -> Any:
+        return bundle[name]['data'] if name in since else bundle.get(name)
+
+    def replace(name: str, value: Any):
+        if name in since:
+            bundle[name] = dict(bundle[name], data=value)
+        else:
+            bundle[name] = value
+
+    refs: Dict[str, List[str]] = {}
+    if 'hushen300' in bundle and 'hushen300' not in queries:
+        if 'fed_premium' in bundle and getattr(queries.get('fed_premium'), 'fields', None) is None:
+            if isinstance(payload('fed_premium'), dict):
+                replace('fed_premium', _strip_fed_premium(payload('fed_premium')))
+            refs['fed_premium'] = ['close', 'peg']
+        if 'margin_account' in bundle and getattr(queries.get('margin_account'), 'fields', None) is None:
+            margin = payload('margin_account')
+            if isinstance(margin, dict) and 'rightSeries' in margin:
+                replace('margin_account', {k: v for k, v in margin.items() if k != 'rightSeries'})
+            refs['margin_account'] = ['rightSeries']
+    bundle['refs'] = refs
+    return bundle
@@ -1,16 +1,110 @@
 import os
 import time
+import functools
+import threading
+import traceback
 from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from api.common.single_flight import coalesce
+from api.common.cache_store import locked, signatures
+
+# 使用绝对路径，确保在不同目录下运行都能正确找到缓存
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'cache')
+
+def _track_loaded(init):
+    """init_data 读取前记录缓存文件签名，之后据此判断是否需要重新加载"""
+    @functools.wraps(init)
+    def wrapper(self, *args, **kwargs):
+        sig = signatures(self.cache_paths())
+        result = init(self, *args, **kwargs)
+        self._loaded_signature = sig
+        self._mark_updated()
+        return result
+    wrapper.__cache_synced__ = True
+    return wrapper
+
+
+def _cross_process(update):
+    """update_data 在跨进程锁内执行：先加载其他进程已写入的数据，再决定是否请求上游"""
+    @functools.wraps(update)
+    def wrapper(self, *args, **kwargs):
+        paths = self.cache_paths()
+        if not paths:
+            return update(self, *args, **kwargs)
+        with locked(paths[0], timeout=self.refresh_timeout) as acquired:
+            if not acquired:
+                print(f"[Cache] {type(self).__name__}: another process is refreshing, skipped")
+                return None
+            self.reload_if_changed()
+            # 其他进程做过没有新数据的同步时签名不变、不会重新加载，这里单独取同步时间，避免重复请求上游
+            self.last_update_time = max(self.last_update_time, self.last_synced())
+            before = self._loaded_signature
+            result = update(self, *args, **kwargs)
+            self._loaded_signature = signatures(paths)
+            if self._loaded_signature != before:
+                self._mark_updated()
+            return result
+    wrapper.__cache_synced__ = True
+    return wrapper
+
 
 class BaseDataManager:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        init = cls.__dict__.get('init_data')
+        if init is not None and not getattr(init, '__cache_synced__', False):
+            cls.init_data = _track_loaded(init)
+        # 子类的 update_data 统一套上 single-flight：同一数据集同时只会有一次刷新，
+        # 并发的调用方（多个请求、调度器、update_all）等待并共享这一次的结果；
+        # 多进程部署（如 gunicorn 多 worker）下再由文件锁保证同一时间只有一个进程写缓存
+        update = cls.__dict__.get('update_data')
+        if update is not None and not getattr(update, '__coalesced__', False):
+            cls.update_data = coalesce(_cross_process(update))
+
     def __init__(self):
         self.data = []
-        # 使用绝对路径，确保在不同目录下运行都能正确找到缓存
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-        self.cache_dir = os.path.join(base_dir, 'cache')
+        self.cache_dir = CACHE_DIR
         self.last_update_time = 0
         self.update_interval = 3600 * 24  # 默认24小时更新一次
+        self.refresh_timeout = 60  # 并发刷新时单个管理器的超时时间（秒）
+        self._loaded_signature = None
+        # 内存数据每变化一次加 1，派生指标和响应缓存据此判断是否失效
+        self.version = 0
+        self._listeners: List[Callable[['BaseDataManager'], None]] = []
+        self._version_lock = threading.Lock()
         os.makedirs(self.cache_dir, exist_ok=True)
+
+    def add_listener(self, fn: Callable[['BaseDataManager'], None]):
+        """注册数据变化回调（在执行刷新的线程中调用，回调应尽快返回）"""
+        self._listeners.append(fn)
+
+    def _mark_updated(self):
+        with self._version_lock:
+            self.version += 1
+        for fn in list(self._listeners):
+            try:
+                fn(self)
+            except Exception:
+                traceback.print_exc()
+
+    def cache_paths(self) -> List[str]:
+        """持久化文件列表，第一个同时作为跨进程锁的对象；文件签名变化即视为被其他进程更新"""
+        cache_file = getattr(self, 'cache_file', None)
+        return [cache_file] if cache_file else []
+
+    def last_synced(self) -> float:
+        """持久化记录的最近一次成功同步时间（含没有新数据的同步）；没有 store 的管理器返回 0"""
+        store = getattr(self, 'store', None)
+        last_modified = getattr(store, 'last_modified', None)
+        return last_modified() if last_modified is not None else 0
+
+    def reload_if_changed(self) -> bool:
+        """缓存文件被其他进程替换过时重新加载；未变化时只做一次 stat，不重新解析"""
+        paths = self.cache_paths()
+        if not paths or signatures(paths) == self._loaded_signature:
+            return False
+        self.init_data()
+        return True
     
     def should_update(self) -> bool:
         """检查是否需要更新数据"""
@@ -19,6 +113,23 @@ class BaseDataManager:
             return True
         return (time.time() - self.last_update_time) > self.update_interval
 
+    def is_stale(self) -> bool:
+        """数据是否超出允许的陈旧时间（从未更新过也算）"""
+        age = self.data_age()
+        return age is None or age > self.update_interval
+
+    def data_age(self) -> Optional[float]:
+        """当前内存数据距最后一次成功更新的秒数；从未更新过返回 None"""
+        if self.last_update_time == 0:
+            return None
+        return max(0.0, time.time() - self.last_update_time)
+
+    def next_refresh_in(self) -> float:
+        """距离数据按 update_interval 过期还剩多少秒"""
+        if self.last_update_time == 0:
+            return 0.0
+        return max(0.0, self.last_update_time + self.update_interval - time.time())
+
     def update_last_update_time(self, cache_file: str):
         """从缓存文件更新最后更新时间"""
         if os.path.exists(cache_file):
@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import threading
+from typing import List, Dict, Optional, Callable, Tuple
+import numpy as np
+from api.common.cache_store import read_json, write_json, locked, touch_file, mtime_or_zero
+from .timeseries import TimeSeries, days_from_yyyymmdd
+
+
+def encode_date(date: str) -> int:
+    """'2024-01-02' -> 20240102"""
+    return int(date[:10].replace('-', ''))
+
+
+def decode_date(value: int) -> str:
+    """20240102 -> '2024-01-02'"""
+    value = int(value)
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+
+class ColumnarCache:
+    """按交易日存储的列式二进制缓存
+
+    目录结构：
+      meta.json           列名、行数、当前代号
+      date.<gen>.i32      日期列，int32 yyyymmdd，升序
+      <col>.<gen>.f64     数值列，float64
+    读取时用 mmap 映射，启动几乎不拷贝数据；新交易日直接追加到列文件末尾（已映射的范围不变）；
+    已有日期的修订或插入中间日期时整体重写为新一代文件，已发出的 TimeSeries 仍指向旧文件，内容不会在读取中途改变。
+    meta.json 最后写入且以原子替换落盘，行数以它为准，中途崩溃不会读到半截数据。
+
+    meta.json 中同时保存变更日志：每次合并使 revision 加 1，并记录本次最早变化的日期，
+    客户端据此只取某个版本之后变化的行。整体重写（迁移、清空后重建）会换一个新的 epoch，
+    旧 epoch 的版本号不再可用于增量。
+    """
+
+    # 变更日志保留的条数，更早的版本只能全量同步
+    MAX_CHANGES = 512
+
+    def __init__(self, directory: str, columns: List[str], legacy_json: Optional[str] = None,
+                 legacy_filter: Optional[Callable[[Dict], bool]] = None):
+        self.directory = directory
+        self.columns = list(columns)
+        self.legacy_json = legacy_json
+        self.legacy_filter = legacy_filter
+        self.meta_file = os.path.join(directory, 'meta.json')
+        # 没有新数据的同步只更新这个文件的修改时间，不改动 meta.json（其签名变化即视为数据变化）
+        self.synced_file = os.path.join(directory, 'synced')
+        self._lock = threading.RLock()
+        self._count = 0
+        self._gen = 0
+        self._dates = np.empty(0, dtype=np.int32)
+        self._values: Dict[str, np.ndarray] = {c: np.empty(0, dtype=np.float64) for c in self.columns}
+        self._series: Optional[TimeSeries] = None
+        self._epoch = 0
+        self._revision = 0
+        self._changes: List[List[int]] = []  # [[revision, 最早变化日期 yyyymmdd], ...]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _path(self, column: str, gen: int) -> str:
+        suffix = 'i32' if column == 'date' else 'f64'
+        return os.path.join(self.directory, f'{column}.{gen}.{suffix}')
+
+    def _write_meta(self, count: int, gen: int):
+        write_json(self.meta_file, {'columns': self.columns, 'count': count, 'generation': gen,
+                                    'epoch': self._epoch, 'revision': self._revision,
+                                    'changes': self._changes}, indent=None)
+
+    def _record_change(self, first_date: int):
+        self._revision += 1
+        self._changes.append([self._revision, int(first_date)])
+        del self._changes[:-self.MAX_CHANGES]
+
+    @property
+    def version(self) -> str:
+        """当前版本号 '<epoch>.<revision>'"""
+        return f'{self._epoch}.{self._revision}'
+
+    def changed_since(self, version: str) -> Tuple[bool, Optional[str]]:
+        """(能否增量, 该版本之后最早变化的日期)；日期为 None 表示没有变化
+
+        epoch 不同、版本号超前或早于变更日志保留范围时无法增量，返回 (False, None)。
+        """
+        try:
+            epoch, revision = (int(x) for x in str(version).split('.'))
+        except ValueError:
+            return False, None
+        if epoch != self._epoch or revision > self._revision:
+            return False, None
+        if revision == self._revision:
+            return True, None
+        if not self._changes or self._changes[0][0] > revision + 1:
+            return False, None
+        return True, decode_date(min(d for r, d in self._changes if r > revision))
+
+    def _map(self, column: str, dtype, count: int) -> np.ndarray:
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(column, self._gen), dtype=dtype, mode='r', shape=(count,))
+
+    def load(self) -> bool:
+        """映射已有的列文件；没有列式缓存但有旧 JSON 缓存时先做一次迁移"""
+        with self._lock:
+            if not os.path.exists(self.meta_file) and self.legacy_json and os.path.exists(self.legacy_json):
+                # 多个进程同时启动时只由一个进程迁移（锁旧文件，不与正在进行的刷新互相等待）
+                with locked(self.legacy_json):
+                    if not os.path.exists(self.meta_file):
+                        self.migrate_from_json(self.legacy_json)
+            if not os.path.exists(self.meta_file):
+                return False
+            try:
+                meta = read_json(self.meta_file)
+                if meta.get('columns') != self.columns:
+                    raise ValueError(f"column mismatch: {meta.get('columns')}")
+                self._gen = int(meta.get('generation', 0))
+                self._count = int(meta.get('count', 0))
+                self._epoch = int(meta.get('epoch', 0))
+                self._revision = int(meta.get('revision', 0))
+                self._changes = [list(c) for c in meta.get('changes') or []]
+                self._dates = self._map('date', np.int32, self._count)
+                self._values = {c: self._map(c, np.float64, self._count) for c in self.columns}
+                self._series = None
+                return True
+            except Exception as e:
+                print(f"Error loading columnar cache {self.directory}: {e}")
+                self._count = 0
+                self._dates = np.empty(0, dtype=np.int32)
+                self._values = {c: np.empty(0, dtype=np.float64) for c in self.columns}
+                self._series = None
+                return False
+
+    def last_modified(self) -> float:
+        """最近一次成功同步的时间（数据写入或没有新数据的同步）"""
+        return max(mtime_or_zero(self.meta_file), mtime_or_zero(self.synced_file))
+
+    def last_date(self) -> Optional[str]:
+        return decode_date(self._dates[-1]) if self._count else None
+
+    def arrays(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """(日期列, {列名: 数值列})，均为只读映射"""
+        return self._dates, self._values
+
+    def series(self) -> TimeSeries:
+        """TimeSeries 视图：数值列直接引用映射的数组，只有日期列需要转换"""
+        with self._lock:
+            if self._series is None:
+                self._series = TimeSeries(days_from_yyyymmdd(self._dates), self._values)
+            return self._series
+
+    def records(self) -> List[Dict]:
+        """[{'date': ..., <col>: ...}] 列表，按需生成，写入前一直复用"""
+        return self.series().to_records()
+
+    def _to_arrays(self, rows: List[Dict]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        dmap: Dict[int, Dict] = {}
+        for it in rows:
+            if it and it.get('date'):
+                dmap[encode_date(it['date'])] = it
+        keys = sorted(dmap)
+        dates = np.array(keys, dtype=np.int32)
+        values = {c: np.array([float(dmap[k][c]) for k in keys], dtype=np.float64) for c in self.columns}
+        return dates, values
+
+    def write(self, rows: List[Dict]):
+        """整体重写为新一代列文件，开始新的 epoch（之前的版本号全部失效）"""
+        dates, values = self._to_arrays(rows)
+        self._reset_log()
+        self._rewrite(dates, values)
+
+    def _reset_log(self):
+        self._epoch = time.time_ns() // 1000
+        self._revision = 0
+        self._changes = []
+
+    def _rewrite(self, dates: np.ndarray, values: Dict[str, np.ndarray]):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            old_gen = self._gen if os.path.exists(self.meta_file) else None
+            gen = (old_gen + 1) if old_gen is not None else 0
+            for column, arr, dtype in [('date', dates, np.int32)] + [(c, values[c], np.float64) for c in self.columns]:
+                with open(self._path(column, gen), 'wb') as f:
+                    f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._write_meta(len(dates), gen)
+            if old_gen is not None and old_gen != gen:
+                for column in ['date'] + self.columns:
+                    try:
+                        os.remove(self._path(column, old_gen))
+                    except OSError:
+                        pass
+            self._gen = gen
+            self.load()
+
+    def merge(self, rows: List[Dict]) -> int:
+        """按日期合并新数据，返回新增或修订的行数
+
+        - 只有晚于最后日期的行时追加到列文件末尾
+        - 已有日期的值有变化（值不变则跳过）或出现中间缺失的日期时，整体重写为新一代文件
+        """
+        if not rows:
+            return 0
+        new_dates, new_values = self._to_arrays(rows)
+        if len(new_dates) == 0:
+            return 0
+        with self._lock, locked(self.meta_file):
+            if self._count == 0:
+                self._reset_log()
+                self._rewrite(new_dates, new_values)
+                return len(new_dates)
+            last = int(self._dates[-1])
+            tail = new_dates > last
+            head_dates = new_dates[~tail]
+            pos = np.searchsorted(self._dates, head_dates)
+            pos_clip = np.minimum(pos, self._count - 1)
+            exists = self._dates[pos_clip] == head_dates
+            if not exists.all():
+                # 中间插入：合并后整体重写
+                dates = np.concatenate([np.asarray(self._dates), new_dates])
+                order = np.argsort(dates, kind='stable')
+                dates = dates[order]
+                # 同一天以新数据为准：稳定排序后保留每个日期的最后一条
+                keep = np.append(dates[1:] != dates[:-1], True)
+                values = {c: np.concatenate([np.asarray(self._values[c]), new_values[c]])[order][keep] for c in self.columns}
+                # 已有日期的值没有逐一比较，保守地从本次最早的日期算起
+                self._record_change(new_dates[0])
+                self._rewrite(dates[keep], values)
+                return int((~exists).sum() + tail.sum())
+
+            # 已有日期的修订：不能原地写入正被映射的文件（已发出的 TimeSeries、派生数据缓存会在读取中途看到变化），
+            # 在副本上修改后连同新交易日一起写成新一代文件
+            n_tail = int(tail.sum())
+            changed_rows = set()
+            values = {}
+            for c in self.columns:
+                head_vals = new_values[c][~tail]
+                diff = self._values[c][pos] != head_vals
+                if diff.any():
+                    values[c] = np.array(self._values[c])
+                    values[c][pos[diff]] = head_vals[diff]
+                    changed_rows.update(pos[diff].tolist())
+            if changed_rows:
+                dates = np.concatenate([np.asarray(self._dates), new_dates[tail]])
+                values = {c: np.concatenate([values.get(c, self._values[c]), new_values[c][tail]]) for c in self.columns}
+                self._record_change(self._dates[min(changed_rows)])
+                self._rewrite(dates, values)
+                return len(changed_rows) + n_tail
+
+            # 只有新交易日：追加到列文件末尾，最后更新 meta 中的行数
+            if n_tail:
+                count = self._count
+                for column, arr, dtype in [('date', new_dates[tail], np.int32)] + [(c, new_values[c][tail], np.float64) for c in self.columns]:
+                    path = self._path(column, self._gen)
+                    with open(path, 'r+b') as f:
+                        # 丢弃上次崩溃时可能残留的、meta 未记录的尾部数据
+                        f.truncate(count * np.dtype(dtype).itemsize)
+                        f.seek(0, os.SEEK_END)
+                        f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                self._record_change(new_dates[tail][0])
+                self._write_meta(count + n_tail, self._gen)
+                self.load()
+            return n_tail
+
+    def touch(self):
+        """没有新数据时也记录一次同步时间"""
+        if os.path.exists(self.meta_file):
+            touch_file(self.synced_file)
+
+    def migrate_from_json(self, path: str) -> bool:
+        """从旧的 JSON 列表缓存一次性迁移"""
+        try:
+            cached = read_json(path)
+            if not isinstance(cached, list):
+                return False
+            rows = []
+            for it in cached:
+                try:
+                    if not isinstance(it, dict) or not it.get('date'):
+                        continue
+                    row = {'date': it['date']}
+                    for c in self.columns:
+                        row[c] = float(it[c])
+                    if self.legacy_filter is None or self.legacy_filter(row):
+                        rows.append(row)
+                except Exception:
+                    continue
+            if not rows:
+                return False
+            self.write(rows)
+            # 保留旧文件的修改时间，避免迁移后被误认为刚刚更新过
+            os.utime(self.meta_file, (os.path.getatime(path), os.path.getmtime(path)))
+            print(f"Migrated {len(rows)} rows from {os.path.basename(path)} to columnar cache")
+            return True
+        except Exception as e:
+            print(f"Error migrating {path}: {e}")
+            return False
+
+    def export_json(self, path: str):
+        """导出为与旧缓存相同格式的 JSON，便于排查问题"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.records(), f, ensure_ascii=False, indent=2)
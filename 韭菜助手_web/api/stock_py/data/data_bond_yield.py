@@ -1,10 +1,18 @@
 import os
-import json
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from api.common.http_client import http_client
+from api.common.cache_store import load_json, write_json
 from .base_manager import BaseDataManager
+from .columnar_cache import ColumnarCache
+from .timeseries import TimeSeries
+
+# 对 chinabond 的并发请求上限：登记在共享的 http_client 上，所有调用方（调度器、inline 刷新、update_all）合计不超过该值
+CHINABOND_HOST = 'yield.chinabond.com.cn'
+CHINABOND_MAX_CONCURRENCY = int(os.environ.get('CHINABOND_MAX_CONCURRENCY', '4'))
+http_client.set_host_limit(CHINABOND_HOST, CHINABOND_MAX_CONCURRENCY)
 
 def _parse_bond_response(resp_obj) -> List[Dict]:
     if not isinstance(resp_obj, dict):
@@ -28,78 +36,130 @@ def _parse_bond_response(resp_obj) -> List[Dict]:
     return out
 
 class BondYieldDataManager(BaseDataManager):
+    API_URL = 'https://yield.chinabond.com.cn/cbweb-czb-web/czb/historyQuery'
+    INIT_START_DATE = '2012-01-01'
+
     def __init__(self):
         super().__init__()
-        self.bond_yield_data: List[Dict] = []
         self.cache_file = os.path.join(self.cache_dir, 'bond_yield_data.json')
+        # 列式缓存，首次启动时从旧的 JSON 缓存迁移
+        self.store = ColumnarCache(os.path.join(self.cache_dir, 'bond_yield_data.cols'), ['yield'], legacy_json=self.cache_file)
+        # 冷启动需要逐年回补，给足时间
+        self.refresh_timeout = 180
+        # 本次刷新并发拉取的窗口数（跨调用方的总并发由 http_client 的 host 上限保证），及单个窗口的重试策略
+        self.max_concurrency = CHINABOND_MAX_CONCURRENCY
+        self.max_retries = 2
+        # 重试后仍失败的年度窗口，下次刷新时单独补拉
+        self.failed_windows_file = os.path.join(self.cache_dir, 'bond_yield_failed_windows.json')
+
+    @property
+    def bond_yield_data(self) -> List[Dict]:
+        return self.store.records()
+
+    def cache_paths(self) -> List[str]:
+        return [self.store.meta_file]
 
     def init_data(self):
-        self.update_last_update_time(self.cache_file)
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cached_data = json.load(f)
-                    self.bond_yield_data = cached_data if isinstance(cached_data, list) else []
-            except Exception:
-                self.bond_yield_data = []
-        else:
-            self.bond_yield_data = []
+        self.store.load()
+        self.last_update_time = self.store.last_modified()
+
+    def _split_windows(self, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """按自然年切分查询区间（接口单次最多返回一年的数据）"""
+        windows: List[Tuple[str, str]] = []
+        cur_start = datetime.strptime(start_date, '%Y-%m-%d')
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+        while cur_start <= end_dt:
+            cur_end = cur_start.replace(year=cur_start.year + 1) - timedelta(days=1)
+            if cur_end > end_dt:
+                cur_end = end_dt
+            windows.append((self.format_date(cur_start), self.format_date(cur_end)))
+            cur_start = cur_start.replace(year=cur_start.year + 1)
+        return windows
+
+    def _fetch_window(self, window: Tuple[str, str]) -> Optional[List[Dict]]:
+        """获取单个窗口的数据（由共享客户端负责退避重试）；最终失败返回 None"""
+        params = {
+            'startDate': window[0],
+            'endDate': window[1],
+            'gjqx': 0,
+            'locale': 'cn_ZH',
+            'qxmc': 1
+        }
+        try:
+            resp = http_client.get(self.API_URL, params=params, timeout=10, retries=self.max_retries)
+            if resp.status_code == 200:
+                return _parse_bond_response(resp.json())
+        except Exception:
+            pass
+        return None
+
+    def _fetch_windows(self, windows: List[Tuple[str, str]]) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+        """并发获取多个窗口，并发数受 max_concurrency 限制；返回 (数据, 失败窗口)"""
+        rows: List[Dict] = []
+        failed: List[Tuple[str, str]] = []
+        if not windows:
+            return rows, failed
+        workers = max(1, min(self.max_concurrency, len(windows)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chinabond') as executor:
+            for window, result in zip(windows, executor.map(self._fetch_window, windows)):
+                if result is None:
+                    failed.append(window)
+                else:
+                    rows.extend(result)
+        rows.sort(key=lambda x: x['date'])
+        return rows, failed
 
     def fetch_from_api(self, start_date: str, end_date: str) -> List[Dict]:
         try:
-            url = 'https://yield.chinabond.com.cn/cbweb-czb-web/czb/historyQuery'
-            rows: List[Dict] = []
-            cur_start = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            while cur_start <= end_dt:
-                cur_end = cur_start.replace(year=cur_start.year + 1) - timedelta(days=1)
-                if cur_end > end_dt:
-                    cur_end = end_dt
-                params = {
-                    'startDate': self.format_date(cur_start),
-                    'endDate': self.format_date(cur_end),
-                    'gjqx': 0,
-                    'locale': 'cn_ZH',
-                    'qxmc': 1
-                }
-                resp = requests.get(url, params=params, timeout=10)
-                if resp.status_code == 200:
-                    try:
-                        data_obj = resp.json()
-                        rows.extend(_parse_bond_response(data_obj))
-                    except Exception:
-                        pass
-                cur_start = cur_start.replace(year=cur_start.year + 1)
-                time.sleep(0.1)
-            rows.sort(key=lambda x: x['date'])
+            rows, failed = self._fetch_windows(self._split_windows(start_date, end_date))
+            if failed:
+                self._record_failed_windows(self._load_failed_windows() + failed)
             return rows
         except Exception:
             return []
+
+    def _load_failed_windows(self) -> List[Tuple[str, str]]:
+        cached = load_json(self.failed_windows_file, [])
+        return [tuple(w) for w in cached if isinstance(w, list) and len(w) == 2]
+
+    def _record_failed_windows(self, failed: List[Tuple[str, str]]):
+        """记录仍然失败的窗口，下次刷新时只补这些窗口"""
+        try:
+            if failed:
+                write_json(self.failed_windows_file, sorted(set(failed)))
+                print(f"[BondYield] {len(failed)} window(s) failed, will retry next refresh: {failed}")
+            elif os.path.exists(self.failed_windows_file):
+                os.remove(self.failed_windows_file)
+        except Exception:
+            pass
+
     def update_data(self):
         if not self.should_update():
             return
         try:
             if self.bond_yield_data:
                 last_item = self.bond_yield_data[-1] if self.bond_yield_data else None
-                last_date = last_item['date'] if last_item else '2012-01-01'
+                last_date = last_item['date'] if last_item else self.INIT_START_DATE
             else:
-                last_date = '2012-01-01'
+                last_date = self.INIT_START_DATE
             start_date = last_date
             end_date = self.format_date(self.get_yesterday_date())
-            if datetime.strptime(start_date, '%Y-%m-%d') > datetime.strptime(end_date, '%Y-%m-%d'):
+            windows = self._load_failed_windows()
+            if datetime.strptime(start_date, '%Y-%m-%d') <= datetime.strptime(end_date, '%Y-%m-%d'):
+                windows.extend(self._split_windows(start_date, end_date))
+            if not windows:
                 return
-            new_data = self.fetch_from_api(start_date, end_date)
+            new_data, failed = self._fetch_windows(sorted(set(windows)))
+            self._record_failed_windows(failed)
             if not new_data:
                 return
-            date_map = {it['date']: it for it in self.bond_yield_data}
-            for it in new_data:
-                date_map[it['date']] = it
-            self.bond_yield_data = sorted(list(date_map.values()), key=lambda x: x['date'])
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.bond_yield_data, f, ensure_ascii=False, indent=2)
+            self.store.merge(new_data)
+            self.store.touch()
             self.last_update_time = time.time()
         except Exception:
             pass
     def get_data(self) -> List[Dict]:
         return self.bond_yield_data
+    def get_series(self) -> TimeSeries:
+        return self.store.series()
 bond_yield_manager = BondYieldDataManager()
@@ -1,46 +1,38 @@
 import os
-import json
-import requests
 import time
 from datetime import datetime
 from typing import List, Dict
+from api.common.http_client import http_client
 from .base_manager import BaseDataManager
+from .columnar_cache import ColumnarCache
+from .timeseries import TimeSeries
 class Hushen300DataManager(BaseDataManager):
     def __init__(self):
         super().__init__()
-        self.hushen300_data: List[Dict] = []
         self.cache_file = os.path.join(self.cache_dir, 'hushen300_data.json')
+        # 列式缓存，首次启动时从旧的 JSON 缓存迁移
+        self.store = ColumnarCache(os.path.join(self.cache_dir, 'hushen300_data.cols'), ['close', 'peg'],
+                                   legacy_json=self.cache_file, legacy_filter=self.is_sane)
         self.INIT_START_DATE = '2012-01-04'
+    @staticmethod
+    def is_sane(it: Dict) -> bool:
+        """过滤明显异常的行（peg 超出 0~100 或收盘价非正）"""
+        return 0 <= it['peg'] <= 100 and it['close'] > 0
+    @property
+    def hushen300_data(self) -> List[Dict]:
+        return self.store.records()
+    def cache_paths(self) -> List[str]:
+        return [self.store.meta_file]
     def init_data(self):
-        if os.path.exists(self.cache_file):
-            try:
-                self.last_update_time = os.path.getmtime(self.cache_file)
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cached_data = json.load(f)
-                    if isinstance(cached_data, list):
-                        sane = []
-                        for it in cached_data:
-                            try:
-                                peg_v = float(it.get('peg', 0)) if it.get('peg') is not None else 0.0
-                                close_v = float(it.get('close', 0)) if it.get('close') is not None else 0.0
-                                if 0 <= peg_v <= 100 and close_v > 0:
-                                    sane.append({'date': it.get('date'), 'close': close_v, 'peg': peg_v})
-                            except Exception:
-                                continue
-                        self.hushen300_data = sane if len(sane) >= max(1, int(len(cached_data) * 0.5)) else []
-                    else:
-                        self.hushen300_data = []
-            except Exception:
-                self.hushen300_data = []
-        else:
-            self.hushen300_data = []
+        self.store.load()
+        self.last_update_time = self.store.last_modified()
     def fetch_from_api(self, start_date: str, end_date: str) -> List[Dict]:
         try:
             start_date_str = start_date.replace('-', '')
             end_date_str = end_date.replace('-', '')
             url = 'https://www.csindex.com.cn/csindex-home/perf/index-perf'
             params = {'indexCode': 'H00300', 'startDate': start_date_str, 'endDate': end_date_str}
-            resp = requests.get(url, params=params)
+            resp = http_client.get(url, params=params)
             if resp.status_code != 200:
                 return []
             data = resp.json()
@@ -79,19 +71,6 @@ class Hushen300DataManager(BaseDataManager):
         parsed = list(date_map.values())
         parsed.sort(key=lambda x: x['date'])
         return parsed
-    def merge_by_date(self, old_arr: List[Dict], new_arr: List[Dict]) -> List[Dict]:
-        date_map: Dict[str, Dict] = {}
-        if old_arr:
-            for it in old_arr:
-                if it and 'date' in it:
-                    date_map[it['date']] = it
-        if new_arr:
-            for it in new_arr:
-                if it and 'date' in it:
-                    date_map[it['date']] = it
-        result = list(date_map.values())
-        result.sort(key=lambda x: x['date'])
-        return result
     def update_data(self):
         if not self.should_update():
             return
@@ -105,15 +84,16 @@ class Hushen300DataManager(BaseDataManager):
             end_date = self.format_date(self.get_yesterday_date())
             if datetime.strptime(start_date, '%Y-%m-%d') > datetime.strptime(end_date, '%Y-%m-%d'):
                 return
-            new_data = self.fetch_from_api(start_date, end_date)
+            new_data = [it for it in self.fetch_from_api(start_date, end_date) if self.is_sane(it)]
             if not new_data:
                 return
-            self.hushen300_data = self.merge_by_date(self.hushen300_data, new_data)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.hushen300_data, f, ensure_ascii=False, indent=2)
+            self.store.merge(new_data)
+            self.store.touch()
             self.last_update_time = time.time()
         except Exception:
             pass
     def get_data(self) -> List[Dict]:
         return self.hushen300_data
+    def get_series(self) -> TimeSeries:
+        return self.store.series()
 hushen300_manager = Hushen300DataManager()
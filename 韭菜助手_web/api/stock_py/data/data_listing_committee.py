@@ -1,30 +1,56 @@
 import os
 import json
-import requests
 import time
 import re
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from api.common.http_client import http_client, BROWSER_USER_AGENT
+from api.common.cache_store import load_json, write_json
 from .base_manager import BaseDataManager
+from .listing_committee_store import ListingCommitteeStore
 
 class ListingCommitteeDataManager(BaseDataManager):
+    SSE_HEADERS = {
+        'Referer': 'https://www.sse.com.cn/',
+        'User-Agent': BROWSER_USER_AGENT
+    }
+    SZSE_HEADERS = {
+        'Referer': 'https://listing.szse.cn/',
+        'User-Agent': BROWSER_USER_AGENT
+    }
+
     def __init__(self):
         super().__init__()
-        self.audit_data: List[Dict] = []
         self.cache_file = os.path.join(self.cache_dir, 'listing_committee_data.json')
+        # 快照沿用原缓存文件，新增记录追加到日志文件，定期压缩回快照
+        self.store = ListingCommitteeStore(self.cache_file, os.path.join(self.cache_dir, 'listing_committee_data.log.jsonl'))
         # 设置更新间隔为 12 小时，上市委信息更新频率较高
         self.update_interval = 3600 * 12
+        # 需要翻页并逐条查询详情，耗时较长
+        self.refresh_timeout = 180
+        # fileId -> 审核类型、dfid -> 公告详情 的持久化缓存，同一详情只查询一次
+        self.lookup_file = os.path.join(self.cache_dir, 'listing_committee_lookups.json')
+        self.lookups: Dict[str, Dict] = self._load_lookups()
+        self._lookups_dirty = False
+        # 每个交易所查询详情的最大并发数（礼貌访问）
+        self.detail_concurrency = {
+            'SSE': int(os.environ.get('SSE_MAX_CONCURRENCY', '4')),
+            'SZSE': int(os.environ.get('SZSE_MAX_CONCURRENCY', '4')),
+        }
+
+    @property
+    def audit_data(self) -> List[List[Dict]]:
+        return self.store.groups()
+
+    def cache_paths(self) -> List[str]:
+        return [self.store.snapshot_file, self.store.log_file]
 
     def init_data(self):
-        if os.path.exists(self.cache_file):
-            try:
-                self.last_update_time = os.path.getmtime(self.cache_file)
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cached = json.load(f)
-                    self.audit_data = cached if isinstance(cached, list) else []
-            except Exception:
-                self.audit_data = []
-        else:
-            self.audit_data = []
+        try:
+            self.store.load()
+            self.last_update_time = self.store.last_modified()
+        except Exception as e:
+            print(f"Error loading listing committee data: {e}")
 
     def _extract_jsonp(self, text: str) -> Dict[str, Any]:
         """提取 JSONP 中的 JSON 数据"""
@@ -41,14 +67,7 @@ class ListingCommitteeDataManager(BaseDataManager):
 
     def _get_last_date(self, source: str) -> str:
         """获取指定市场的最后更新日期"""
-        latest_date = "2025-01-01"  # 默认起始日期
-        for group in self.audit_data:
-            for item in group:
-                if item.get('source') == source:
-                    date = item.get('fileUpdateTime', '')
-                    if date > latest_date:
-                        latest_date = date
-        return latest_date
+        return self.store.latest_date(source, "2025-01-01")  # 默认起始日期
 
     def fetch_from_api(self) -> List[Dict]:
         """从上交所和深交所接口获取上市委审核信息 (增量更新)"""
@@ -68,52 +87,16 @@ class ListingCommitteeDataManager(BaseDataManager):
             szse_last_date = self._get_last_date('SZSE')
             print(f"Fetching SZSE data from {szse_last_date} to {today}")
             new_szse_items = self._fetch_szse_data_range(szse_last_date, today)
+            self._save_lookups()
             
-            # 4. 合并并去重
-            # 先将现有数据打平
-            all_items = []
-            for group in self.audit_data:
-                all_items.extend(group)
-            
-            # 加入新数据
-            all_items.extend(new_sse_items)
-            all_items.extend(new_szse_items)
-            
-            # 去重 (使用 fileId)
-            seen_ids = set()
-            unique_items = []
-            # 按时间倒序排，确保保留最新的（如果有重复 ID 但内容不同的话，虽然理论上 ID 唯一）
-            all_items.sort(key=lambda x: x.get('fileUpdateTime', ''), reverse=True)
-            for item in all_items:
-                fid = item.get('fileId')
-                if fid not in seen_ids:
-                    unique_items.append(item)
-                    seen_ids.add(fid)
-            
-            # 5. 重新按公司分组
-            company_groups = {}
-            for item in unique_items:
-                name = item.get('companyName', '未知公司')
-                if name not in company_groups:
-                    company_groups[name] = []
-                company_groups[name].append(item)
-            
-            # 6. 对每个分组内的条目按时间排序
-            final_groups = []
-            for name in company_groups:
-                group = company_groups[name]
-                group.sort(key=lambda x: x.get('fileUpdateTime', ''), reverse=True)
-                final_groups.append(group)
-            
-            # 7. 对所有分组按其最新一条的时间排序
-            final_groups.sort(key=lambda x: x[0].get('fileUpdateTime', ''), reverse=True)
+            # 4. 按 fileId 增量合并，只追加有变化的记录
+            changed = self.store.merge(new_sse_items + new_szse_items)
+            print(f"Listing committee: {changed} new/updated item(s), {len(self.store)} total")
 
-            if final_groups:
-                self.audit_data = final_groups
-                with open(self.cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.audit_data, f, ensure_ascii=False, indent=4)
+            if len(self.store):
+                self.store.touch()
                 self.last_update_time = time.time()
-            
+
             return self.audit_data
 
         except Exception as e:
@@ -122,34 +105,88 @@ class ListingCommitteeDataManager(BaseDataManager):
             traceback.print_exc()
             return self.audit_data
 
+    def update_data(self):
+        if not self.should_update():
+            return
+        self.fetch_from_api()
+
+    def get_data(self) -> List[Dict]:
+        return self.audit_data
+
+    def _resolve_concurrently(self, keys: List[str], fetch_one, workers: int) -> Dict[str, Any]:
+        """在有限并发下批量查询详情，返回查询成功的 key -> 结果"""
+        found: Dict[str, Any] = {}
+        if not keys:
+            return found
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(keys))), thread_name_prefix='listing-detail') as executor:
+            for key, result in zip(keys, executor.map(fetch_one, keys)):
+                if result is not None:
+                    found[key] = result
+        return found
+
+    def _fetch_sse_audit_type(self, fid: str) -> Optional[str]:
+        """查询上交所单个文件对应的审核类型；失败或无结果返回 None（不写入缓存，下次重试）"""
+        ts = int(time.time() * 1000)
+        url = f"https://query.sse.com.cn/sseQuery/commonSoaQuery.do?&jsonCallBack=jsonpCallback{ts}&sqlId=GP_COMMITTEE_ISSUER_ORDER&fileId={fid}&_={ts}"
+        try:
+            resp = http_client.get(url, headers=self.SSE_HEADERS, timeout=5)
+            if resp.status_code != 200:
+                return None
+            details = self._extract_jsonp(resp.text).get('result', [])
+            if not details:
+                return None
+            audit_type_val = str(details[0].get('auditType', ''))
+            if audit_type_val == "1":
+                return "主板IPO"
+            if audit_type_val == "3":
+                return "再融资"
+            return "其他"
+        except Exception as e:
+            print(f"SSE audit type fetch error for {fid}: {e}")
+            return None
+
+    def _fetch_szse_detail(self, dfid: str) -> Optional[Dict]:
+        """查询深交所单个会议公告详情，只保留用到的字段"""
+        url = f"https://listing.szse.cn/api/ras/ANNCNotice/queryMeetingNoticeDetail?id={dfid}&random={time.time()}"
+        try:
+            resp = http_client.get(url, headers=self.SZSE_HEADERS, timeout=5)
+            if resp.status_code != 200:
+                return None
+            detail = resp.json().get('data') or {}
+            return {
+                'dftitle': detail.get('dftitle'),
+                'ddt': detail.get('ddt'),
+                'projects': [{'cmpnm': p.get('cmpnm'), 'cmpsnm': p.get('cmpsnm'), 'biztype': p.get('biztype')}
+                             for p in detail.get('projects') or []],
+                'subInfoDisclosureList': [{'dfid': d.get('dfid'), 'dftitle': d.get('dftitle'), 'ddt': d.get('ddt')}
+                                          for d in detail.get('subInfoDisclosureList') or []],
+            }
+        except Exception as e:
+            print(f"SZSE detail fetch error for {dfid}: {e}")
+            return None
+
     def _fetch_sse_data_range(self, start_date: str, end_date: str) -> List[Dict]:
         """获取上交所指定日期范围内的全量数据"""
         # 尝试使用带连字符的日期格式，与用户提供的 URL 一致
         begin_date = start_date
         finish_date = end_date
-        
-        all_processed_items = []
-        headers = {
-            'Referer': 'https://www.sse.com.cn/',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        
-        audit_type_cache = {}
+
+        raw_items = []
         page_no = 1
-        
+
         while True:
             timestamp = int(time.time() * 1000)
             url = f"https://query.sse.com.cn/commonSoaQuery.do?jsonCallBack=jsonpCallback{timestamp}&isPagination=true&sqlId=GP_COMMITTEE_FILE_BATCH_SEARCH&pageHelp.pageSize=25&pageHelp.pageNo={page_no}&pageHelp.beginPage={page_no}&pageHelp.cacheSize=1&pageHelp.endPage={page_no}&fileTypeMap=I2010%2CI2011%2CI2021%2CI2020%2CS2010%2CS2020%2CT2010%2CT2020&companyName=&searchDateBegin={begin_date}&searchDateEnd={finish_date}&_={timestamp}"
-            
+
             try:
-                resp = requests.get(url, headers=headers, timeout=15)
+                resp = http_client.get(url, headers=self.SSE_HEADERS, timeout=15)
                 if resp.status_code != 200:
                     break
 
                 data = self._extract_jsonp(resp.text)
                 if not isinstance(data, dict):
                     break
-                
+
                 # 处理 result 可能为 null 的情况
                 groups = data.get('result') or []
                 if not groups:
@@ -159,76 +196,62 @@ class ListingCommitteeDataManager(BaseDataManager):
                         finish_date = finish_date.replace('-', '')
                         continue
                     break
-                
+
                 new_items_count = 0
                 for group in groups:
                     if not isinstance(group, list):
                         group = [group]
-                    
                     for item in group:
-                        fid = item.get('fileId')
-                        if not fid: continue
-                        
-                        # 获取审核类型详情
-                        audit_type_str = audit_type_cache.get(fid)
-                        if not audit_type_str:
-                            ts = int(time.time() * 1000)
-                            url2 = f"https://query.sse.com.cn/sseQuery/commonSoaQuery.do?&jsonCallBack=jsonpCallback{ts}&sqlId=GP_COMMITTEE_ISSUER_ORDER&fileId={fid}&_={ts}"
-                            try:
-                                resp2 = requests.get(url2, headers=headers, timeout=5)
-                                if resp2.status_code == 200:
-                                    data2 = self._extract_jsonp(resp2.text)
-                                    details = data2.get('result', [])
-                                    if details:
-                                        audit_type_val = str(details[0].get('auditType', ''))
-                                        if audit_type_val == "1": audit_type_str = "主板IPO"
-                                        elif audit_type_val == "3": audit_type_str = "再融资"
-                                        else: audit_type_str = "其他"
-                                    audit_type_cache[fid] = audit_type_str
-                                time.sleep(0.05)
-                            except: audit_type_str = "未知"
-
-                        raw_time = item.get('fileUpdateTime', '')
-                        formatted_time = f"{raw_time[:4]}-{raw_time[4:6]}-{raw_time[6:8]}" if len(raw_time) >= 8 else ""
-
-                        all_processed_items.append({
-                            'companyName': item.get('companyName'),
-                            'auditType': audit_type_str or "未知",
-                            'fileTitle': item.get('fileTitle'),
-                            'fileUpdateTime': formatted_time,
-                            'fileId': fid,
-                            'source': 'SSE'
-                        })
+                        if not item.get('fileId'):
+                            continue
+                        raw_items.append(item)
                         new_items_count += 1
-                
-                # 如果当前页没有新数据，或者数据量小于 pageSize，说明拿完了
+
+                # 如果当前页没有新数据，说明拿完了
                 if new_items_count == 0:
                     break
-                
+
                 page_no += 1
                 time.sleep(0.2) # 稍微慢一点，防止被封
             except Exception as e:
                 print(f"SSE fetch range error at page {page_no}: {e}")
                 break
-                
+
+        # 审核类型：先查持久化缓存，未命中的再并发查询
+        audit_types = self.lookups.setdefault('sse_audit_type', {})
+        missing = list(dict.fromkeys(str(it['fileId']) for it in raw_items if str(it['fileId']) not in audit_types))
+        found = self._resolve_concurrently(missing, self._fetch_sse_audit_type, self.detail_concurrency['SSE'])
+        if found:
+            audit_types.update(found)
+            self._lookups_dirty = True
+        print(f"SSE audit types: {len(found)} fetched, {len(missing) - len(found)} unresolved, {len(raw_items) - len(missing)} cached")
+
+        all_processed_items = []
+        for item in raw_items:
+            fid = item.get('fileId')
+            raw_time = item.get('fileUpdateTime', '')
+            formatted_time = f"{raw_time[:4]}-{raw_time[4:6]}-{raw_time[6:8]}" if len(raw_time) >= 8 else ""
+            all_processed_items.append({
+                'companyName': item.get('companyName'),
+                'auditType': audit_types.get(str(fid)) or "未知",
+                'fileTitle': item.get('fileTitle'),
+                'fileUpdateTime': formatted_time,
+                'fileId': fid,
+                'source': 'SSE'
+            })
         return all_processed_items
 
     def _fetch_szse_data_range(self, start_date: str, end_date: str) -> List[Dict]:
         """获取深交所指定日期范围内的全量数据"""
-        all_processed_items = []
-        headers = {
-            'Referer': 'https://listing.szse.cn/',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        
+        notices = []
         page_index = 0
         page_size = 20 # 增加每页数量减少请求次数
-        
+
         while True:
             url = f"https://listing.szse.cn/api/ras/ANNCNotice/queryMeetingNotice?pageIndex={page_index}&pageSize={page_size}&catalog=5&keywords=&disclosedStartDate={start_date}&disclosedEndDate={end_date}&random={time.time()}"
-            
+
             try:
-                resp = requests.get(url, headers=headers, timeout=15)
+                resp = http_client.get(url, headers=self.SZSE_HEADERS, timeout=15)
                 if resp.status_code != 200:
                     break
 
@@ -236,62 +259,75 @@ class ListingCommitteeDataManager(BaseDataManager):
                 items = data.get('data', [])
                 if not items:
                     break
-                
-                for item in items:
-                    dfid = item.get('dfid')
-                    if not dfid: continue
-                    
-                    # 获取详情
-                    url2 = f"https://listing.szse.cn/api/ras/ANNCNotice/queryMeetingNoticeDetail?id={dfid}&random={time.time()}"
-                    try:
-                        resp2 = requests.get(url2, headers=headers, timeout=5)
-                        if resp2.status_code == 200:
-                            detail_data = resp2.json()
-                            detail = detail_data.get('data', {})
-                            projects = detail.get('projects', [])
-                            disclosures = detail.get('subInfoDisclosureList', [])
-                            
-                            for proj in projects:
-                                company_name = proj.get('cmpnm') or proj.get('cmpsnm')
-                                biz_type_val = proj.get('biztype')
-                                audit_type_str = "主板IPO" if biz_type_val == 1 else ("再融资" if biz_type_val == 2 else "其他")
-                                
-                                # 1. 添加主公告
-                                all_processed_items.append({
-                                    'companyName': company_name,
-                                    'auditType': audit_type_str,
-                                    'fileTitle': detail.get('dftitle') or item.get('dftitle'),
-                                    'fileUpdateTime': detail.get('ddt') or item.get('ddt'),
-                                    'fileId': str(dfid),
-                                    'source': 'SZSE'
-                                })
-                                
-                                # 2. 添加子公告
-                                for disc in disclosures:
-                                    sub_dfid = disc.get('dfid')
-                                    if not disc.get('dftitle') or not sub_dfid: continue
-                                    all_processed_items.append({
-                                        'companyName': company_name,
-                                        'auditType': audit_type_str,
-                                        'fileTitle': disc.get('dftitle'),
-                                        'fileUpdateTime': disc.get('ddt') or detail.get('ddt'),
-                                        'fileId': str(sub_dfid),
-                                        'source': 'SZSE'
-                                    })
-                        time.sleep(0.05)
-                    except Exception as e:
-                        print(f"SZSE detail fetch error for {dfid}: {e}")
+                notices.extend(it for it in items if it.get('dfid'))
 
                 total_page = data.get('totalPage', 0)
                 if page_index + 1 >= total_page:
                     break
-                    
+
                 page_index += 1
                 time.sleep(0.2)
             except Exception as e:
                 print(f"SZSE fetch range error at page {page_index}: {e}")
                 break
-                
+
+        # 公告详情：先查持久化缓存，未命中的再并发查询
+        details = self.lookups.setdefault('szse_detail', {})
+        missing = list(dict.fromkeys(str(it['dfid']) for it in notices if str(it['dfid']) not in details))
+        found = self._resolve_concurrently(missing, self._fetch_szse_detail, self.detail_concurrency['SZSE'])
+        if found:
+            details.update(found)
+            self._lookups_dirty = True
+        print(f"SZSE details: {len(found)} fetched, {len(missing) - len(found)} unresolved, {len(notices) - len(missing)} cached")
+
+        all_processed_items = []
+        for item in notices:
+            dfid = item.get('dfid')
+            detail = details.get(str(dfid))
+            if detail is None:
+                continue
+            disclosures = detail.get('subInfoDisclosureList', [])
+            for proj in detail.get('projects', []):
+                company_name = proj.get('cmpnm') or proj.get('cmpsnm')
+                biz_type_val = proj.get('biztype')
+                audit_type_str = "主板IPO" if biz_type_val == 1 else ("再融资" if biz_type_val == 2 else "其他")
+
+                # 1. 添加主公告
+                all_processed_items.append({
+                    'companyName': company_name,
+                    'auditType': audit_type_str,
+                    'fileTitle': detail.get('dftitle') or item.get('dftitle'),
+                    'fileUpdateTime': detail.get('ddt') or item.get('ddt'),
+                    'fileId': str(dfid),
+                    'source': 'SZSE'
+                })
+
+                # 2. 添加子公告
+                for disc in disclosures:
+                    sub_dfid = disc.get('dfid')
+                    if not disc.get('dftitle') or not sub_dfid: continue
+                    all_processed_items.append({
+                        'companyName': company_name,
+                        'auditType': audit_type_str,
+                        'fileTitle': disc.get('dftitle'),
+                        'fileUpdateTime': disc.get('ddt') or detail.get('ddt'),
+                        'fileId': str(sub_dfid),
+                        'source': 'SZSE'
+                    })
+
         return all_processed_items
 
+    def _load_lookups(self) -> Dict[str, Dict]:
+        cached = load_json(self.lookup_file, {})
+        return cached if isinstance(cached, dict) else {}
+
+    def _save_lookups(self):
+        if not self._lookups_dirty:
+            return
+        try:
+            write_json(self.lookup_file, self.lookups, indent=None)
+            self._lookups_dirty = False
+        except Exception as e:
+            print(f"Error saving listing committee lookups: {e}")
+
 listing_committee_manager = ListingCommitteeDataManager()
@@ -1,86 +1,141 @@
 import os
-import json
-import requests
 import time
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from api.common.http_client import http_client
 from .base_manager import BaseDataManager
+from .columnar_cache import ColumnarCache
+from .timeseries import TimeSeries
 class MarginAccountDataManager(BaseDataManager):
+    API_URL = 'https://datacenter-web.eastmoney.com/api/data/v1/get'
+    # 只请求实际用到的列
+    COLUMNS = 'STATISTICS_DATE,FIN_BALANCE,LOAN_BALANCE'
+
     def __init__(self):
         super().__init__()
-        self.margin_data: List[Dict] = []
         self.cache_file = os.path.join(self.cache_dir, 'margin_account_data.json')
+        # 列式缓存，首次启动时从旧的 JSON 缓存迁移
+        self.store = ColumnarCache(os.path.join(self.cache_dir, 'margin_account_data.cols'), ['fin_balance', 'loan_balance'],
+                                   legacy_json=self.cache_file)
+        # 日常增量用小页，一次请求即可覆盖；超过 max_incremental_pages 仍未重叠则改为全量回补
+        self.incremental_page_size = 50
+        self.max_incremental_pages = 5
+        self.backfill_page_size = 500
+        self.max_concurrency = int(os.environ.get('EASTMONEY_MAX_CONCURRENCY', '4'))
+    @property
+    def margin_data(self) -> List[Dict]:
+        return self.store.records()
+    def cache_paths(self) -> List[str]:
+        return [self.store.meta_file]
     def init_data(self):
-        if os.path.exists(self.cache_file):
+        self.store.load()
+        self.last_update_time = self.store.last_modified()
+    def _fetch_page(self, page: int, page_size: int) -> Optional[Tuple[List[Dict], int]]:
+        """获取一页原始数据（按日期倒序），返回 (行, 总页数)；失败返回 None"""
+        params = {
+            'reportName': 'RPTA_WEB_MARGIN_DAILYTRADE',
+            'columns': self.COLUMNS,
+            'sortColumns': 'STATISTICS_DATE',
+            'sortTypes': '-1',
+            'pageSize': str(page_size),
+            'pageNumber': str(page),
+            'source': 'WEB',
+            'client': 'WEB'
+        }
+        try:
+            resp = http_client.get(self.API_URL, params=params, timeout=10)
+            if resp.status_code != 200:
+                return None
+            obj = resp.json()
+        except Exception:
+            return None
+        total_pages = 1
+        raw: List[Dict] = []
+        if isinstance(obj, dict) and isinstance(obj.get('result'), dict):
+            pages_val = obj['result'].get('pages')
             try:
-                self.last_update_time = os.path.getmtime(self.cache_file)
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cached = json.load(f)
-                    self.margin_data = cached if isinstance(cached, list) else []
+                total_pages = int(pages_val) if pages_val is not None else 1
             except Exception:
-                self.margin_data = []
-        else:
-            self.margin_data = []
-    def fetch_from_api(self) -> List[Dict]:
-        try:
-            url = 'https://datacenter-web.eastmoney.com/api/data/v1/get'
-            base_params = {
-                'reportName': 'RPTA_WEB_MARGIN_DAILYTRADE',
-                'columns': 'ALL',
-                'sortColumns': 'STATISTICS_DATE',
-                'sortTypes': '-1',
-                'pageSize': '500',
-                'source': 'WEB',
-                'client': 'WEB'
-            }
-            # first request to get total pages
-            first = requests.get(url, params={**base_params, 'pageNumber': '1'}, timeout=10)
-            if first.status_code != 200:
-                return []
+                total_pages = 1
+            if isinstance(obj['result'].get('data'), list):
+                raw = obj['result']['data']
+        elif isinstance(obj, dict) and isinstance(obj.get('data'), list):
+            raw = obj['data']
+        return self._normalize(raw), total_pages
+
+    def _normalize(self, raw: List[Dict]) -> List[Dict]:
+        out: List[Dict] = []
+        for it in raw:
+            ds = it.get('STATISTICS_DATE')
+            fin = it.get('FIN_BALANCE')
+            loan = it.get('LOAN_BALANCE')
             try:
-                first_obj = first.json()
+                fin_v = float(fin) if fin is not None else None
             except Exception:
+                fin_v = None
+            try:
+                loan_v = float(loan) if loan is not None else None
+            except Exception:
+                loan_v = None
+            if isinstance(ds, str) and fin_v is not None and loan_v is not None:
+                if len(ds) == 8 and ds.isdigit():
+                    date = f"{ds[:4]}-{ds[4:6]}-{ds[6:8]}"
+                else:
+                    date = ds[:10]
+                out.append({'date': date, 'fin_balance': fin_v, 'loan_balance': loan_v})
+        return out
+
+    def _fetch_incremental(self, since: str) -> Optional[List[Dict]]:
+        """从最新一页往前翻，遇到与缓存最后日期重叠的页即停止
+
+        中途有页失败或翻页过多时返回 None 改走全量回补：只合并已取到的较新几页会让缓存的最后日期前移，
+        中间缺的日期之后的增量再也不会去取。
+        """
+        rows: List[Dict] = []
+        for page in range(1, self.max_incremental_pages + 1):
+            result = self._fetch_page(page, self.incremental_page_size)
+            if result is None:
+                return None
+            page_rows, total_pages = result
+            rows.extend(page_rows)
+            if not page_rows or page >= total_pages:
+                return rows
+            if min(it['date'] for it in page_rows) <= since:
+                return rows
+        return None
+
+    def _fetch_backfill(self) -> Optional[List[Dict]]:
+        """全量回补：第一页拿到总页数后，其余页并发获取
+
+        任一页失败即返回 None，本次不写入：跳过失败页合并其余页会在历史中留下缺口，
+        且最后日期前移后增量模式不会再去取缺失的日期。
+        """
+        first = self._fetch_page(1, self.backfill_page_size)
+        if first is None:
+            return None
+        rows, total_pages = first
+        if total_pages > 1:
+            pages = list(range(2, total_pages + 1))
+            workers = max(1, min(self.max_concurrency, len(pages)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='margin-page') as executor:
+                results = list(executor.map(lambda p: self._fetch_page(p, self.backfill_page_size), pages))
+            if any(result is None for result in results):
+                return None
+            for result in results:
+                rows.extend(result[0])
+        return rows
+
+    def fetch_from_api(self, since: Optional[str] = None) -> List[Dict]:
+        """since 为缓存中最后的日期时走增量模式，否则全量回补"""
+        try:
+            out = self._fetch_incremental(since) if since else None
+            if out is None:
+                out = self._fetch_backfill()
+            if out is None:
                 return []
-            total_pages = 1
-            if isinstance(first_obj, dict) and isinstance(first_obj.get('result'), dict):
-                pages_val = first_obj['result'].get('pages')
-                try:
-                    total_pages = int(pages_val) if pages_val is not None else 1
-                except Exception:
-                    total_pages = 1
-            # collect all pages
-            all_raw: List[Dict] = []
-            for page in range(1, max(1, total_pages) + 1):
-                resp = requests.get(url, params={**base_params, 'pageNumber': str(page)}, timeout=10)
-                if resp.status_code != 200:
-                    continue
-                try:
-                    obj = resp.json()
-                except Exception:
-                    continue
-                if isinstance(obj, dict) and isinstance(obj.get('result'), dict) and isinstance(obj['result'].get('data'), list):
-                    all_raw.extend(obj['result']['data'])
-                elif isinstance(obj, dict) and isinstance(obj.get('data'), list):
-                    all_raw.extend(obj['data'])
-            # map to normalized rows
-            out: List[Dict] = []
-            for it in all_raw:
-                ds = it.get('STATISTICS_DATE')
-                fin = it.get('FIN_BALANCE')
-                loan = it.get('LOAN_BALANCE')
-                try:
-                    fin_v = float(fin) if fin is not None else None
-                except Exception:
-                    fin_v = None
-                try:
-                    loan_v = float(loan) if loan is not None else None
-                except Exception:
-                    loan_v = None
-                if isinstance(ds, str) and fin_v is not None and loan_v is not None:
-                    if len(ds) == 8 and ds.isdigit():
-                        date = f"{ds[:4]}-{ds[4:6]}-{ds[6:8]}"
-                    else:
-                        date = ds[:10]
-                    out.append({'date': date, 'fin_balance': fin_v, 'loan_balance': loan_v})
+            if since:
+                # 与缓存重叠的那一天仍保留，以覆盖当日数据的修订
+                out = [it for it in out if it['date'] >= since]
             out.sort(key=lambda x: x['date'])
             return out
         except Exception:
@@ -89,20 +144,17 @@ class MarginAccountDataManager(BaseDataManager):
         if not self.should_update():
             return
         try:
-            new_rows = self.fetch_from_api()
+            since = self.store.last_date()
+            new_rows = self.fetch_from_api(since)
             if not new_rows:
                 return
-            dmap: Dict[str, Dict] = {it['date']: it for it in self.margin_data if 'date' in it}
-            for it in new_rows:
-                dmap[it['date']] = it
-            merged = list(dmap.values())
-            merged.sort(key=lambda x: x['date'])
-            self.margin_data = merged
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.margin_data, f, ensure_ascii=False, indent=2)
+            self.store.merge(new_rows)
+            self.store.touch()
             self.last_update_time = time.time()
         except Exception:
             pass
     def get_data(self) -> List[Dict]:
         return self.margin_data
+    def get_series(self) -> TimeSeries:
+        return self.store.series()
 margin_manager = MarginAccountDataManager()
@@ -0,0 +1,183 @@
+import os
+import json
+import threading
+from bisect import bisect_left, insort
+from typing import List, Dict, Set, Tuple, Optional
+from api.common.cache_store import load_json, write_json, touch_file, mtime_or_zero
+
+# 字段值为这些时视为未解析（查询失败的占位）
+UNRESOLVED_VALUES = (None, '', '未知')
+
+
+class ListingCommitteeStore:
+    """上市委审核记录的索引存储
+
+    - 按 fileId 建索引去重，按公司名分组，组内按 fileUpdateTime 有序
+    - 公司分组按各自最新一条的时间有序，合并 k 条新记录约为 O(k log n)
+    - 持久化为「快照 + 追加日志」：新记录只追加到日志，日志过长时再压缩为快照
+    快照沿用原有的分组 JSON 格式（按时间倒序的公司分组列表）。
+    """
+
+    def __init__(self, snapshot_file: str, log_file: str, compact_every: int = 200):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        # 没有新数据的同步只更新这个文件的修改时间（快照和日志的签名变化即视为数据变化）
+        self.synced_file = snapshot_file + '.synced'
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._by_id: Dict[str, Dict] = {}
+        # 公司 -> 组内条目的排序键（升序）与条目，两个列表下标一一对应
+        self._group_keys: Dict[str, List[Tuple[str, str]]] = {}
+        self._group_items: Dict[str, List[Dict]] = {}
+        # (最新时间, 公司) 升序，用于分组排序
+        self._order: List[Tuple[str, str]] = []
+        self._latest_by_source: Dict[str, str] = {}
+        self._log_lines = 0
+        self._view: Optional[List[List[Dict]]] = None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    @staticmethod
+    def _company(item: Dict) -> str:
+        return item.get('companyName') or '未知公司'
+
+    @staticmethod
+    def _time(item: Dict) -> str:
+        return item.get('fileUpdateTime') or ''
+
+    def _group_latest(self, company: str) -> str:
+        keys = self._group_keys.get(company)
+        return keys[-1][0] if keys else ''
+
+    def _remove(self, item: Dict):
+        company = self._company(item)
+        keys = self._group_keys[company]
+        items = self._group_items[company]
+        old_latest = self._group_latest(company)
+        key = (self._time(item), str(item.get('fileId')))
+        idx = bisect_left(keys, key)
+        while idx < len(keys) and items[idx] is not item:
+            idx += 1
+        if idx < len(keys):
+            del keys[idx]
+            del items[idx]
+        self._order.pop(bisect_left(self._order, (old_latest, company)))
+        if keys:
+            insort(self._order, (self._group_latest(company), company))
+        else:
+            del self._group_keys[company]
+            del self._group_items[company]
+
+    def _insert(self, item: Dict):
+        company = self._company(item)
+        keys = self._group_keys.setdefault(company, [])
+        items = self._group_items.setdefault(company, [])
+        if keys:
+            self._order.pop(bisect_left(self._order, (self._group_latest(company), company)))
+        key = (self._time(item), str(item.get('fileId')))
+        idx = bisect_left(keys, key)
+        keys.insert(idx, key)
+        items.insert(idx, item)
+        insort(self._order, (self._group_latest(company), company))
+        source = item.get('source')
+        if source and self._time(item) > self._latest_by_source.get(source, ''):
+            self._latest_by_source[source] = self._time(item)
+
+    @staticmethod
+    def _resolved_fields(item: Dict) -> Set[str]:
+        """已取到实际值的字段（详情/审核类型查询失败时为空或「未知」）"""
+        return {k for k, v in item.items() if v not in UNRESOLVED_VALUES}
+
+    def _upsert(self, item: Dict) -> bool:
+        """插入或更新一条记录；同一 fileId 以时间较新的为准。返回是否有变化
+
+        时间相同时只有新记录已解析的字段严格多于旧记录才替换，避免边界日重新抓取时
+        审核类型查询失败的「未知」覆盖之前已查到的值。
+        """
+        fid = item.get('fileId')
+        if not fid:
+            return False
+        fid = str(fid)
+        old = self._by_id.get(fid)
+        if old is not None:
+            if old == item or self._time(item) < self._time(old):
+                return False
+            if self._time(item) == self._time(old) and not self._resolved_fields(item) > self._resolved_fields(old):
+                return False
+            self._remove(old)
+        self._by_id[fid] = item
+        self._insert(item)
+        self._view = None
+        return True
+
+    def merge(self, items: List[Dict]) -> int:
+        """合并新记录并追加到日志，返回实际变化的条数"""
+        with self._lock:
+            changed = [it for it in items if self._upsert(it)]
+            if changed:
+                self._append_log(changed)
+            return len(changed)
+
+    def groups(self) -> List[List[Dict]]:
+        """按最新时间倒序的公司分组，组内按时间倒序（与原缓存格式一致）"""
+        with self._lock:
+            if self._view is None:
+                self._view = [list(reversed(self._group_items[company])) for _, company in reversed(self._order)]
+            return self._view
+
+    def latest_date(self, source: str, default: str) -> str:
+        latest = self._latest_by_source.get(source, '')
+        return latest if latest > default else default
+
+    def load(self):
+        """读取快照并重放日志"""
+        with self._lock:
+            self._reset()
+            cached = load_json(self.snapshot_file, [])
+            for group in cached if isinstance(cached, list) else []:
+                for item in group if isinstance(group, list) else [group]:
+                    if isinstance(item, dict):
+                        self._upsert(item)
+            if os.path.exists(self.log_file):
+                with open(self.log_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            item = json.loads(line)
+                        except ValueError:
+                            # 进程中途退出可能留下半行，忽略即可
+                            continue
+                        if isinstance(item, dict):
+                            self._upsert(item)
+                        self._log_lines += 1
+
+    def _append_log(self, items: List[Dict]):
+        with open(self.log_file, 'a+', encoding='utf-8') as f:
+            # 上次写入中断留下的半行单独成行，避免与新记录粘连
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                if f.read(1) != '\n':
+                    f.write('\n')
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+        self._log_lines += len(items)
+        if self._log_lines >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """把当前全部数据写成快照，并清空日志"""
+        with self._lock:
+            # 快照是仓库中的种子数据，保持纯 JSON
+            write_json(self.snapshot_file, self.groups(), indent=4, checksum=False)
+            open(self.log_file, 'w').close()
+            self._log_lines = 0
+
+    def touch(self):
+        """记录一次成功的同步（即使没有新数据），用于重启后判断数据新鲜度"""
+        touch_file(self.synced_file)
+
+    def last_modified(self) -> float:
+        return max(mtime_or_zero(p) for p in (self.snapshot_file, self.log_file, self.synced_file))
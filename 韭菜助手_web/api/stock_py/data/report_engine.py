@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+from typing import List, Dict, Optional, Callable, Tuple, Any
+from api.common.http_client import http_client
+from api.common.cache_store import load_json, write_json, locked
+from .base_manager import BaseDataManager, CACHE_DIR
+
+DATACENTER_URL = 'https://datacenter-web.eastmoney.com/api/data/v1/get'
+
+
+class ReportSpec:
+    """东方财富数据中心报表的声明式描述
+
+    report_name: reportName 参数，如 RPT_ECONOMY_CPI
+    key_field:   输出行中的主键字段名（取自 label_column），如 month/quarter/date
+    value_map:   输出字段名 -> 报表列名，列值会被转换为 float，任一缺失则丢弃该行
+    sort_key:    合并后的排序函数，默认按主键字符串排序
+    """
+
+    def __init__(self, report_name: str, key_field: str, value_map: Dict[str, str],
+                 label_column: str = 'TIME', page_size: int = 2000,
+                 sort_key: Optional[Callable[[Dict], Any]] = None):
+        self.report_name = report_name
+        self.key_field = key_field
+        self.value_map = value_map
+        self.label_column = label_column
+        self.page_size = page_size
+        self.sort_key = sort_key or (lambda it: it[key_field])
+
+    @property
+    def columns(self) -> str:
+        return ','.join(['REPORT_DATE', self.label_column] + list(self.value_map.values()))
+
+    def build_params(self, since: Optional[str] = None) -> Dict[str, str]:
+        params = {
+            'reportName': self.report_name,
+            'columns': self.columns,
+            'pageNumber': '1',
+            'pageSize': str(self.page_size),
+            'sortColumns': 'REPORT_DATE',
+            'sortTypes': '-1',
+            'source': 'WEB',
+            'client': 'WEB'
+        }
+        if since:
+            # 包含水位当期，以便拿到最近一期的修订值
+            params['filter'] = f"(REPORT_DATE>='{since}')"
+        return params
+
+    def parse(self, obj: Any) -> Tuple[List[Dict], Optional[str]]:
+        """解析接口响应，返回 (规范化后的行, 本批次最大的 REPORT_DATE)"""
+        data_list = []
+        if isinstance(obj, dict):
+            if isinstance(obj.get('result'), dict) and isinstance(obj['result'].get('data'), list):
+                data_list = obj['result']['data']
+            elif isinstance(obj.get('data'), list):
+                data_list = obj['data']
+        out: List[Dict] = []
+        watermark: Optional[str] = None
+        for it in data_list:
+            label = it.get(self.label_column)
+            if not label or not isinstance(label, str):
+                continue
+            row = {self.key_field: label}
+            for field, column in self.value_map.items():
+                raw = it.get(column)
+                try:
+                    row[field] = float(raw) if raw is not None else None
+                except Exception:
+                    row[field] = None
+                if row[field] is None:
+                    break
+            else:
+                out.append(row)
+                report_date = it.get('REPORT_DATE')
+                if isinstance(report_date, str) and report_date[:10] > (watermark or ''):
+                    watermark = report_date[:10]
+        out.sort(key=self.sort_key)
+        return out, watermark
+
+
+class ReportStateStore:
+    """记录每张报表已同步到的 REPORT_DATE 水位，供下次增量请求使用"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Optional[Dict[str, str]] = None
+
+    def _load(self) -> Dict[str, str]:
+        if self._state is None:
+            cached = load_json(self.path, {})
+            self._state = cached if isinstance(cached, dict) else {}
+        return self._state
+
+    def get(self, report_name: str) -> Optional[str]:
+        with self._lock:
+            return self._load().get(report_name)
+
+    def set(self, report_name: str, watermark: str):
+        with self._lock, locked(self.path):
+            # 多个进程共用同一个状态文件，写入前先合并磁盘上的最新内容
+            self._state = None
+            state = self._load()
+            if state.get(report_name, '') >= watermark:
+                return
+            state[report_name] = watermark
+            try:
+                write_json(self.path, state)
+            except Exception:
+                pass
+
+
+class EastmoneyReportManager(BaseDataManager):
+    """由 ReportSpec 驱动的宏观数据管理器，子类只需声明 SPEC 和缓存文件名"""
+    SPEC: ReportSpec = None
+    CACHE_NAME: str = ''
+
+    def __init__(self):
+        super().__init__()
+        self.report_data: List[Dict] = []
+        self.cache_file = os.path.join(self.cache_dir, self.CACHE_NAME)
+
+    def init_data(self):
+        self.update_last_update_time(self.cache_file)
+        cached = load_json(self.cache_file, [])
+        self.report_data = cached if isinstance(cached, list) else []
+        if not self.report_data:
+            # 缓存缺失或损坏时按未更新处理，下次刷新走全量
+            self.last_update_time = 0
+
+    def since(self) -> Optional[str]:
+        """没有本地数据时强制全量，否则从水位开始增量"""
+        if not self.report_data:
+            return None
+        return report_state.get(self.SPEC.report_name)
+
+    def fetch_from_api(self, since: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        try:
+            resp = http_client.get(DATACENTER_URL, params=self.SPEC.build_params(since), timeout=10)
+            if resp.status_code != 200:
+                return [], None
+            return self.SPEC.parse(resp.json())
+        except Exception:
+            return [], None
+
+    def merge_and_persist(self, new_rows: List[Dict], watermark: Optional[str] = None):
+        """所有报表共用的合并与落盘逻辑"""
+        key = self.SPEC.key_field
+        kmap: Dict[str, Dict] = {it[key]: it for it in self.report_data if isinstance(it, dict) and key in it}
+        for it in new_rows:
+            kmap[it[key]] = it
+        self.report_data = sorted(kmap.values(), key=self.SPEC.sort_key)
+        # 报表缓存是仓库中的种子数据，保持纯 JSON
+        write_json(self.cache_file, self.report_data, checksum=False)
+        self.last_update_time = time.time()
+        if watermark:
+            report_state.set(self.SPEC.report_name, watermark)
+
+    def update_data(self):
+        if not self.should_update():
+            return
+        try:
+            rows, watermark = self.fetch_from_api(self.since())
+            if rows:
+                self.merge_and_persist(rows, watermark)
+        except Exception as e:
+            print(f"[Report] {self.SPEC.report_name} update failed: {e}")
+
+    def get_data(self) -> List[Dict]:
+        return self.report_data
+
+
+report_state = ReportStateStore(os.path.join(CACHE_DIR, 'eastmoney_report_state.json'))
@@ -0,0 +1,125 @@
+from typing import List, Dict, Optional, Iterable
+import numpy as np
+
+
+def days_from_strings(dates: Iterable[str]) -> np.ndarray:
+    """['2024-01-02', ...] -> 自 1970-01-01 起的天数（int64）"""
+    return np.array([d[:10] for d in dates], dtype='datetime64[D]').astype(np.int64)
+
+
+def days_from_yyyymmdd(values: np.ndarray) -> np.ndarray:
+    """int yyyymmdd 数组 -> 天数（int64），全程向量化"""
+    values = np.asarray(values, dtype=np.int64)
+    months = (values // 10000 - 1970) * 12 + (values // 100 % 100 - 1)
+    return months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + (values % 100 - 1)
+
+
+def days_to_strings(days: np.ndarray) -> List[str]:
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype(str).tolist()
+
+
+def to_day(date: str) -> int:
+    return int(np.datetime64(date[:10], 'D').astype(np.int64))
+
+
+class TimeSeries:
+    """按交易日升序排列的列式时间序列
+
+    days 为 int64 天数（自 1970-01-01 起），每个数值列为等长的 float64 数组。
+    切片返回共享底层数组的视图；append/merge 返回新对象，原对象不变，
+    因此可以在后台刷新的同时被请求线程安全地读取。
+    """
+
+    def __init__(self, days: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.days = np.asarray(days, dtype=np.int64)
+        self.columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        self._records: Optional[List[Dict]] = None
+        self._columns_json: Optional[Dict[str, List]] = None
+
+    @classmethod
+    def empty(cls, names: List[str]) -> 'TimeSeries':
+        return cls(np.empty(0, dtype=np.int64), {n: np.empty(0, dtype=np.float64) for n in names})
+
+    @classmethod
+    def from_records(cls, records: List[Dict], names: List[str], date_key: str = 'date') -> 'TimeSeries':
+        """由 [{'date': ..., <列>: ...}] 构建；同一天保留最后一条，缺值的行丢弃"""
+        dmap: Dict[str, Dict] = {}
+        for it in records or []:
+            d = it.get(date_key) if isinstance(it, dict) else None
+            if not isinstance(d, str) or not d:
+                continue
+            try:
+                dmap[d[:10]] = {n: float(it[n]) for n in names}
+            except (KeyError, TypeError, ValueError):
+                continue
+        keys = sorted(dmap)
+        return cls(days_from_strings(keys), {n: np.array([dmap[k][n] for k in keys], dtype=np.float64) for n in names})
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def dates(self) -> List[str]:
+        return days_to_strings(self.days)
+
+    def first_date(self) -> Optional[str]:
+        return days_to_strings(self.days[:1])[0] if len(self.days) else None
+
+    def last_date(self) -> Optional[str]:
+        return days_to_strings(self.days[-1:])[0] if len(self.days) else None
+
+    def slice(self, start: Optional[str] = None, end: Optional[str] = None) -> 'TimeSeries':
+        """[start, end] 闭区间，二分定位，O(log n)"""
+        lo = int(np.searchsorted(self.days, to_day(start), side='left')) if start else 0
+        hi = int(np.searchsorted(self.days, to_day(end), side='right')) if end else len(self.days)
+        return TimeSeries(self.days[lo:hi], {n: v[lo:hi] for n, v in self.columns.items()})
+
+    def append(self, other: 'TimeSeries') -> 'TimeSeries':
+        """追加更晚的数据；有日期重叠时退化为 merge"""
+        if not len(other):
+            return self
+        if len(self) and other.days[0] <= self.days[-1]:
+            return self.merge(other)
+        return TimeSeries(np.concatenate([self.days, other.days]),
+                          {n: np.concatenate([v, other.columns[n]]) for n, v in self.columns.items()})
+
+    def merge(self, other: 'TimeSeries') -> 'TimeSeries':
+        """按日期合并，同一天以 other 为准"""
+        if not len(other):
+            return self
+        days = np.concatenate([self.days, other.days])
+        order = np.argsort(days, kind='stable')
+        days = days[order]
+        keep = np.append(days[1:] != days[:-1], True)
+        return TimeSeries(days[keep], {n: np.concatenate([v, other.columns[n]])[order][keep] for n, v in self.columns.items()})
+
+    def to_records(self) -> List[Dict]:
+        """JSON 视图：[{'date': 'YYYY-MM-DD', <列>: 值}]，结果缓存复用"""
+        if self._records is None:
+            dates = self.dates()
+            cols = [(n, v.tolist()) for n, v in self.columns.items()]
+            self._records = [dict([('date', d)] + [(n, values[i]) for n, values in cols]) for i, d in enumerate(dates)]
+        return self._records
+
+    def to_columns(self) -> Dict[str, List]:
+        """列式 JSON 视图：{'date': [...], <列>: [...]}，直接由数组转换，结果缓存复用"""
+        if self._columns_json is None:
+            out: Dict[str, List] = {'date': self.dates()}
+            out.update((n, v.tolist()) for n, v in self.columns.items())
+            self._columns_json = out
+        return self._columns_json
+
+
+def rows_to_columns(rows: List[Dict]) -> Dict[str, List]:
+    """[{k: v}, ...] -> {k: [v, ...]}；字段按首次出现的顺序，缺失的位置为 None"""
+    keys: Dict[str, None] = {}
+    for it in rows or []:
+        if isinstance(it, dict):
+            keys.update(dict.fromkeys(it))
+    return {k: [it.get(k) if isinstance(it, dict) else None for it in rows] for k in keys}
@@ -1,5 +1,7 @@
 from typing import List, Dict, Any, Optional
 from math import isnan
+import numpy as np
+from api.stock_py.data.timeseries import TimeSeries
 def to_num(value) -> float:
     try:
         num = float(value)
@@ -128,3 +130,9 @@ def build_buffet_data(gdp_data: List[Dict], stock_market_data: List[Dict]) -> Li
         return (0, 0)
     results.sort(key=sort_key)
     return results
+def build_buffet_series(buffet_data: List[Dict]) -> TimeSeries:
+    """巴菲特指标按季末日期（3/6/9/12 月最后一天）排列的 TimeSeries，供二进制导出使用"""
+    pairs = [(quarter_to_ym(it.get('date', '')), it.get('ratio')) for it in buffet_data or []]
+    pairs = [(ym, r) for ym, r in pairs if ym and isinstance(r, (int, float))]
+    ends = (np.array([ym for ym, _ in pairs], dtype='datetime64[M]') + 1).astype('datetime64[D]') - 1
+    return TimeSeries(ends.astype(np.int64), {'ratio': np.array([r for _, r in pairs], dtype=np.float64)})
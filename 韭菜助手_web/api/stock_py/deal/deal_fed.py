@@ -1,95 +1,78 @@
-from typing import List, Dict, Optional
-from math import isnan
-def _norm_date(s: Optional[str]) -> Optional[str]:
-    if not isinstance(s, str):
+from typing import Dict, Optional
+import numpy as np
+from api.stock_py.data.timeseries import TimeSeries, days_to_strings
+
+# 指数交易日没有当天国债收益率时，向前取最近一个不超过该天数的收益率
+ASOF_TOLERANCE_DAYS = 5
+
+
+def asof_indexer(left_days: np.ndarray, right_days: np.ndarray, tolerance: int) -> np.ndarray:
+    """对每个 left 日期，返回 right 中不晚于它且相差不超过 tolerance 天的最近位置；没有则为 -1"""
+    idx = np.searchsorted(right_days, left_days, side='right') - 1
+    if not len(right_days):
+        return idx
+    ok = idx >= 0
+    ok[ok] = left_days[ok] - right_days[idx[ok]] <= tolerance
+    return np.where(ok, idx, -1)
+
+
+def _round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """与内置 round 结果一致：np.round 按放大后取整，落在 .5 边界附近时可能与 round 不同，这些少数值单独用 round 计算"""
+    out = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    edge = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if edge.any():
+        out[edge] = [round(v, ndigits) for v in values[edge].tolist()]
+    return out
+
+
+def _stats(values: np.ndarray) -> Dict[str, float]:
+    return {'mean': float(values.mean()), 'std': float(values.std())}
+
+
+# 列式结果中的列，close/bondYield/peg 由 ratio 和 diff 共用
+FED_PREMIUM_COLUMNS = ['close', 'bondYield', 'peg', 'fedPremium', 'riskPremium']
+
+
+def calculate_fed_premium_series(hushen300: TimeSeries, bond_yield: TimeSeries, tolerance: int = ASOF_TOLERANCE_DAYS) -> Optional[Dict]:
+    """{'series': TimeSeries(FED_PREMIUM_COLUMNS), 'ratio': {mean, std}, 'diff': {mean, std}}；没有可用数据时返回 None"""
+    if not isinstance(hushen300, TimeSeries) or not isinstance(bond_yield, TimeSeries):
         return None
-    if len(s) == 8 and s.isdigit():
-        return f"{s[:4]}-{s[4:6]}-{s[6:8]}"
-    import re
-    m = re.match(r"(\d{4})[-/](\d{2})[-/](\d{2})", s)
-    if m:
-        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
-    return None
-def calculate_fed_premium_both(hushen300_data: List[Dict], bond_yield_data: List[Dict]):
-    if not isinstance(hushen300_data, list) or not isinstance(bond_yield_data, list):
-        return {'ratio': None, 'diff': None}
-    date_map: Dict[str, float] = {}
-    peg_map: Dict[str, float] = {}
-    for it in hushen300_data:
-        d = _norm_date(it.get('date') or it.get('tradeDate'))
-        close = it.get('close')
-        peg = it.get('peg') or it.get('pe')
-        if d and isinstance(close, (int, float)) and isinstance(peg, (int, float)) and close > 0 and peg > 0:
-            date_map[d] = float(close)
-            peg_map[d] = float(peg)
-    by_map: Dict[str, float] = {}
-    dates_ts: List[Dict] = []
-    import datetime
-    for it in bond_yield_data:
-        d = _norm_date(it.get('date') or it.get('workTime') or it.get('tradeDate'))
-        y = it.get('yield') or it.get('tenYear') or it.get('10年')
-        try:
-            yv = float(y) if y is not None else None
-        except Exception:
-            yv = None
-        if d and isinstance(yv, (int, float)):
-            by_map[d] = yv
-            try:
-                ts = datetime.datetime.strptime(d, '%Y-%m-%d').timestamp()
-                dates_ts.append({'s': d, 't': ts})
-            except Exception:
-                pass
-    dates_ts.sort(key=lambda x: x['t'])
-    def nearest_bond(d: str) -> Optional[float]:
-        import datetime
-        try:
-            tgt = datetime.datetime.strptime(d, '%Y-%m-%d').timestamp()
-        except Exception:
-            return None
-        lo, hi = 0, len(dates_ts) - 1
-        idx = -1
-        while lo <= hi:
-            mid = (lo + hi) >> 1
-            if dates_ts[mid]['t'] <= tgt:
-                idx = mid
-                lo = mid + 1
-            else:
-                hi = mid - 1
-        if idx == -1:
-            return None
-        cand = dates_ts[idx]
-        if tgt - cand['t'] <= 5 * 24 * 60 * 60:
-            return by_map.get(cand['s'])
+    close = hushen300['close']
+    peg = hushen300['peg']
+    valid = (close > 0) & (peg > 0)
+    days = hushen300.days[valid]
+    close = close[valid]
+    peg = peg[valid]
+
+    idx = asof_indexer(days, bond_yield.days, tolerance)
+    by = np.where(idx >= 0, bond_yield['yield'][np.maximum(idx, 0)], np.nan) if len(bond_yield) else np.full(len(days), np.nan)
+    keep = by > 0  # 同时排除 NaN（没有可用收益率）
+    if not keep.any():
         return None
-    merged: List[Dict] = []
-    for d, close in date_map.items():
-        peg = peg_map.get(d)
-        by = by_map.get(d)
-        if by is None:
-            by = nearest_bond(d)
-        if by is None:
-            continue
-        if any([isnan(close), isnan(peg), isnan(by)]):
-            continue
-        if peg <= 0 or by <= 0:
-            continue
-        ey = 1.0 / peg
-        by_dec = by / 100.0
-        ratio = ey / by_dec - 1.0
-        diff = ey - by_dec
-        merged.append({'date': d, 'close': close, 'bondYield': by, 'peg': peg, 'fedPremium': round(ratio, 2), 'riskPremium': round(diff, 4)})
-    if not merged:
+    days, close, peg, by = days[keep], close[keep], peg[keep], by[keep]
+
+    ey = 1.0 / peg
+    by_dec = by / 100.0
+    ratio = _round(ey / by_dec - 1.0, 2)
+    diff = _round(ey - by_dec, 4)
+    series = TimeSeries(days, {'close': close, 'bondYield': by, 'peg': peg, 'fedPremium': ratio, 'riskPremium': diff})
+    return {'series': series, 'ratio': _stats(ratio), 'diff': _stats(diff)}
+
+
+def fed_premium_rows(result: Optional[Dict]):
+    """列式结果 -> 原有的 {'ratio': {data, mean, std}, 'diff': {...}} 记录格式"""
+    if not result:
         return {'ratio': None, 'diff': None}
-    rvals = [x['fedPremium'] for x in merged]
-    rmean = sum(rvals) / len(rvals)
-    rvar = sum((v - rmean) ** 2 for v in rvals) / len(rvals)
-    import math
-    rstd = math.sqrt(rvar)
-    dvals = [x['riskPremium'] for x in merged]
-    dmean = sum(dvals) / len(dvals)
-    dvar = sum((v - dmean) ** 2 for v in dvals) / len(dvals)
-    dstd = math.sqrt(dvar)
+    series = result['series']
+    base = list(zip(series.dates(), series['close'].tolist(), series['bondYield'].tolist(), series['peg'].tolist()))
     return {
-        'ratio': {'data': [{'date': x['date'], 'close': x['close'], 'bondYield': x['bondYield'], 'peg': x['peg'], 'fedPremium': x['fedPremium']} for x in merged], 'mean': rmean, 'std': rstd},
-        'diff': {'data': [{'date': x['date'], 'close': x['close'], 'bondYield': x['bondYield'], 'peg': x['peg'], 'riskPremium': x['riskPremium']} for x in merged], 'mean': dmean, 'std': dstd}
+        'ratio': dict(data=[{'date': d, 'close': c, 'bondYield': b, 'peg': p, 'fedPremium': r}
+                            for (d, c, b, p), r in zip(base, series['fedPremium'].tolist())], **result['ratio']),
+        'diff': dict(data=[{'date': d, 'close': c, 'bondYield': b, 'peg': p, 'riskPremium': r}
+                           for (d, c, b, p), r in zip(base, series['riskPremium'].tolist())], **result['diff']),
     }
+
+
+def calculate_fed_premium_both(hushen300: TimeSeries, bond_yield: TimeSeries, tolerance: int = ASOF_TOLERANCE_DAYS):
+    return fed_premium_rows(calculate_fed_premium_series(hushen300, bond_yield, tolerance))
@@ -1,40 +1,20 @@
 from typing import List, Dict
+import numpy as np
+from api.stock_py.data.timeseries import TimeSeries
 
-def _to_float(v):
-    try:
-        if v is None:
-            return None
-        return float(v)
-    except Exception:
-        return None
-
-def build_margin_account_info_data(margin_rows: List[Dict], hushen300_rows: List[Dict]) -> Dict[str, List]:
-    if not isinstance(margin_rows, list):
+def build_margin_account_info_data(margin: TimeSeries, hushen300: TimeSeries) -> Dict[str, List]:
+    if not isinstance(margin, TimeSeries):
         return {"categories": [], "leftSeries": [], "rightSeries": []}
 
-    hs_map: Dict[str, float] = {}
-    for item in (hushen300_rows or []):
-        d = item.get('date') or item.get('tradeDate')
-        close = _to_float(item.get('close'))
-        if isinstance(d, str) and close is not None:
-            hs_map[d] = close
-
-    categories: List[str] = []
-    left_series: List[float] = []
-    right_series: List[float] = []
-
-    for row in margin_rows:
-        d = row.get('date')
-        if not isinstance(d, str) or not d:
-            continue
-        fin = _to_float(row.get('fin_balance'))
-        loan = _to_float(row.get('loan_balance'))
-        minus = None
-        if fin is not None and loan is not None:
-            minus = fin - loan
+    categories: List[str] = margin.dates()
+    left_series: List[float] = (margin['fin_balance'] - margin['loan_balance']).tolist()
 
-        categories.append(d)
-        left_series.append(minus if minus is not None else None)
-        right_series.append(hs_map.get(d))
+    # 按日期精确对齐沪深300收盘价，没有对应交易日的位置为 None
+    right_series: List[float] = [None] * len(margin)
+    if isinstance(hushen300, TimeSeries) and len(hushen300):
+        pos = np.minimum(np.searchsorted(hushen300.days, margin.days), len(hushen300) - 1)
+        matched = hushen300.days[pos] == margin.days
+        closes = hushen300['close'][pos].tolist()
+        right_series = [c if m else None for c, m in zip(closes, matched.tolist())]
 
     return {"categories": categories, "leftSeries": left_series, "rightSeries": right_series}
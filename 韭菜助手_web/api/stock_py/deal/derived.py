@@ -0,0 +1,132 @@
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from api.stock_py.data.base_manager import BaseDataManager
+from api.stock_py.data.data_hushen300 import hushen300_manager
+from api.stock_py.data.data_bond_yield import bond_yield_manager
+from api.stock_py.data.data_gdp import china_gdp_manager
+from api.stock_py.data.data_stock_market import china_stock_market_manager
+from api.stock_py.data.data_cpi import china_cpi_manager
+from api.stock_py.data.data_ppi import china_ppi_manager
+from api.stock_py.data.data_money_supply import china_money_supply_manager
+from api.stock_py.data.data_margin import margin_manager
+from .deal_buffet import build_buffet_data, build_buffet_series
+from .deal_fed import calculate_fed_premium_series, fed_premium_rows
+from .deal_cpi_ppi import build_cpi_data, build_ppi_data
+from .deal_money_supply import build_money_supply_data
+from .deal_margin_account_info import build_margin_account_info_data
+
+
+class DerivedDataset:
+    """由若干数据管理器计算出的派生指标，按输入版本缓存计算结果"""
+
+    def __init__(self, name: str, inputs: List[BaseDataManager], build: Callable[[], Any]):
+        self.name = name
+        self.inputs = inputs
+        self.build = build
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self._versions: Optional[Tuple[int, ...]] = None
+        self.computations = 0
+        self.last_duration_ms: Optional[float] = None
+
+    def input_versions(self) -> Tuple[int, ...]:
+        return tuple(m.version for m in self.inputs)
+
+    @property
+    def versions(self) -> Optional[Tuple[int, ...]]:
+        """当前结果对应的输入版本"""
+        return self._versions
+
+    def refresh(self) -> Any:
+        """输入版本有变化时重新计算；并发调用只计算一次"""
+        with self._lock:
+            # 先取版本再计算：计算过程中输入又变化时，结果会带着旧版本号，下次访问会再算一遍
+            versions = self.input_versions()
+            if versions != self._versions:
+                t0 = time.time()
+                self._value = self.build()
+                self._versions = versions
+                self.computations += 1
+                self.last_duration_ms = round((time.time() - t0) * 1000, 2)
+            return self._value
+
+    def get(self) -> Any:
+        """结果是最新的直接返回（O(1)）；否则当场计算"""
+        if self._versions == self.input_versions():
+            return self._value
+        return self.refresh()
+
+
+class DerivedGraph:
+    """派生指标依赖图：管理器数据变化时，只在后台线程重新计算依赖它的指标"""
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._datasets: Dict[str, DerivedDataset] = {}
+        self._dependents: Dict[int, List[DerivedDataset]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, inputs: List[BaseDataManager], build: Callable[[], Any]) -> DerivedDataset:
+        dataset = DerivedDataset(name, inputs, build)
+        self._datasets[name] = dataset
+        for m in inputs:
+            if id(m) not in self._dependents:
+                self._dependents[id(m)] = []
+                m.add_listener(self._on_update)
+            self._dependents[id(m)].append(dataset)
+        return dataset
+
+    def _submit(self, dataset: DerivedDataset):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='derived')
+        self._executor.submit(self._refresh, dataset)
+
+    @staticmethod
+    def _refresh(dataset: DerivedDataset):
+        try:
+            dataset.refresh()
+        except Exception:
+            traceback.print_exc()
+
+    def _on_update(self, manager: BaseDataManager):
+        for dataset in self._dependents.get(id(manager), []):
+            self._submit(dataset)
+
+    def __getitem__(self, name: str) -> DerivedDataset:
+        return self._datasets[name]
+
+    def get(self, name: str) -> Any:
+        return self._datasets[name].get()
+
+    def status(self) -> List[Dict]:
+        return [{
+            'name': d.name,
+            'inputs': [type(m).__name__ for m in d.inputs],
+            'fresh': d.versions == d.input_versions(),
+            'computations': d.computations,
+            'last_duration_ms': d.last_duration_ms,
+        } for d in self._datasets.values()]
+
+
+derived_data = DerivedGraph()
+
+derived_data.register('buffet', [china_gdp_manager, china_stock_market_manager],
+                      lambda: build_buffet_data(china_gdp_manager.get_data(), china_stock_market_manager.get_data()))
+derived_data.register('buffet_series', [china_gdp_manager, china_stock_market_manager],
+                      lambda: build_buffet_series(derived_data.get('buffet')))
+derived_data.register('fed_premium_series', [hushen300_manager, bond_yield_manager],
+                      lambda: calculate_fed_premium_series(hushen300_manager.get_series(), bond_yield_manager.get_series()))
+derived_data.register('fed_premium', [hushen300_manager, bond_yield_manager],
+                      lambda: fed_premium_rows(derived_data.get('fed_premium_series')))
+derived_data.register('margin_account', [margin_manager, hushen300_manager],
+                      lambda: build_margin_account_info_data(margin_manager.get_series(), hushen300_manager.get_series()))
+derived_data.register('money_supply', [china_money_supply_manager],
+                      lambda: build_money_supply_data(china_money_supply_manager.get_data()))
+derived_data.register('cpi', [china_cpi_manager], lambda: build_cpi_data(china_cpi_manager.get_data()))
+derived_data.register('ppi', [china_ppi_manager], lambda: build_ppi_data(china_ppi_manager.get_data()))
@@ -0,0 +1,110 @@
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow 为可选依赖，缺失时不提供 Arrow 格式
+    pa = None
+try:
+    import msgpack
+except ImportError:  # msgpack 为可选依赖，缺失时不提供 MessagePack 格式
+    msgpack = None
+
+from .data.base_manager import BaseDataManager
+from .data.data_hushen300 import hushen300_manager
+from .data.data_bond_yield import bond_yield_manager
+from .data.data_gdp import china_gdp_manager
+from .data.data_stock_market import china_stock_market_manager
+from .data.data_margin import margin_manager
+from .data.timeseries import TimeSeries
+from .deal.derived import derived_data
+from .deal.deal_fed import FED_PREMIUM_COLUMNS
+from .series_query import SeriesQuery
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# 格式名 -> 响应的 Content-Type
+EXPORT_MIMETYPES = {'arrow': ARROW_MIMETYPE, 'msgpack': MSGPACK_MIMETYPE}
+
+# Accept 头中可识别的类型（按服务端偏好排序）
+ACCEPT_MIMETYPES = [(ARROW_MIMETYPE, 'arrow'), (MSGPACK_MIMETYPE, 'msgpack'), ('application/x-msgpack', 'msgpack')]
+
+
+def _fed_premium_series() -> TimeSeries:
+    result = derived_data.get('fed_premium_series')
+    return result['series'] if result else TimeSeries.empty(FED_PREMIUM_COLUMNS)
+
+
+# 数据集 -> (数据来源, 取 TimeSeries 的函数, 降采样依据的字段)
+EXPORT_DATASETS: Dict[str, Tuple[List[BaseDataManager], Callable[[], TimeSeries], str]] = {
+    'hushen300': ([hushen300_manager], hushen300_manager.get_series, 'close'),
+    'bond_yield': ([bond_yield_manager], bond_yield_manager.get_series, 'yield'),
+    'margin_account': ([margin_manager], margin_manager.get_series, 'fin_balance'),
+    'fed_premium': ([hushen300_manager, bond_yield_manager], _fed_premium_series, 'fedPremium'),
+    'buffet': ([china_gdp_manager, china_stock_market_manager], lambda: derived_data.get('buffet_series'), 'ratio'),
+}
+
+
+def available_formats() -> List[str]:
+    return [fmt for fmt, module in (('arrow', pa), ('msgpack', msgpack)) if module is not None]
+
+
+def negotiate_format(requested: Optional[str], accept) -> Optional[str]:
+    """?format=arrow|msgpack 优先，否则按 Accept 头选择；accept 为 None 表示请求未带 Accept
+
+    格式名不合法时抛 ValueError；没有客户端可接受且已安装的格式时返回 None（对应 406）。
+    """
+    formats = available_formats()
+    requested = (requested or '').strip()
+    if requested:
+        if requested not in EXPORT_MIMETYPES:
+            raise ValueError(f"invalid format: {requested}")
+        return requested if requested in formats else None
+    offered = [(mimetype, fmt) for mimetype, fmt in ACCEPT_MIMETYPES if fmt in formats]
+    if accept is None:
+        return offered[0][1] if offered else None
+    best = accept.best_match([mimetype for mimetype, _ in offered])
+    return dict(offered).get(best)
+
+
+def parse_export_query(name: str, args: Mapping[str, str]) -> SeriesQuery:
+    """与 /api/data/* 相同的 start/end/fields/max_points，字段按数据集的列校验"""
+    q = SeriesQuery.from_args(args)
+    q.check_fields(EXPORT_DATASETS[name][1]().names)
+    return q
+
+
+def encode_arrow(series: TimeSeries, metadata: Dict[str, str]) -> bytes:
+    """Arrow IPC 流：date 为 date32，其余为 float64，数值列直接引用 numpy 数组的内存"""
+    schema = pa.schema([('date', pa.date32())] + [(n, pa.float64()) for n in series.names], metadata=metadata)
+    arrays = [pa.array(series.days.astype('datetime64[D]'), type=pa.date32())]
+    arrays += [pa.array(series[n], type=pa.float64()) for n in series.names]
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(series: TimeSeries, metadata: Dict[str, str]) -> bytes:
+    """{'metadata': {...}, 'length': n, 'columns': [{'name', 'type', 'data'}, ...]}
+
+    data 为小端原始字节：date 列为 int32 天数（自 1970-01-01 起，与 Arrow date32 相同），
+    其余为 float64；客户端用 np.frombuffer(data, '<i4' / '<f8') 即可还原，不经过逐个数值的对象。
+    """
+    columns = [{'name': 'date', 'type': 'date32', 'data': series.days.astype('<i4').tobytes()}]
+    columns += [{'name': n, 'type': 'float64', 'data': series[n].astype('<f8').tobytes()} for n in series.names]
+    return msgpack.packb({'metadata': metadata, 'length': len(series), 'columns': columns}, use_bin_type=True)
+
+
+def export_series(name: str, q: SeriesQuery, fmt: str) -> bytes:
+    managers, get_series, value_field = EXPORT_DATASETS[name]
+    series = q.select(get_series(), value_field)
+    metadata = {
+        'dataset': name,
+        'version': '_'.join(str(m.version) for m in managers),
+        'first_date': series.first_date() or '',
+        'last_date': series.last_date() or '',
+    }
+    if fmt == 'arrow':
+        return encode_arrow(series, metadata)
+    return encode_msgpack(series, metadata)
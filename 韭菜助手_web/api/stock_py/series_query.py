@@ -0,0 +1,166 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .data.timeseries import TimeSeries, to_day
+
+# max_points 的下限：LTTB 至少保留首尾两点和中间一个桶
+MIN_POINTS = 3
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的下标（升序）
+
+    横坐标按点的序号计（与 ECharts category 轴一致）。首尾两点必留，中间每个桶选与
+    上一个选中点、下一桶均值点构成三角形面积最大的点，因此峰谷会被保留。
+    NaN 先按相邻有效值线性插值，只用于选点，不改变返回的数据。
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < MIN_POINTS:
+        return np.arange(n, dtype=np.int64)
+    x = np.arange(n, dtype=np.float64)
+    bad = np.isnan(y)
+    if bad.all():
+        return np.linspace(0, n - 1, n_out).astype(np.int64)
+    if bad.any():
+        y = y.copy()
+        y[bad] = np.interp(x[bad], x[~bad], y[~bad])
+
+    # 中间 n_out - 2 个桶：[edges[i], edges[i+1])；最后一个桶的“下一桶”为末尾点
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2]
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+class SeriesQuery:
+    """时间序列接口的可选查询参数
+
+    start/end  日期闭区间 YYYY-MM-DD，在有序数据上二分定位
+    fields     逗号分隔的字段列表，只返回这些字段（日期始终返回）
+    max_points 点数上限，超过时用 LTTB 降采样
+    """
+
+    def __init__(self, start: Optional[str] = None, end: Optional[str] = None,
+                 fields: Optional[List[str]] = None, max_points: Optional[int] = None):
+        self.start = start
+        self.end = end
+        self.fields = fields
+        self.max_points = max_points
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, str], prefix: str = '') -> 'SeriesQuery':
+        """从请求参数解析；参数不合法时抛 ValueError"""
+        def date_arg(name: str) -> Optional[str]:
+            value = (args.get(prefix + name) or '').strip()
+            if not value:
+                return None
+            try:
+                to_day(value)
+            except ValueError:
+                raise ValueError(f"invalid {prefix}{name}: {value}")
+            return value[:10]
+
+        fields = list(dict.fromkeys(f.strip() for f in (args.get(prefix + 'fields') or '').split(',') if f.strip())) or None
+        max_points = (args.get(prefix + 'max_points') or '').strip()
+        if max_points:
+            try:
+                max_points = int(max_points)
+            except ValueError:
+                raise ValueError(f"invalid {prefix}max_points: {max_points}")
+            if max_points < MIN_POINTS:
+                raise ValueError(f"{prefix}max_points must be >= {MIN_POINTS}")
+        return cls(date_arg('start'), date_arg('end'), fields, max_points or None)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.start or self.end or self.fields is not None or self.max_points)
+
+    def cache_key(self) -> Tuple:
+        """规范化后的参数，用作响应缓存键的一部分（未识别的请求参数不计入）"""
+        return (self.start, self.end, tuple(self.fields) if self.fields is not None else None, self.max_points)
+
+    def check_fields(self, available: List[str]):
+        unknown = [f for f in self.fields or [] if f not in available]
+        if unknown:
+            raise ValueError(f"unknown fields: {','.join(unknown)}")
+
+    def restrict(self, available: List[str]) -> 'SeriesQuery':
+        """只保留 available 中存在的字段，用于同一请求作用在字段不同的几组数据上"""
+        if self.fields is None:
+            return self
+        return SeriesQuery(self.start, self.end, [f for f in self.fields if f in available], self.max_points)
+
+    def value_field(self, default: str) -> str:
+        """降采样依据的字段：默认字段被投影掉时改用请求的第一个字段"""
+        if self.fields and default not in self.fields:
+            return self.fields[0]
+        return default
+
+    def _downsample(self, values: List[Any]) -> Optional[np.ndarray]:
+        if not self.max_points or len(values) <= self.max_points:
+            return None
+        y = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return lttb_indices(y, self.max_points)
+
+    def apply_series(self, series: TimeSeries, value_field: str) -> List[Dict]:
+        """TimeSeries -> 记录列表"""
+        return self.select(series, value_field).to_records()
+
+    def select(self, series: TimeSeries, value_field: str, extra_fields: Sequence[str] = ()) -> TimeSeries:
+        """在 TimeSeries 上完成区间、降采样和投影，结果仍为 TimeSeries
+
+        extra_fields 为同样要保留峰谷的其他列（多张图共用一份数据时），取各列 LTTB 选点的并集
+        """
+        self.check_fields(series.names)
+        part = series.slice(self.start, self.end) if self.start or self.end else series
+        if self.max_points and len(part) > self.max_points:
+            keep = [self.value_field(value_field)]
+            keep += [f for f in extra_fields if f not in keep and (self.fields is None or f in self.fields)]
+            idx = np.unique(np.concatenate([lttb_indices(part[f], self.max_points) for f in keep]))
+            part = TimeSeries(part.days[idx], {n: v[idx] for n, v in part.columns.items()})
+        if self.fields is not None:
+            part = TimeSeries(part.days, {n: part[n] for n in self.fields})
+        return part
+
+    def apply_rows(self, rows: List[Dict], value_field: str) -> List[Dict]:
+        """按日期升序的 [{'date': ..., ...}] 记录列表；字段由调用方校验"""
+        lo = bisect_left(rows, self.start, key=lambda r: r['date']) if self.start else 0
+        hi = bisect_right(rows, self.end, key=lambda r: r['date'][:10]) if self.end else len(rows)
+        rows = rows[lo:hi]
+        field = self.value_field(value_field)
+        idx = self._downsample([r.get(field) for r in rows])
+        if idx is not None:
+            rows = [rows[i] for i in idx.tolist()]
+        if self.fields is not None:
+            keep = ['date'] + self.fields
+            rows = [{k: r[k] for k in keep if k in r} for r in rows]
+        return rows
+
+    def apply_columns(self, payload: Dict[str, List], value_field: str, date_key: str = 'categories') -> Dict[str, List]:
+        """{'categories': [日期...], <列>: [...]} 形式的并列数组；非数组的字段（如统计值）原样保留"""
+        dates = payload.get(date_key) or []
+        series_keys = [k for k, v in payload.items() if k != date_key and isinstance(v, list)]
+        self.check_fields(series_keys)
+        lo = bisect_left(dates, self.start) if self.start else 0
+        hi = bisect_right(dates, self.end, key=lambda d: d[:10]) if self.end else len(dates)
+        keys = series_keys if self.fields is None else self.fields
+        out = {date_key: dates[lo:hi]}
+        out.update({k: (payload.get(k) or [])[lo:hi] for k in keys})
+        idx = self._downsample((payload.get(self.value_field(value_field)) or [])[lo:hi])
+        if idx is not None:
+            positions = idx.tolist()
+            out = {k: [v[i] for i in positions] for k, v in out.items()}
+        out.update((k, v) for k, v in payload.items() if k != date_key and not isinstance(v, list))
+        return out
@@ -1,12 +1,11 @@
 from flask import Flask, render_template, jsonify, request
 import os
 import json
-import requests
 import time
 from datetime import datetime, timedelta
 from math import isnan
 
-from api.stock_py import initialize_data_managers, update_all_data as stock_update_all_data
+from api.stock_py import initialize_data_managers, update_all_data as stock_update_all_data, schedule_data_refresh
 from api.stock_py.data.data_hushen300 import hushen300_manager
 from api.stock_py.data.data_bond_yield import bond_yield_manager
 from api.stock_py.data.data_gdp import china_gdp_manager
@@ -17,15 +16,20 @@ from api.stock_py.data.data_money_supply import china_money_supply_manager
 from api.stock_py.data.data_margin import margin_manager
 from api.stock_py.data.data_listing_committee import listing_committee_manager
 
-from api.stock_py.deal.deal_buffet import build_buffet_data
-from api.stock_py.deal.deal_fed import calculate_fed_premium_both
-from api.stock_py.deal.deal_cpi_ppi import build_cpi_data, build_ppi_data
-from api.stock_py.deal.deal_money_supply import build_money_supply_data
-from api.stock_py.deal.deal_margin_account_info import build_margin_account_info_data
+from api.stock_py.deal.derived import derived_data
+from api.stock_py.bundle import (parse_sections, parse_section_queries, parse_series_query, parse_since, parse_format,
+                                 section_managers, get_section, get_section_delta, build_stock_bundle)
+from api.stock_py.export import EXPORT_DATASETS, EXPORT_MIMETYPES, available_formats, negotiate_format, parse_export_query, export_series
 
-from api.lof.lof_data_manager import lof_manager, get_lof_data, get_sorted_lof_data, get_lof_detail, initialize_lof_manager
-from api.lof.get_lof_detail import fetch_lof_detail_data, process_lof_detail_data
+from api.lof.lof_data_manager import (lof_manager, get_lof_data, get_sorted_lof_data, get_lof_detail, initialize_lof_manager,
+                                     schedule_lof_refresh, ensure_lof_fresh)
+from api.lof.lof_detail_cache import lof_detail_cache, enable_lof_detail_prefetch, parse_fund_ids
+from api.lof.lof_history_store import parse_history_query
 from api.peizhai.peizhai_data_manager import peizhai_manager
+from api.common.http_client import http_client
+from api.common.scheduler import refresh_scheduler
+from api.common.single_flight import single_flight
+from api.common.response_cache import response_cache, cache_control
 
 app = Flask(__name__)
 
@@ -33,14 +37,86 @@ app = Flask(__name__)
 app.static_folder = 'static'
 app.template_folder = 'templates'
 
+# 数据服务模式（见 README.md「部署」）：
+#   background - 接口只读内存数据，由后台调度器按各自间隔刷新（常驻进程的默认值）
+#   inline     - 接口在返回前同步检查并刷新数据（适合无法常驻后台线程的环境）
+# Vercel 等 serverless 平台上调用之间后台线程不会继续运行，检测到 VERCEL 环境变量时默认 inline
+DATA_SERVE_MODE = os.environ.get('DATA_SERVE_MODE', 'inline' if os.environ.get('VERCEL') else 'background')
+
 # 应用启动时初始化数据管理器
 with app.app_context():
     initialize_data_managers()
     initialize_lof_manager()
+    enable_lof_detail_prefetch()
+    if DATA_SERVE_MODE == 'background':
+        schedule_data_refresh(refresh_scheduler)
+        schedule_lof_refresh(refresh_scheduler)
+
+def ensure_fresh(*managers):
+    """inline 模式下同步刷新；background 模式下由调度器负责，这里不做任何上游请求
+
+    多进程部署时缓存可能已被其他 worker 更新，文件签名变化时先重新加载（未变化只做一次 stat）。
+    """
+    for m in managers:
+        m.reload_if_changed()
+    if DATA_SERVE_MODE == 'inline':
+        for m in managers:
+            m.update_data()
+
+def fresh_json(build, *managers, key=None):
+    """返回 JSON，并通过响应头告知数据新鲜度
+
+    build 为生成数据的函数，只在数据版本变化后的第一次请求时调用；序列化结果及其 gzip/br
+    压缩版本按 (key, 数据版本) 缓存，带强 ETag，If-None-Match 命中时返回 304。
+    key 由调用方用解析后的参数构造，默认只用请求路径：未识别或顺序不同的查询参数不会产生新的缓存项。
+    Cache-Control 的有效期取各数据源距下次计划刷新的时间。
+    """
+    return fresh_response(lambda: app.json.dumps(build()).encode('utf-8') + b'\n', 'application/json',
+                          key or request.path, 'Accept-Encoding', *managers)
+
+def fresh_response(serialize, mimetype, key, vary, *managers):
+    """fresh_json 的通用版本：serialize 直接返回响应体字节，key 为缓存键（同一路径按 Accept 协商出不同格式时需区分）"""
+    version = tuple(m.version for m in managers)
+    cached = response_cache.get(key, version, serialize)
+    encoding, body, etag = cached.negotiate(request.headers.get('Accept-Encoding', ''))
+    # 只与本次协商出的编码对应的 ETag 比较：客户端持有其他编码的 ETag 时并没有这份字节
+    if request.if_none_match.contains(etag):
+        response_cache.record_not_modified()
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = vary
+    response.headers['Cache-Control'] = cache_control(min((m.next_refresh_in() for m in managers), default=0))
+    ages = [m.data_age() for m in managers]
+    if ages and all(a is not None for a in ages):
+        response.headers['X-Data-Age'] = str(int(max(ages)))
+    stale = any(m.is_stale() for m in managers)
+    response.headers['X-Data-Stale'] = '1' if stale else '0'
+    return response
+
+def series_json(name, *managers):
+    """/api/data/* 板块接口：增量同步 ?since=<日期或版本号>、列式格式 ?format=columnar，
+    时间序列板块另可带 ?start=&end=&fields=&max_points="""
+    try:
+        q = parse_series_query(name, request.args)
+        since = parse_since(request.args.get('since'))
+        fmt = parse_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    key = (request.path, q.cache_key(), since, fmt)
+    if since is None:
+        return fresh_json(lambda: get_section(name, q, fmt), *managers, key=key)
+    return fresh_json(lambda: get_section_delta(name, q, since, fmt), *managers, key=key)
 
 @app.before_request
 def before_request():
     request.start_time = time.time()
+    # 在第一次处理请求时再启动调度器，避免 debug 重载器的父进程也在后台刷新
+    if DATA_SERVE_MODE == 'background' and not refresh_scheduler.started:
+        refresh_scheduler.start()
 
 @app.after_request
 def after_request(response):
@@ -88,107 +164,124 @@ def about():
 @app.route('/api/data/hushen300', methods=['GET'])
 def get_hushen300_data():
     try:
-        t1 = time.time()
-        hushen300_manager.update_data()
-        t2 = time.time()
-        data = hushen300_manager.get_data()
-        t3 = time.time()
-        print(f"[Profiling] hushen300_manager.update_data took {(t2-t1)*1000:.2f}ms")
-        print(f"[Profiling] hushen300_manager.get_data took {(t3-t2)*1000:.2f}ms")
-        return jsonify(data)
+        ensure_fresh(hushen300_manager)
+        return series_json('hushen300', hushen300_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/bond_yield', methods=['GET'])
 def get_bond_yield_data():
     try:
-        t1 = time.time()
-        bond_yield_manager.update_data()
-        t2 = time.time()
-        data = bond_yield_manager.get_data()
-        t3 = time.time()
-        print(f"[Profiling] bond_yield_manager.update_data took {(t2-t1)*1000:.2f}ms")
-        print(f"[Profiling] bond_yield_manager.get_data took {(t3-t2)*1000:.2f}ms")
-        return jsonify(data)
+        ensure_fresh(bond_yield_manager)
+        return series_json('bond_yield', bond_yield_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/gdp', methods=['GET'])
 def get_gdp_data():
     try:
-        china_gdp_manager.update_data()
-        data = china_gdp_manager.get_data()
-        return jsonify(data)
+        ensure_fresh(china_gdp_manager)
+        return series_json('gdp', china_gdp_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/stock_market', methods=['GET'])
 def get_stock_market_data():
     try:
-        china_stock_market_manager.update_data()
-        data = china_stock_market_manager.get_data()
-        return jsonify(data)
+        ensure_fresh(china_stock_market_manager)
+        return series_json('stock_market', china_stock_market_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/buffet', methods=['GET'])
 def get_buffet_data():
     try:
-        china_gdp_manager.update_data()
-        china_stock_market_manager.update_data()
-        gdp_data = china_gdp_manager.get_data()
-        stock_market_data = china_stock_market_manager.get_data()
-        buffet_data = build_buffet_data(gdp_data, stock_market_data)
-        return jsonify(buffet_data)
+        ensure_fresh(china_gdp_manager, china_stock_market_manager)
+        return series_json('buffet', china_gdp_manager, china_stock_market_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/fed_premium', methods=['GET'])
 def get_fed_premium_data():
     try:
-        t1 = time.time()
-        hushen300_data = hushen300_manager.get_data()
-        bond_yield_data = bond_yield_manager.get_data()
-        t2 = time.time()
-        result = calculate_fed_premium_both(hushen300_data, bond_yield_data)
-        t3 = time.time()
-        print(f"[Profiling] fed_premium: get_data took {(t2-t1)*1000:.2f}ms")
-        print(f"[Profiling] fed_premium: calculate took {(t3-t2)*1000:.2f}ms")
-        return jsonify(result)
+        return series_json('fed_premium', hushen300_manager, bond_yield_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app.route('/api/data/cpi', methods=['GET'])
 def get_cpi_data():
     try:
-        china_cpi_manager.update_data()
-        data = build_cpi_data(china_cpi_manager.get_data())
-        return jsonify(data)
+        ensure_fresh(china_cpi_manager)
+        return series_json('cpi', china_cpi_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app.route('/api/data/ppi', methods=['GET'])
 def get_ppi_data():
     try:
-        china_ppi_manager.update_data()
-        data = build_ppi_data(china_ppi_manager.get_data())
-        return jsonify(data)
+        ensure_fresh(china_ppi_manager)
+        return series_json('ppi', china_ppi_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app.route('/api/data/money_supply', methods=['GET'])
 def get_money_supply_data():
     try:
-        china_money_supply_manager.update_data()
-        raw = china_money_supply_manager.get_data()
-        data = build_money_supply_data(raw)
-        return jsonify(data)
+        ensure_fresh(china_money_supply_manager)
+        return series_json('money_supply', china_money_supply_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app.route('/api/data/margin_account', methods=['GET'])
 def get_margin_account_data():
     try:
-        margin_manager.update_data()
-        hs = hushen300_manager.get_data()
-        data = build_margin_account_info_data(margin_manager.get_data(), hs)
-        return jsonify(data)
+        ensure_fresh(margin_manager)
+        return series_json('margin_account', margin_manager, hushen300_manager)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/data/stock_bundle', methods=['GET'])
+def get_stock_bundle():
+    """股票页一次性取数：?sections=hushen300,fed_premium,... 不传则返回全部板块
+
+    时间序列板块可带 <板块>.start/end/fields/max_points 参数，如 fed_premium.max_points=800；
+    任一板块可带 <板块>.since=<版本号> 只取变化部分（见 get_section_delta）；format=columnar 时各板块均为列式
+    """
+    try:
+        names = parse_sections(request.args.get('sections', ''))
+        queries, since = parse_section_queries(names, request.args)
+        fmt = parse_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        managers = section_managers(names)
+        ensure_fresh(*managers)
+        key = (request.path, tuple(names), tuple(sorted((n, q.cache_key()) for n, q in queries.items())),
+               tuple(sorted(since.items())), fmt)
+        return fresh_json(lambda: build_stock_bundle(names, queries, since, fmt), *managers, key=key)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """供脚本批量取数的二进制导出：Arrow IPC 流或 MessagePack
+
+    格式由 ?format=arrow|msgpack 指定，否则按 Accept 头协商（未带 Accept 时优先 Arrow）；
+    支持与 /api/data/* 相同的 ?start=&end=&fields=&max_points=。两种格式都未安装或客户端都不接受时返回 406。
+    """
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f'unknown dataset: {dataset}', 'datasets': list(EXPORT_DATASETS)}), 404
+    try:
+        accept = request.accept_mimetypes if 'Accept' in request.headers else None
+        fmt = negotiate_format(request.args.get('format'), accept)
+        q = parse_export_query(dataset, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if fmt is None:
+        return jsonify({'error': 'no acceptable export format', 'available': [EXPORT_MIMETYPES[f] for f in available_formats()]}), 406
+    try:
+        managers = EXPORT_DATASETS[dataset][0]
+        ensure_fresh(*managers)
+        response = fresh_response(lambda: export_series(dataset, q, fmt), EXPORT_MIMETYPES[fmt],
+                                  (request.path, q.cache_key(), fmt), 'Accept, Accept-Encoding', *managers)
+        response.headers['Content-Disposition'] = f'inline; filename={dataset}.{fmt}'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -198,28 +291,37 @@ def get_listing_committee_data():
         # 如果当前没有数据，尝试从缓存加载
         if not listing_committee_manager.audit_data:
             listing_committee_manager.init_data()
-            
-        if listing_committee_manager.should_update():
-            listing_committee_manager.fetch_from_api()
-        return jsonify(listing_committee_manager.audit_data)
+
+        ensure_fresh(listing_committee_manager)
+        return fresh_json(lambda: listing_committee_manager.audit_data, listing_committee_manager)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/update_all', methods=['POST'])
 def update_all_data_route():
     try:
-        stock_update_all_data()
-        return jsonify({'message': '数据更新成功'})
+        report = stock_update_all_data()
+        return jsonify({'message': '数据更新成功', 'report': report})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        'http': http_client.get_stats(),
+        'scheduler': refresh_scheduler.status(),
+        'single_flight': single_flight.get_stats(),
+        'derived': derived_data.status(),
+        'response_cache': response_cache.get_stats(),
+        'lof_detail_cache': lof_detail_cache.get_stats(),
+    })
+
 @app.route('/api/data/lof', methods=['GET'])
 def get_lof_data_api():
     try:
-        # 使用LOF数据管理器获取数据
-        data = get_lof_data()
-        print(f'获取到LOF数据条数: {len(data)}')
-        return jsonify(data)
+        # 读内存中的列表，由后台轮询刷新（见 schedule_lof_refresh）
+        ensure_lof_fresh()
+        return fresh_json(lof_manager.get_data, lof_manager)
     except Exception as e:
         print(f'获取LOF数据失败: {e}')
         import traceback
@@ -233,19 +335,35 @@ def get_lof_detail_api():
         if not fund_id:
             return jsonify({'error': '缺少基金代码'}), 400
         
-        raw_data = fetch_lof_detail_data(fund_id)
-        processed_data = process_lof_detail_data(raw_data)
-        return jsonify(processed_data)
+        start, end, limit = parse_history_query(request.args)
+        # 历史存于本地 SQLite，过期后只向上游补最新一页；溢价率靠前的基金在列表刷新后已预取
+        return jsonify(lof_detail_cache.get(fund_id, start, end, limit))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f'获取LOF详情数据失败: {e}')
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/lof/details', methods=['GET'])
+def get_lof_details_api():
+    """批量详情：?fund_ids=a,b,c 加上与 /api/lof/detail 相同的 start/end/limit"""
+    try:
+        fund_ids = parse_fund_ids(request.args.get('fund_ids'))
+        start, end, limit = parse_history_query(request.args)
+        # 已缓存的直接返回，其余并发同步；超时或失败的基金列在 errors 中，不影响其他基金
+        return jsonify(lof_detail_cache.get_many(fund_ids, start, end, limit))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f'批量获取LOF详情数据失败: {e}')
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/data/etf', methods=['GET'])
 def get_etf_data():
     try:
         # 从东方财富或其他API获取ETF数据
         url = 'https://api.money.126.net/data/feed/etf/etfList'
-        response = requests.get(url)
+        response = http_client.get(url)
         if response.status_code == 200:
             data = response.json()
             # 处理数据格式以匹配前端需求
@@ -0,0 +1,147 @@
+"""FED 溢价计算基准：原先逐行 dict + strptime 的实现 vs 向量化 as-of join
+
+用法（在 韭菜助手_web 目录下）：
+    python benchmarks/bench_fed_premium.py [--repeat 20] [--scale 10]
+
+分别在真实缓存（2012 年至今）和放大 scale 倍的合成数据上计时，并校验两种实现结果一致。
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import datetime
+from typing import List, Dict, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.stock_py.data.timeseries import TimeSeries, days_to_strings  # noqa: E402
+from api.stock_py.deal.deal_fed import calculate_fed_premium_both  # noqa: E402
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+
+
+def legacy_fed_premium(hushen300_data: List[Dict], bond_yield_data: List[Dict]):
+    """改造前的实现（去掉了与基准无关的输入兼容分支），仅用于对比"""
+    date_map: Dict[str, float] = {}
+    peg_map: Dict[str, float] = {}
+    for it in hushen300_data:
+        d = it.get('date')
+        close = it.get('close')
+        peg = it.get('peg')
+        if d and isinstance(close, (int, float)) and isinstance(peg, (int, float)) and close > 0 and peg > 0:
+            date_map[d] = float(close)
+            peg_map[d] = float(peg)
+    by_map: Dict[str, float] = {}
+    dates_ts: List[Dict] = []
+    for it in bond_yield_data:
+        d = it.get('date')
+        yv = float(it['yield']) if it.get('yield') is not None else None
+        if d and yv is not None:
+            by_map[d] = yv
+            dates_ts.append({'s': d, 't': datetime.datetime.strptime(d, '%Y-%m-%d').timestamp()})
+    dates_ts.sort(key=lambda x: x['t'])
+
+    def nearest_bond(d: str) -> Optional[float]:
+        tgt = datetime.datetime.strptime(d, '%Y-%m-%d').timestamp()
+        lo, hi = 0, len(dates_ts) - 1
+        idx = -1
+        while lo <= hi:
+            mid = (lo + hi) >> 1
+            if dates_ts[mid]['t'] <= tgt:
+                idx = mid
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if idx == -1:
+            return None
+        cand = dates_ts[idx]
+        if tgt - cand['t'] <= 5 * 24 * 60 * 60:
+            return by_map.get(cand['s'])
+        return None
+
+    merged: List[Dict] = []
+    for d, close in date_map.items():
+        peg = peg_map.get(d)
+        by = by_map.get(d)
+        if by is None:
+            by = nearest_bond(d)
+        if by is None or math.isnan(by) or by <= 0:
+            continue
+        ey = 1.0 / peg
+        by_dec = by / 100.0
+        merged.append({'date': d, 'close': close, 'bondYield': by, 'peg': peg,
+                       'fedPremium': round(ey / by_dec - 1.0, 2), 'riskPremium': round(ey - by_dec, 4)})
+    if not merged:
+        return {'ratio': None, 'diff': None}
+    out = {}
+    for key, field in (('ratio', 'fedPremium'), ('diff', 'riskPremium')):
+        vals = [x[field] for x in merged]
+        mean = sum(vals) / len(vals)
+        std = math.sqrt(sum((v - mean) ** 2 for v in vals) / len(vals))
+        out[key] = {'data': [{'date': x['date'], 'close': x['close'], 'bondYield': x['bondYield'], 'peg': x['peg'], field: x[field]}
+                             for x in merged], 'mean': mean, 'std': std}
+    return out
+
+
+def load_real():
+    with open(os.path.join(CACHE_DIR, 'hushen300_data.json'), 'r', encoding='utf-8') as f:
+        hs = json.load(f)
+    with open(os.path.join(CACHE_DIR, 'bond_yield_data.json'), 'r', encoding='utf-8') as f:
+        by = json.load(f)
+    return hs, by
+
+
+def make_synthetic(n: int, seed: int = 7):
+    """n 个工作日的合成数据；国债收益率随机缺失约 5% 的交易日，用于覆盖 as-of 回退路径"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2026-01-01', 'D').astype(np.int64) - int(n * 1.45)
+    days = np.arange(start, start + int(n * 1.45), dtype=np.int64)
+    days = days[np.is_busday(days.astype('datetime64[D]'))][:n]
+    dates = days_to_strings(days)
+    close = np.round(3000 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), 2)
+    peg = np.round(np.clip(12 + np.cumsum(rng.normal(0, 0.05, n)), 5, 40), 2)
+    yld = np.round(np.clip(3 + np.cumsum(rng.normal(0, 0.01, n)), 1, 6), 4)
+    bond_mask = rng.random(n) > 0.05
+    hs = [{'date': d, 'close': c, 'peg': p} for d, c, p in zip(dates, close.tolist(), peg.tolist())]
+    by = [{'date': d, 'yield': y} for d, y, m in zip(dates, yld.tolist(), bond_mask.tolist()) if m]
+    return hs, by
+
+
+def timeit(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def run(name: str, hs: List[Dict], by: List[Dict], repeat: int):
+    hs_series = TimeSeries.from_records(hs, ['close', 'peg'])
+    by_series = TimeSeries.from_records(by, ['yield'])
+    legacy = legacy_fed_premium(hs, by)
+    fast = calculate_fed_premium_both(hs_series, by_series)
+    same = all(legacy[k]['data'] == fast[k]['data'] for k in ('ratio', 'diff'))
+    drift = max(abs(legacy[k][s] - fast[k][s]) for k in ('ratio', 'diff') for s in ('mean', 'std'))
+    t_legacy = timeit(lambda: legacy_fed_premium(hs, by), repeat)
+    t_fast = timeit(lambda: calculate_fed_premium_both(hs_series, by_series), repeat)
+    print(f"{name:<10} rows={len(hs):>6}/{len(by):<6} legacy={t_legacy:8.2f}ms  vectorized={t_fast:7.2f}ms  "
+          f"speedup={t_legacy / t_fast:5.1f}x  identical_rows={same}  stats_drift={drift:.1e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scale', type=int, default=10)
+    args = parser.parse_args()
+    hs, by = load_real()
+    run('real', hs, by, args.repeat)
+    run(f'synth x{args.scale}', *make_synthetic(len(hs) * args.scale), repeat=max(3, args.repeat // 4))
+
+
+if __name__ == '__main__':
+    main()
@@ -22,7 +22,23 @@ function setActiveNav() {
 }
 
 // 通用API请求函数
+// options.sync：按数据集增量同步，结果合并进 IndexedDB 本地缓存（浏览器不支持时退回普通请求）
+//   { key: 'hushen300' }                              单个时间序列接口，请求时追加 since=<本地版本号>
+//   { key: 'stock', sections: ['hushen300', ...] }      打包接口，按板块追加 <板块>.since=<本地版本号>
+// options.onCached(data)：本地缓存完整时，在请求发出前先用缓存数据回调一次；
+//   请求后数据没有任何变化时，返回值就是传给 onCached 的同一个对象
 async function apiRequest(url, options = {}) {
+    const { sync, onCached, ...fetchOptions } = options;
+    if (sync) {
+        const db = await openSeriesDB();
+        if (db) {
+            return syncSeriesRequest(db, url, sync, onCached, fetchOptions);
+        }
+    }
+    return fetchJson(url, fetchOptions);
+}
+
+async function fetchJson(url, options = {}) {
     const startTime = performance.now();
     try {
         const response = await fetch(url, {
@@ -48,6 +64,232 @@ async function apiRequest(url, options = {}) {
     }
 }
 
+// ---------- 时间序列本地缓存（IndexedDB） ----------
+const SERIES_DB_NAME = 'jiucai-series-cache';
+const SERIES_DB_STORE = 'datasets';
+let seriesDBPromise = null;
+
+// 打开本地缓存库；不支持或被禁用（如隐私模式）时得到 null
+function openSeriesDB() {
+    if (!seriesDBPromise) {
+        seriesDBPromise = new Promise(resolve => {
+            try {
+                if (!window.indexedDB) return resolve(null);
+                const req = window.indexedDB.open(SERIES_DB_NAME, 1);
+                req.onupgradeneeded = () => req.result.createObjectStore(SERIES_DB_STORE);
+                req.onsuccess = () => resolve(req.result);
+                req.onerror = () => resolve(null);
+                req.onblocked = () => resolve(null);
+            } catch (e) {
+                resolve(null);
+            }
+        });
+    }
+    return seriesDBPromise;
+}
+
+async function seriesCacheAvailable() {
+    return (await openSeriesDB()) !== null;
+}
+
+function seriesCacheGet(db, keys) {
+    return new Promise(resolve => {
+        const out = {};
+        try {
+            const tx = db.transaction(SERIES_DB_STORE, 'readonly');
+            const store = tx.objectStore(SERIES_DB_STORE);
+            keys.forEach(key => {
+                const req = store.get(key);
+                req.onsuccess = () => { out[key] = req.result; };
+            });
+            tx.oncomplete = () => resolve(out);
+            tx.onerror = tx.onabort = () => resolve({});
+        } catch (e) {
+            resolve({});
+        }
+    });
+}
+
+function seriesCachePut(db, entries) {
+    return new Promise(resolve => {
+        try {
+            const tx = db.transaction(SERIES_DB_STORE, 'readwrite');
+            const store = tx.objectStore(SERIES_DB_STORE);
+            Object.entries(entries).forEach(([key, value]) => store.put(value, key));
+            tx.oncomplete = () => resolve(true);
+            tx.onerror = tx.onabort = () => resolve(false);
+        } catch (e) {
+            resolve(false);
+        }
+    });
+}
+
+// 时间序列数据的三种结构：[{date, ...}]、{categories: [...], <列>: [...]}、{ratio: {data: [...]}, ...}
+function mergeSeriesRows(rows, deltaRows, from) {
+    return (rows || []).filter(r => r.date < from).concat(deltaRows || []);
+}
+
+// 并列数组形式的日期列：列式格式为 date，融资融券的原格式为 categories
+function seriesDateKey(payload) {
+    if (!payload || typeof payload !== 'object') return null;
+    if (Array.isArray(payload.date)) return 'date';
+    if (Array.isArray(payload.categories)) return 'categories';
+    return null;
+}
+
+// 日期列中早于 date 的个数
+function countBefore(dates, date) {
+    let n = 0;
+    while (n < dates.length && dates[n] < date) n++;
+    return n;
+}
+
+function mapSeriesPayload(payload, rowsFn, columnsFn) {
+    if (Array.isArray(payload)) return rowsFn(payload);
+    const dateKey = seriesDateKey(payload);
+    if (dateKey) return columnsFn(payload, dateKey);
+    if (payload && typeof payload === 'object') {
+        const out = {};
+        Object.keys(payload).forEach(k => {
+            const part = payload[k];
+            out[k] = part && Array.isArray(part.data) ? { ...part, data: rowsFn(part.data) } : part;
+        });
+        return out;
+    }
+    return payload;
+}
+
+// 把 ?since= 的增量结果合并进本地数据：丢弃本地 from 及之后的行，再拼上增量
+function mergeSeriesDelta(cached, envelope) {
+    if (!envelope.delta) return envelope.data;
+    if (envelope.data === null || envelope.data === undefined) return cached;
+    const from = envelope.from;
+    const delta = envelope.data;
+    if (!from) return delta;
+    if (!Array.isArray(delta) && !seriesDateKey(delta)) {
+        // {ratio: {data, mean, std}, ...}：行按日期合并，其余字段（如均值、标准差）以增量为准
+        const out = {};
+        Object.keys(delta).forEach(k => {
+            const part = delta[k];
+            const old = cached && cached[k];
+            out[k] = part && Array.isArray(part.data)
+                ? { ...part, data: mergeSeriesRows(old && old.data, part.data, from) }
+                : part;
+        });
+        return out;
+    }
+    return mapSeriesPayload(cached,
+        rows => mergeSeriesRows(rows, delta, from),
+        (cols, dateKey) => {
+            const n = countBefore(cols[dateKey], from);
+            const out = {};
+            Object.keys(delta).forEach(k => {
+                out[k] = Array.isArray(delta[k]) ? (cols[k] || []).slice(0, n).concat(delta[k]) : delta[k];
+            });
+            return out;
+        });
+}
+
+// 丢弃早于 start 的行（区间起点随日期前移时，本地缓存中多出的旧数据）
+function trimSeriesStart(payload, start) {
+    if (!start) return payload;
+    return mapSeriesPayload(payload,
+        rows => rows.filter(r => r.date >= start),
+        (cols, dateKey) => {
+            const n = countBefore(cols[dateKey], start);
+            const out = {};
+            Object.keys(cols).forEach(k => { out[k] = Array.isArray(cols[k]) ? cols[k].slice(n) : cols[k]; });
+            return out;
+        });
+}
+
+function seriesRowCount(payload) {
+    if (Array.isArray(payload)) return payload.length;
+    const dateKey = seriesDateKey(payload);
+    if (dateKey) return payload[dateKey].length;
+    const part = payload && payload.ratio;
+    return part && Array.isArray(part.data) ? part.data.length : 0;
+}
+
+// 合并一个数据集；本地缓存与服务端对不上（行数不符等）时返回 undefined，需要全量重取
+function applySeriesEnvelope(entry, envelope, start) {
+    if (!envelope || typeof envelope !== 'object' || !('version' in envelope)) return undefined;
+    if (envelope.delta && !entry) return undefined;
+    let data = mergeSeriesDelta(entry ? entry.data : undefined, envelope);
+    if (envelope.count !== undefined) {
+        data = trimSeriesStart(data, start);
+        if (seriesRowCount(data) !== envelope.count) return undefined;
+    }
+    return data;
+}
+
+async function syncSeriesRequest(db, url, sync, onCached, fetchOptions) {
+    const bundled = Array.isArray(sync.sections);
+    const names = bundled ? sync.sections : [''];
+    const base = new URL(url, window.location.origin);
+    const param = (name, key) => (name ? `${name}.${key}` : key);
+    // 缓存键不含 since 和 start：起点前移时沿用本地数据，只在本地裁掉旧行
+    const cacheKey = name => {
+        const params = [...base.searchParams.entries()]
+            .filter(([k]) => k !== param(name, 'since') && k !== param(name, 'start'))
+            .filter(([k]) => !bundled || k.startsWith(`${name}.`) || k === 'sections' || k === 'format')
+            .sort();
+        return `${sync.key}|${name}|${new URLSearchParams(params)}`;
+    };
+    const refsKey = `${sync.key}|refs`;
+    const cached = await seriesCacheGet(db, names.map(cacheKey).concat(bundled ? [refsKey] : []));
+    const assemble = (values, refs) => (bundled ? { ...values, refs: refs || {} } : values['']);
+
+    let cachedResult = null;
+    const complete = names.every(n => cached[cacheKey(n)]);
+    if (complete && onCached) {
+        const values = {};
+        names.forEach(n => { values[n] = cached[cacheKey(n)].data; });
+        cachedResult = assemble(values, cached[refsKey] && cached[refsKey].data);
+        onCached(cachedResult);
+    }
+
+    const versions = {};
+    names.forEach(n => { versions[n] = cached[cacheKey(n)] ? cached[cacheKey(n)].version : '0'; });
+    const values = {};
+    const updates = {};
+    let refs = null;
+    let changed = !complete;
+    for (let attempt = 0; attempt < 2; attempt++) {
+        const requestUrl = new URL(base);
+        names.forEach(n => requestUrl.searchParams.set(param(n, 'since'), versions[n]));
+        const response = await fetchJson(requestUrl.pathname + requestUrl.search, fetchOptions);
+        if (bundled) refs = { ...(refs || {}), ...(response.refs || {}) };
+        const failed = [];
+        names.forEach(n => {
+            const envelope = bundled ? response[n] : response;
+            const entry = updates[cacheKey(n)] || cached[cacheKey(n)];
+            const data = applySeriesEnvelope(entry, envelope, base.searchParams.get(param(n, 'start')));
+            if (data === undefined) {
+                failed.push(n);
+                return;
+            }
+            values[n] = data;
+            versions[n] = envelope.version;
+            if (!entry || envelope.version !== entry.version || seriesRowCount(data) !== seriesRowCount(entry.data)) {
+                updates[cacheKey(n)] = { version: envelope.version, data };
+                changed = true;
+            }
+        });
+        if (!failed.length) break;
+        // 对不上的数据集以 since=0 全量重取一次，其余数据集此时已是最新版本，只返回“无变化”
+        console.warn('[Series Cache] full resync:', failed.join(','));
+        failed.forEach(n => { versions[n] = '0'; });
+        if (attempt === 1) throw new Error(`series sync failed: ${failed.join(',')}`);
+    }
+    if (!changed && cachedResult) return cachedResult;
+    if (changed) {
+        if (bundled) updates[refsKey] = { version: '', data: refs };
+        await seriesCachePut(db, updates);
+    }
+    return assemble(values, refs);
+}
+
 // 显示加载状态
 function showLoading(elementId = 'loading') {
     const element = document.getElementById(elementId);
@@ -3,6 +3,13 @@
 let stockCharts = {};
 let currentData = {};
 
+// 图表宽度只有几百像素，时间序列在服务端按 LTTB 降采样到该点数以内
+const CHART_MAX_POINTS = 800;
+
+// 打包接口的全部板块，与后端 STOCK_SECTIONS 一致
+const STOCK_SECTIONS = ['hushen300', 'bond_yield', 'gdp', 'stock_market', 'buffet', 'fed_premium',
+                        'money_supply', 'cpi', 'ppi', 'margin_account'];
+
 document.addEventListener('DOMContentLoaded', function() {
     console.log('股票页面已加载');
     
@@ -18,80 +25,108 @@ async function loadStockData() {
         console.log('[Performance] Start loading stock data');
         const totalStartTime = performance.now();
         
-        // 并行加载所有数据以提高效率
+        // 一次请求取回所有板块，沪深300序列只下发一份。
+        // 支持 IndexedDB 时各板块缓存在本地：先用本地数据渲染，再只拉取变化的行合并进去
+        const deltaSync = await seriesCacheAvailable();
+        let rendered = null;
         console.time('Total API Requests');
-        const [
-            hushen300Response,
-            bondYieldResponse,
-            gdpResponse,
-            stockMarketResponse,
-            buffetResponse,
-            fedPremiumResponse,
-            moneySupplyResponse,
-            cpiResponse,
-            ppiResponse,
-            marginResponse
-        ] = await Promise.all([
-            apiRequest('/api/data/hushen300'),
-            apiRequest('/api/data/bond_yield'),
-            apiRequest('/api/data/gdp'),
-            apiRequest('/api/data/stock_market'),
-            apiRequest('/api/data/buffet'),
-            apiRequest('/api/data/fed_premium'),
-            apiRequest('/api/data/money_supply'),
-            apiRequest('/api/data/cpi'),
-            apiRequest('/api/data/ppi'),
-            apiRequest('/api/data/margin_account')
-        ]);
+        const bundle = await apiRequest(stockBundleUrl(deltaSync), deltaSync ? {
+            sync: { key: 'stock', sections: STOCK_SECTIONS },
+            onCached: cached => {
+                rendered = cached;
+                renderStockBundle(expandStockBundle(cached));
+                console.log(`[Performance] Rendered from local cache in ${(performance.now() - totalStartTime).toFixed(2)}ms`);
+            }
+        } : {});
         console.timeEnd('Total API Requests');
         
-        // 存储数据
-        currentData.hushen300Data = hushen300Response;
-        currentData.bondYieldData = bondYieldResponse;
-        currentData.gdpData = gdpResponse;
-        currentData.stockMarketData = stockMarketResponse;
-        currentData.buffetData = buffetResponse;
-        currentData.fedPremiumData = fedPremiumResponse.ratio;
-        currentData.riskPremiumData = fedPremiumResponse.diff;
-        currentData.moneySupplyData = moneySupplyResponse;
-        currentData.cpiData = cpiResponse;
-        currentData.ppiData = ppiResponse;
-        currentData.marginData = marginResponse;
-        
-        // 更新最后更新时间
-        const now = new Date();
-        const formattedDate = formatDate(now);
-        document.getElementById('last-updated').textContent = formattedDate;
-        
-        // 渲染图表
-        console.time('Render Charts');
-        const page = window.PageAdapter && typeof window.PageAdapter.create === 'function'
-          ? window.PageAdapter.create(currentData)
-          : null;
-          
-        if (page && window.StockViews) {
-          window.StockViews.renderHushen300Chart(page, { chartId: '#hushen300Chart', mode: 'ratio', leftName: '股债比' });
-          window.StockViews.renderHushen300Chart(page, { chartId: '#riskPremiumChart', mode: 'diff', leftName: '风险溢价' });
-          window.StockViews.renderMoneySupply(page);
-          window.StockViews.renderBuffet(page);
-          window.StockViews.renderCpiPpi(page);
-          window.StockViews.renderMarginAccountInfo(page);
+        if (bundle !== rendered) {
+            renderStockBundle(expandStockBundle(bundle));
         }
-        console.timeEnd('Render Charts');
         
         const totalEndTime = performance.now();
         console.log(`[Performance] Total load and render time: ${(totalEndTime - totalStartTime).toFixed(2)}ms`);
-        
-        // 显示数据概览
-        updateDataOverview();
-        
-        hideLoading();
     } catch (error) {
         console.error('加载股票数据失败:', error);
         showError('数据加载失败: ' + error.message);
     }
 }
 
+function renderStockBundle(bundle) {
+    // 存储数据
+    currentData.hushen300Data = bundle.hushen300;
+    currentData.bondYieldData = bundle.bond_yield;
+    currentData.gdpData = bundle.gdp;
+    currentData.stockMarketData = bundle.stock_market;
+    currentData.buffetData = bundle.buffet;
+    // 两张 FED 图共用同一份列式数据，各自取 ratio/diff 的统计值
+    currentData.fedPremiumData = bundle.fed_premium || null;
+    currentData.riskPremiumData = bundle.fed_premium || null;
+    currentData.moneySupplyData = bundle.money_supply;
+    currentData.cpiData = bundle.cpi;
+    currentData.ppiData = bundle.ppi;
+    currentData.marginData = bundle.margin_account;
+    
+    // 更新最后更新时间
+    const now = new Date();
+    const formattedDate = formatDate(now);
+    document.getElementById('last-updated').textContent = formattedDate;
+    
+    // 渲染图表
+    console.time('Render Charts');
+    const page = window.PageAdapter && typeof window.PageAdapter.create === 'function'
+      ? window.PageAdapter.create(currentData)
+      : null;
+      
+    if (page && window.StockViews) {
+      window.StockViews.renderHushen300Chart(page, { chartId: '#hushen300Chart', mode: 'ratio', leftName: '股债比' });
+      window.StockViews.renderHushen300Chart(page, { chartId: '#riskPremiumChart', mode: 'diff', leftName: '风险溢价' });
+      window.StockViews.renderMoneySupply(page);
+      window.StockViews.renderBuffet(page);
+      window.StockViews.renderCpiPpi(page);
+      window.StockViews.renderMarginAccountInfo(page);
+    }
+    console.timeEnd('Render Charts');
+    
+    // 显示数据概览
+    updateDataOverview();
+    
+    hideLoading();
+}
+
+// FED 图只展示近十年，区间截取交给服务端。沪深300保留完整日线（巴菲特指标取月末收盘价、其他板块按日期还原字段）。
+// 增量同步时本地保存完整分辨率的数据，由图表自身按 LTTB 采样绘制；否则由服务端降采样后下发。
+// 各板块均取列式格式 {date: [...], <字段>: [...]}，各列可直接交给 ECharts
+function stockBundleUrl(deltaSync) {
+    const tenYearsAgo = new Date();
+    tenYearsAgo.setFullYear(tenYearsAgo.getFullYear() - 10);
+    const params = new URLSearchParams({
+        format: 'columnar',
+        'fed_premium.start': `${tenYearsAgo.getFullYear()}-${String(tenYearsAgo.getMonth() + 1).padStart(2, '0')}-${String(tenYearsAgo.getDate()).padStart(2, '0')}`
+    });
+    if (!deltaSync) {
+        ['fed_premium', 'margin_account', 'bond_yield'].forEach(name => params.set(`${name}.max_points`, CHART_MAX_POINTS));
+    }
+    return `/api/data/stock_bundle?${params}`;
+}
+
+// 按 refs 把打包接口中省略的重复列从沪深300序列还原回来，得到与单独接口相同的结构
+function expandStockBundle(bundle) {
+    const refs = bundle.refs || {};
+    const hs = bundle.hushen300 || {};
+    const index = new Map();
+    (hs.date || []).forEach((d, i) => index.set(d, i));
+    const lookup = (dates, field) => (dates || []).map(d => (index.has(d) ? hs[field][index.get(d)] : null));
+    
+    if (refs.fed_premium && bundle.fed_premium) {
+        refs.fed_premium.forEach(field => { bundle.fed_premium[field] = lookup(bundle.fed_premium.date, field); });
+    }
+    if (refs.margin_account && bundle.margin_account) {
+        bundle.margin_account.rightSeries = lookup(bundle.margin_account.date, 'close');
+    }
+    return bundle;
+}
+
 function renderPlaceholderChart(chartId, title) {
     const chartDom = document.getElementById(chartId);
     if (!chartDom) {
@@ -126,16 +161,15 @@ function renderPlaceholderChart(chartId, title) {
 
 function updateDataOverview() {
     // 更新数据概览区域
-    const data = currentData.hushen300Data || [];
-    if (data.length > 0) {
-        const latest = data[data.length - 1];
-        document.getElementById('latest-index').textContent = latest.close || 'N/A';
+    const data = currentData.hushen300Data || {};
+    const dates = data.date || [];
+    if (dates.length > 0) {
+        const close = data.close || [];
+        document.getElementById('latest-index').textContent = close[close.length - 1] || 'N/A';
         
-        if (data.length >= 2) {
-            const first = data[0];
-            const last = data[data.length - 1];
+        if (dates.length >= 2) {
             document.getElementById('date-range').textContent = 
-                `${first.date || ''} 至 ${last.date || ''}`;
+                `${dates[0]} 至 ${dates[dates.length - 1]}`;
         }
         
         document.getElementById('data-overview').style.display = 'block';
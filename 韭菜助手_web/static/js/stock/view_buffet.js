@@ -1,9 +1,10 @@
 window.StockViews = window.StockViews || {};
 window.StockViews.renderBuffet = function(page) {
   if (!page || !page.data) return;
-  const data = page._buffetData || page.data.buffetData || [];
-  const hushen300Data = page._hushen300Data || page.data.hushen300Data || [];
-  if (!Array.isArray(data) || data.length === 0) {
+  // 列式数据：{date: [...], ratio: [...]}，沪深300为 {date: [...], close: [...], ...}
+  const data = page._buffetData || page.data.buffetData || {};
+  const hushen300Data = page._hushen300Data || page.data.hushen300Data || {};
+  if (!Array.isArray(data.date) || data.date.length === 0) {
     console.warn('buffetData 为空或未提供，跳过渲染');
     return;
   }
@@ -11,9 +12,8 @@ window.StockViews.renderBuffet = function(page) {
   const label = 'render_buffet';
   console.time(label);
 
-  const categories = [];
-  const ratio = [];
-  const hushen = [];
+  const categories = data.date;
+  const ratio = (data.ratio || []).map(r => (typeof r === 'number' && isFinite(r) ? r : null));
 
   function monthFromQuarterLabel(label) {
     const m = String(label).match(/(\d{4}).*?第(\d)季度/);
@@ -24,29 +24,16 @@ window.StockViews.renderBuffet = function(page) {
     return `${y}-${monthMap[q]}`;
   }
 
-  function getMonthEndClose(ym) {
-    if (!ym || !Array.isArray(hushen300Data)) return null;
-    let last = null;
-    hushen300Data.forEach(item => {
-      const d = item.date || item.tradeDate || '';
-      if (typeof d === 'string' && d.startsWith(ym)) {
-        const v = parseFloat(item.close || item.value || 0);
-        if (isFinite(v)) last = v; // 逐步更新，最后一个即该月最后一个交易日
-      }
-    });
-    return last;
-  }
-
-  data.forEach(item => {
-    const date = item.date || '';
-    const r = parseFloat(item.ratio ?? item.buffetRatio ?? item.marketCapToGDP);
-    if (date) {
-      categories.push(date);
-      ratio.push(isFinite(r) ? r : null);
-      const ym = monthFromQuarterLabel(date);
-      const hs = ym ? getMonthEndClose(ym) : null;
-      hushen.push(typeof hs === 'number' ? hs : null);
-    }
+  // 每月最后一个交易日的收盘价：日期升序，后写入的覆盖先写入的
+  const monthEndClose = new Map();
+  const hsDates = hushen300Data.date || [];
+  const hsClose = hushen300Data.close || [];
+  hsDates.forEach((d, i) => {
+    if (typeof hsClose[i] === 'number' && isFinite(hsClose[i])) monthEndClose.set(d.slice(0, 7), hsClose[i]);
+  });
+  const hushen = categories.map(date => {
+    const ym = monthFromQuarterLabel(date);
+    return ym && monthEndClose.has(ym) ? monthEndClose.get(ym) : null;
   });
 
   const dom = document.getElementById('buffetChart');
@@ -1,9 +1,10 @@
 window.StockViews = window.StockViews || {};
 window.StockViews.renderCpiPpi = function(page) {
   if (!page || !page.data) return;
-  const cpiData = page._cpiData || page.data.cpiData || [];
-  const ppiData = page._ppiData || page.data.ppiData || [];
-  if (!Array.isArray(cpiData) || !Array.isArray(ppiData) || cpiData.length === 0 || ppiData.length === 0) {
+  // 列式数据：CPI {month: [...], national_yoy: [...]}，PPI {month: [...], yoy: [...]}
+  const cpiData = page._cpiData || page.data.cpiData || {};
+  const ppiData = page._ppiData || page.data.ppiData || {};
+  if (!Array.isArray(cpiData.month) || !Array.isArray(ppiData.month) || cpiData.month.length === 0 || ppiData.month.length === 0) {
     console.warn('cpiData 或 ppiData 为空或未提供，跳过渲染');
     return;
   }
@@ -12,16 +13,14 @@ window.StockViews.renderCpiPpi = function(page) {
   console.time(label);
 
   const cpiMap = new Map();
-  cpiData.forEach(item => {
-    const month = item.month || item.date || item.tradeDate || '';
-    const yoy = parseFloat(item.national_yoy ?? item.yoy ?? item.CPIYoY ?? item.value);
-    if (month && isFinite(yoy)) cpiMap.set(month, yoy);
+  const cpiYoy = cpiData.national_yoy || [];
+  cpiData.month.forEach((month, i) => {
+    if (month && typeof cpiYoy[i] === 'number' && isFinite(cpiYoy[i])) cpiMap.set(month, cpiYoy[i]);
   });
   const ppiMap = new Map();
-  ppiData.forEach(item => {
-    const month = item.month || item.date || item.tradeDate || '';
-    const yoy = parseFloat(item.yoy ?? item.PPIYoY ?? item.value);
-    if (month && isFinite(yoy)) ppiMap.set(month, yoy);
+  const ppiYoy = ppiData.yoy || [];
+  ppiData.month.forEach((month, i) => {
+    if (month && typeof ppiYoy[i] === 'number' && isFinite(ppiYoy[i])) ppiMap.set(month, ppiYoy[i]);
   });
   const categories = [...new Set([...cpiMap.keys(), ...ppiMap.keys()])].sort();
   const cpi = categories.map(m => (cpiMap.has(m) ? cpiMap.get(m) : null));
@@ -6,50 +6,27 @@ window.StockViews.renderHushen300Chart = function(page, opts) {
   const leftName = opts && opts.leftName ? opts.leftName : 'FED溢价';
   const valueField = mode === 'diff' ? 'riskPremium' : 'fedPremium';
 
-  const hushen300Data = page._hushen300Data || page.data.hushen300Data || [];
-  const premiumData = (mode === 'diff'
+  // 列式数据 {date, close, bondYield, peg, fedPremium, riskPremium, ratio: {mean, std}, diff: {mean, std}}
+  const columns = (mode === 'diff'
     ? (page._riskPremiumData || page.data.riskPremiumData)
     : (page._fedPremiumData || page.data.fedPremiumData)) || null;
-  if (!Array.isArray(hushen300Data) || hushen300Data.length === 0 || !premiumData) return;
+  if (!columns || !Array.isArray(columns.date) || columns.date.length === 0) return;
+  const premiumData = columns[mode] || {};
 
   const label = `render_fed_${mode}_${chartId}`;
   console.time(label);
-  const categories = [];
-  const hushen300SeriesData = [];
-  const premiumMap = new Map();
-  const pegSeriesData = [];
-
-  const tenYearsAgo = new Date();
-  tenYearsAgo.setFullYear(tenYearsAgo.getFullYear() - 10);
-  function isInLastTenYears(dateStr) {
-    if (!dateStr) return false;
-    const d = new Date(dateStr.replace(/(\d{4})-(\d{2})-(\d{2})/, '$1-$2-$3'));
-    return d >= tenYearsAgo;
-  }
-
-  if (premiumData && premiumData.data) {
-    premiumData.data.forEach(item => { if (item.date) premiumMap.set(item.date, item[valueField]); });
-  }
-
-  hushen300Data.forEach(item => {
-    const date = item.tradeDate || item.date || '';
-    const value = parseFloat(item.close || 0);
-    const peg = parseFloat(item.peg || 0);
-    if (date && !isNaN(value) && isInLastTenYears(date)) {
-      categories.push(date);
-      hushen300SeriesData.push(value);
-      pegSeriesData.push(peg);
-    }
-  });
-
-  const premiumSeries = categories.map(d => (premiumMap.has(d) ? premiumMap.get(d) : null));
+  // 近十年区间由接口截取（fed_premium.start），降采样由接口（max_points）或图表 sampling 完成，各列直接作为图表数据
+  const categories = columns.date;
+  const hushen300SeriesData = columns.close || [];
+  const premiumSeries = columns[valueField] || [];
+  const pegSeriesData = columns.peg || [];
 
   const dom = document.getElementById(chartId.replace('#', ''));
   if (!dom || !window.echarts) return;
   const chart = echarts.init(dom);
     const seriesData = [
-      { name: '沪深300指数', type: 'line', yAxisIndex: 0, data: hushen300SeriesData, smooth: true, lineStyle: { width: 2, color: 'lightgrey' }, symbol: 'circle', showSymbol: false },
-      { name: leftName, type: 'line', yAxisIndex: 1, data: premiumSeries, smooth: true, lineStyle: { width: 2, color: '#4751A5' }, symbol: 'circle', showSymbol: false }
+      { name: '沪深300指数', type: 'line', yAxisIndex: 0, data: hushen300SeriesData, smooth: true, lineStyle: { width: 2, color: 'lightgrey' }, symbol: 'circle', showSymbol: false, sampling: 'lttb' },
+      { name: leftName, type: 'line', yAxisIndex: 1, data: premiumSeries, smooth: true, lineStyle: { width: 2, color: '#4751A5' }, symbol: 'circle', showSymbol: false, sampling: 'lttb' }
     ];
     if (premiumData.mean !== undefined && premiumData.std !== undefined) {
       const mean_val = premiumData.mean;
@@ -1,41 +1,18 @@
 window.StockViews = window.StockViews || {};
 window.StockViews.renderMarginAccountInfo = function(page) {
   if (!page || !page.data) return;
-  const rows = page._marginAccountInfoData || page.data.marginAccountInfoData || null;
-  if (!rows) return;
-  let hasData = false;
-  if (Array.isArray(rows)) {
-    hasData = rows.length > 0;
-  } else if (typeof rows === 'object') {
-    hasData = Array.isArray(rows.categories) && rows.categories.length > 0;
-  }
-  if (!hasData) return;
+  // 列式数据：{date: [...], leftSeries: [...], rightSeries: [...]}（原格式的日期列为 categories）
+  const d = page._marginAccountInfoData || page.data.marginAccountInfoData || null;
+  const categories = d && (d.date || d.categories);
+  if (!Array.isArray(categories) || categories.length === 0) return;
 
   const label = 'render_margin_account_info';
   console.time(label);
   const dom = document.getElementById('marginAccountInfoChart');
   if (!dom || !window.echarts) return;
   const chart = echarts.init(dom);
-  let categories = [];
-  let leftSeries = [];
-  let rightSeries = [];
-  const d = rows;
-  if (d && typeof d === 'object' && Array.isArray(d.categories) && Array.isArray(d.leftSeries) && Array.isArray(d.rightSeries)) {
-    categories = d.categories;
-    leftSeries = d.leftSeries;
-    rightSeries = d.rightSeries;
-  } else {
-    rows.forEach(it => {
-      const dt = it.date || it.tradeDate || it.month || '';
-      const leftVal = typeof it.margin_balance === 'number' ? it.margin_balance : it.fin_balance;
-      const rightVal = typeof it.hs300 === 'number' ? it.hs300 : it.close;
-      if (dt) {
-        categories.push(dt);
-        leftSeries.push(typeof leftVal === 'number' ? leftVal : null);
-        rightSeries.push(typeof rightVal === 'number' ? rightVal : null);
-      }
-    });
-  }
+  const leftSeries = d.leftSeries || [];
+  const rightSeries = d.rightSeries || [];
   const option = {
       tooltip: {
         trigger: 'axis',
@@ -63,8 +40,8 @@ window.StockViews.renderMarginAccountInfo = function(page) {
       ],
       legend: { top: '2%', left: 'center' },
       series: [
-        { name: '融资-融券余额', type: 'line', yAxisIndex: 0, data: leftSeries, lineStyle: { width: 2, color: '#4751A5' }, symbol: 'circle', showSymbol: false },
-        { name: '沪深300指数', type: 'line', yAxisIndex: 1, data: rightSeries, lineStyle: { width: 2, color: 'grey' }, symbol: 'circle', showSymbol: true }
+        { name: '融资-融券余额', type: 'line', yAxisIndex: 0, data: leftSeries, lineStyle: { width: 2, color: '#4751A5' }, symbol: 'circle', showSymbol: false, sampling: 'lttb' },
+        { name: '沪深300指数', type: 'line', yAxisIndex: 1, data: rightSeries, lineStyle: { width: 2, color: 'grey' }, symbol: 'circle', showSymbol: true, sampling: 'lttb' }
       ],
       animation: false
     };
@@ -1,44 +1,19 @@
 window.StockViews = window.StockViews || {};
 window.StockViews.renderMoneySupply = function(page) {
   if (!page || !page.data) return;
-  let data = page._moneySupplyData || page.data.moneySupplyData || [];
-  if (!Array.isArray(data)) {
-    const obj = data || {};
-    const dates = obj.dates || obj.months;
-    const m1Arr = obj.m1YoY || obj.m1_yoy;
-    const m2Arr = obj.m2YoY || obj.m2_yoy;
-    if (Array.isArray(dates) && Array.isArray(m1Arr) && Array.isArray(m2Arr)) {
-      data = dates.map((d, i) => ({
-        month: d,
-        m1_yoy: m1Arr[i],
-        m2_yoy: m2Arr[i],
-        diff: (typeof m1Arr[i] === 'number' && typeof m2Arr[i] === 'number') ? (m1Arr[i] - m2Arr[i]) : null
-      }));
-    } else {
-      data = [];
-    }
-  }
-  if (!Array.isArray(data) || data.length === 0) return;
+  // 列式数据：{month: [...], m1_yoy: [...], m2_yoy: [...], diff: [...]}
+  const data = page._moneySupplyData || page.data.moneySupplyData || {};
+  if (!Array.isArray(data.month) || data.month.length === 0) return;
+
   const label = 'render_money_supply';
   console.time(label);
 
-  const categories = [];
-  const m1 = [];
-  const m2 = [];
-  const diff = [];
-
-  data.forEach(item => {
-    const date = item.month || item.date || item.tradeDate || '';
-    const m1y = parseFloat(item.m1YoY ?? item.M1YoY ?? item.m1_yoy);
-    const m2y = parseFloat(item.m2YoY ?? item.M2YoY ?? item.m2_yoy);
-    const d = typeof item.m1m2YoY !== 'undefined' ? parseFloat(item.m1m2YoY) : (isFinite(m1y) && isFinite(m2y) ? (m1y - m2y) : NaN);
-    if (date) {
-      categories.push(date);
-      m1.push(isFinite(m1y) ? m1y : null);
-      m2.push(isFinite(m2y) ? m2y : null);
-      diff.push(isFinite(d) ? d : null);
-    }
-  });
+  const num = v => (typeof v === 'number' && isFinite(v) ? v : null);
+  const categories = data.month;
+  const m1 = (data.m1_yoy || []).map(num);
+  const m2 = (data.m2_yoy || []).map(num);
+  const diff = categories.map((_, i) => (Array.isArray(data.diff) ? num(data.diff[i])
+    : (m1[i] !== null && m2[i] !== null ? m1[i] - m2[i] : null)));
 
   const dom = document.getElementById('moneySupplyChart');
   if (!dom || !window.echarts) return;
@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+
+from api.stock_py.data.columnar_cache import ColumnarCache
+from api.stock_py.data.data_margin import MarginAccountDataManager
+
+DAYS = [str(datetime.date(2024, 1, 1) + datetime.timedelta(days=i)) for i in range(15)]
+
+
+def make_pages(days, page_size, failing=()):
+    """按日期倒序分页的假接口；failing 中的页返回 None（请求失败）"""
+    rows = [{'date': d, 'fin_balance': float(i), 'loan_balance': 1.0} for i, d in enumerate(days)][::-1]
+    total = (len(rows) + page_size - 1) // page_size
+
+    def fetch_page(page, size):
+        if page in failing:
+            return None
+        return rows[(page - 1) * size: page * size], total
+    return fetch_page
+
+
+@pytest.fixture
+def manager(tmp_path):
+    m = MarginAccountDataManager()
+    m.store = ColumnarCache(str(tmp_path / 'margin.cols'), ['fin_balance', 'loan_balance'])
+    m.backfill_page_size = m.incremental_page_size = 5
+    # 每次 update_data 都向（假的）上游请求
+    m.update_interval = 0
+    return m
+
+
+def stored_dates(m):
+    return [it['date'] for it in m.store.records()]
+
+
+def test_backfill_with_failed_page_writes_nothing(manager):
+    manager._fetch_page = make_pages(DAYS, 5, failing={2})
+    manager.update_data()
+    assert stored_dates(manager) == []
+
+    manager._fetch_page = make_pages(DAYS, 5)
+    manager.update_data()
+    assert stored_dates(manager) == DAYS
+
+
+def test_incremental_with_failed_page_leaves_no_gap(manager):
+    manager.store.write([{'date': d, 'fin_balance': 0.0, 'loan_balance': 1.0} for d in DAYS[:3]])
+    later = DAYS + [str(datetime.date(2024, 1, 16) + datetime.timedelta(days=i)) for i in range(10)]
+
+    manager._fetch_page = make_pages(later, 5, failing={3})
+    manager.update_data()
+    assert stored_dates(manager) == DAYS[:3]
+
+    manager._fetch_page = make_pages(later, 5)
+    manager.update_data()
+    assert stored_dates(manager) == later